@@ -4,15 +4,11 @@ import json
 import hashlib
 import subprocess
 from datetime import datetime
-import requests
 import threading
 import time
-import zipfile
-try:
-    import libtorrent as lt
-    TORRENT_AVAILABLE = True
-except ImportError:
-    TORRENT_AVAILABLE = False
+import queue
+import multiprocessing
+from itertools import islice
 try:
     import pyperclip
     CLIPBOARD_AVAILABLE = True
@@ -21,21 +17,46 @@ except ImportError:
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit,
     QListWidget, QListWidgetItem, QFileDialog, QMessageBox, QProgressBar, QInputDialog, QDialog, QTextEdit, QSplashScreen,
-    QFrame, QGridLayout, QMenu, QCheckBox
+    QFrame, QGridLayout, QMenu, QCheckBox, QTableView, QHeaderView, QStyledItemDelegate, QStyle, QSpinBox,
+    QTreeWidget, QTreeWidgetItem, QDialogButtonBox
 )
-from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal, QThread, QUrl
-from PyQt5.QtGui import QPalette, QColor, QIcon, QPixmap, QFont, QPainter, QDesktopServices
+from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal, QThread, QUrl, QAbstractListModel, QAbstractTableModel, QObject, QModelIndex, QRect, QPoint, QEvent
+from PyQt5.QtGui import QPalette, QColor, QIcon, QPixmap, QFont, QPainter, QDesktopServices, QFontMetrics, QPen
 from PIL import Image
 from io import BytesIO
 import csv
+import http_session
+from search_index import TitleSearchIndex, FuzzyTitleIndex
+from json_stream import StreamingDownloadsParser
+from json_merge import unir_listas, unir_listas_paralelo
+from duplicate_finder import DuplicateFinder, extrair_btih
+from edit_journal import EditJournal
+from json_output import PERFIS, ajustar_extensao, blocos_arquivo, carregar_perfil, salvar_json, salvar_perfil
+from zip_stream import StreamingZipMember
+from download_store import DownloadRecord, compactar, para_json
+from download_cache import gravar_cache, abrir_cache, MappedDownloadList
+from segmented_download import sondar, SegmentedDownload, MIN_SEGMENTADO, apagar_diario, caminho_diario
+from stream_buffer import ler_blocos
+from progress_meter import SpeedEstimator, ProgressAggregator
+from torrent_engine import EXTENSAO_RESUMO, INTERVALO_ESTADO, TORRENT_AVAILABLE, TorrentEngine, eh_torrent
+from rate_limit import TokenBucket, BandwidthSchedule, limitar, carregar_limites, salvar_limites
+from download_queue import (
+    DownloadQueue, DownloadJob, PRIORIDADES, PRIORIDADE_NORMAL, NA_FILA, BAIXANDO, PAUSADO, CONCLUIDO, ERRO, CANCELADO, ATIVOS
+)
+from community_update import (
+    carregar_metadados, salvar_metadados, metadados_da_resposta, cabecalhos_condicionais, mesma_versao, calcular_delta
+)
 
 # Desabilitar aviso de depreciação
 import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+FILTRO_JSON = 'Arquivos JSON (*.json *.json.gz *.json.zst);;Todos os arquivos (*)'
+
 class MergeFilesDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, perfil=None):
         super().__init__(parent)
+        self.perfil = perfil  # Formato de saída escolhido no menu
         self.setWindowTitle("Unir Arquivos JSON")
         self.setMinimumSize(600, 400)
 
@@ -64,16 +85,23 @@ class MergeFilesDialog(QDialog):
         self.btn_merge.clicked.connect(self.merge_files)
         self.btn_merge.setStyleSheet("font-weight: bold; padding: 10px;")
         layout.addWidget(self.btn_merge)
-        
-        self.merged_data = None
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+
+        self.merge_thread = None
+        self.arquivo_unido = None
 
     def add_files(self):
-        caminhos, _ = QFileDialog.getOpenFileNames(self, 'Selecione os arquivos JSON', '', 'Arquivos JSON (*.json);;Todos os arquivos (*)')
+        caminhos, _ = QFileDialog.getOpenFileNames(self, 'Selecione os arquivos JSON', '', FILTRO_JSON)
         if caminhos:
             for caminho in caminhos:
                 # Evitar adicionar o mesmo caminho duas vezes
                 if not self.file_list_widget.findItems(caminho, Qt.MatchExactly):
-                    self.file_list_widget.addItem(caminho)
+                    item = QListWidgetItem(caminho)
+                    item.setData(Qt.UserRole, caminho)  # O texto ganha a porcentagem durante a união
+                    self.file_list_widget.addItem(item)
 
     def remove_selected_file(self):
         selected_items = self.file_list_widget.selectedItems()
@@ -87,176 +115,1174 @@ class MergeFilesDialog(QDialog):
             QMessageBox.warning(self, "Aviso", "Você precisa selecionar pelo menos dois arquivos para unir.")
             return
 
-        all_downloads = []
-        all_titles = set()
-        
-        base_data = None # Para usar o 'name' e outras chaves do primeiro arquivo
+        # O resultado é gravado enquanto os arquivos são lidos: o destino vem antes
+        save_path, _ = QFileDialog.getSaveFileName(self, 'Salvar arquivo JSON unido', '', FILTRO_JSON)
+        if not save_path:
+            return
+        save_path = ajustar_extensao(save_path, self.perfil)
+        caminhos = [self.file_list_widget.item(i).data(Qt.UserRole) for i in range(self.file_list_widget.count())]
+        if any(os.path.abspath(save_path) == os.path.abspath(caminho) for caminho in caminhos):
+            QMessageBox.warning(self, "Aviso", "Escolha um arquivo de destino diferente dos arquivos que serão unidos.")
+            return
 
-        # Ler todos os arquivos
-        try:
-            for i in range(self.file_list_widget.count()):
-                path = self.file_list_widget.item(i).text()
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                if i == 0:
-                    base_data = data.copy()
-                    # Remove 'downloads' para preenchê-lo depois
-                    if 'downloads' in base_data:
-                        del base_data['downloads']
-
-                downloads = data.get('downloads', [])
-                for download in downloads:
-                    title = download.get('title')
-                    if title and title not in all_titles:
-                        all_downloads.append(download)
-                        all_titles.add(title)
+        for botao in (self.btn_add_files, self.btn_remove_file, self.btn_merge):
+            botao.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.merge_thread = MergeThread(caminhos, save_path, self.perfil)
+        self.merge_thread.progresso.connect(self.progresso_uniao)
+        self.merge_thread.progresso_arquivo.connect(self.progresso_arquivo)
+        self.merge_thread.concluido.connect(self.uniao_concluida)
+        self.merge_thread.falhou.connect(self.uniao_falhou)
+        self.merge_thread.start()
+
+    def progresso_uniao(self, porcentagem, itens):
+        self.progress_bar.setValue(porcentagem)
+        self.progress_bar.setFormat(f"Unindo: {itens} itens ({porcentagem}%)" if itens else f"Unindo: {porcentagem}%")
+
+    def progresso_arquivo(self, indice, porcentagem):
+        item = self.file_list_widget.item(indice)
+        item.setText(f"{item.data(Qt.UserRole)}  —  {porcentagem}%")
+
+    def uniao_concluida(self, caminho, gravados, descartados):
+        QMessageBox.information(
+            self, "Sucesso",
+            f"Arquivos unidos com sucesso em:\n{caminho}\n\n{gravados} itens, {descartados} repetidos ou sem título descartados."
+        )
+        self.arquivo_unido = caminho
+        self.accept() # Fecha a janela de diálogo
+
+    def uniao_falhou(self, mensagem):
+        self.progress_bar.hide()
+        for i in range(self.file_list_widget.count()):
+            item = self.file_list_widget.item(i)
+            item.setText(item.data(Qt.UserRole))
+        for botao in (self.btn_add_files, self.btn_remove_file, self.btn_merge):
+            botao.setEnabled(True)
+        QMessageBox.critical(self, "Erro", f"Erro ao unir os arquivos:\n{mensagem}")
+
+    def reject(self):
+        if self.merge_thread is not None and self.merge_thread.isRunning():
+            self.merge_thread.stop()  # O arquivo parcial é descartado
+            self.merge_thread.wait()
+        super().reject()
+
+
+class MergeThread(QThread):
+    """Une as listas fora da thread da interface.
+
+    Com mais de um núcleo, cada arquivo é lido num processo separado
+    (json_merge.unir_listas_paralelo) e o progresso sai por arquivo; com um
+    só, a união em streaming numa passada é mais rápida.
+    """
+    progresso = pyqtSignal(int, int)            # porcentagem lida, itens gravados
+    progresso_arquivo = pyqtSignal(int, int)    # índice do arquivo, porcentagem lida dele
+    concluido = pyqtSignal(str, int, int)       # destino, itens gravados, descartados
+    falhou = pyqtSignal(str)
+
+    def __init__(self, caminhos, destino, perfil=None):
+        super().__init__()
+        self.caminhos = caminhos
+        self.destino = destino
+        self.perfil = perfil
+        self.running = True
+        self._ultima = -1
+        self._por_arquivo = [0] * len(caminhos)
+        self._tamanhos = [os.path.getsize(caminho) for caminho in caminhos]
+
+    def _progresso(self, porcentagem, itens):
+        if porcentagem != self._ultima:
+            self._ultima = porcentagem
+            self.progresso.emit(porcentagem, itens)
+
+    def _progresso_arquivo(self, indice, porcentagem):
+        self._por_arquivo[indice] = porcentagem
+        self.progresso_arquivo.emit(indice, porcentagem)
+        total = sum(self._tamanhos) or 1
+        lidos = sum(tamanho * p // 100 for tamanho, p in zip(self._tamanhos, self._por_arquivo))
+        self._progresso(lidos * 100 // total, 0)
 
+    def run(self):
+        cancelado = lambda: not self.running
+        try:
+            if len(self.caminhos) > 1 and (os.cpu_count() or 1) > 1:
+                resultado = unir_listas_paralelo(self.caminhos, self.destino, self._progresso_arquivo, cancelado,
+                                                 perfil=self.perfil)
+            else:
+                resultado = unir_listas(self.caminhos, self.destino, self._progresso, cancelado, perfil=self.perfil)
         except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Erro ao ler o arquivo {path}:\n{e}")
-            return
-            
-        # Salvar o novo arquivo
-        save_path, _ = QFileDialog.getSaveFileName(self, 'Salvar arquivo JSON unido', '', 'Arquivos JSON (*.json);;Todos os arquivos (*)')
-        if not save_path:
+            self.falhou.emit(str(e))
             return
+        if resultado is not None:
+            self.concluido.emit(self.destino, *resultado)
 
-        if base_data is None:
-            base_data = {}
-            
-        base_data['downloads'] = all_downloads
+    def stop(self):
+        self.running = False
 
-        try:
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(base_data, f, indent=4, ensure_ascii=False)
-            
-            QMessageBox.information(self, "Sucesso", f"Arquivos unidos com sucesso em:\n{save_path}")
-            self.merged_data = base_data
-            self.accept() # Fecha a janela de diálogo
+class DuplicateReviewDialog(QDialog):
+    """Mostra os grupos de repetidos para o usuário escolher o que fica.
+
+    Em cada grupo só o primeiro item (o mais acima na lista) começa marcado;
+    os desmarcados são removidos ao confirmar.
+    """
+
+    def __init__(self, itens, grupos, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Itens Repetidos")
+        self.setMinimumSize(700, 500)
+        self.itens = itens
+
+        layout = QVBoxLayout(self)
+        total = sum(len(grupo) for grupo in grupos)
+        layout.addWidget(QLabel(
+            f"{len(grupos)} grupos com {total} itens parecidos. Marque o que deve ficar; "
+            "os desmarcados serão removidos da lista."
+        ))
+
+        self.arvore = QTreeWidget()
+        self.arvore.setHeaderLabels(['Título', 'Tamanho', 'Links'])
+        self.arvore.setUniformRowHeights(True)
+        self.arvore.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        for grupo in grupos:
+            hashes = [{extrair_btih(uri) for uri in itens[posicao].get('uris') or ()} - {None} for posicao in grupo]
+            mesmo_magnet = any(a & b for i, a in enumerate(hashes) for b in hashes[i + 1:])
+            motivo = 'mesmo magnet' if mesmo_magnet else 'títulos parecidos'
+            no_grupo = QTreeWidgetItem(self.arvore, [f"{itens[grupo[0]].get('title', 'Sem título')}  ({len(grupo)} itens, {motivo})"])
+            for ordem, posicao in enumerate(grupo):
+                item = itens[posicao]
+                filho = QTreeWidgetItem(no_grupo, [
+                    item.get('title', 'Sem título'), str(item.get('fileSize', '')), str(len(item.get('uris') or ())),
+                ])
+                filho.setData(0, Qt.UserRole, posicao)
+                filho.setCheckState(0, Qt.Checked if ordem == 0 else Qt.Unchecked)
+        if len(grupos) <= 200:
+            self.arvore.expandAll()
+        layout.addWidget(self.arvore)
+
+        botoes = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        botoes.button(QDialogButtonBox.Ok).setText('Remover desmarcados')
+        botoes.accepted.connect(self.accept)
+        botoes.rejected.connect(self.reject)
+        layout.addWidget(botoes)
+
+    def itens_removidos(self):
+        removidos = []
+        for i in range(self.arvore.topLevelItemCount()):
+            no_grupo = self.arvore.topLevelItem(i)
+            for j in range(no_grupo.childCount()):
+                filho = no_grupo.child(j)
+                if filho.checkState(0) != Qt.Checked:
+                    removidos.append(self.itens[filho.data(0, Qt.UserRole)])
+        return removidos
 
-        except Exception as e:
-            QMessageBox.critical(self, "Erro", f"Erro ao salvar o arquivo unido:\n{e}")
 
-class TorrentDownloader(QThread):
-    progress_updated = pyqtSignal(int, int, int, int, int, int, int)
+class FileDownloader(QThread):
+    progress_updated = pyqtSignal(int, 'qint64', 'qint64', 'qint64')  # 64 bits: arquivos acima de 2 GB
     download_finished = pyqtSignal(bool, str)
+
+    INTERVALO_PROGRESSO = 0.25  # segundos entre avisos de progresso para a interface
     
-    def __init__(self, torrent_url, save_path):
+    def __init__(self, file_url, save_path, conexoes=4, baldes=(), medidor=None, chave=None):
         super().__init__()
-        self.torrent_url = torrent_url
+        self.file_url = file_url
         self.save_path = save_path
-        self.session = None
-        self.torrent_handle = None
+        self.conexoes = conexoes
+        self.baldes = baldes  # TokenBucket global e do download
+        # Com um ProgressAggregator, o progresso vai para ele (lido pela interface no ritmo dela)
+        # em vez de virar um sinal
+        self.medidor = medidor
+        self.chave = chave
+        self.velocidade = SpeedEstimator()
         self.running = True
         
     def run(self):
-        if not TORRENT_AVAILABLE:
-            self.download_finished.emit(False, "libtorrent não está disponível")
+        try:
+            try:
+                total_size, aceita_intervalos, validador = sondar(self.file_url)
+            except Exception:
+                total_size, aceita_intervalos, validador = 0, False, None  # Sem sondagem: tenta do jeito simples
+
+            if aceita_intervalos and total_size > 0:
+                concluido = self._baixar_segmentado(total_size, validador)
+            else:
+                concluido = self._baixar_direto()
+            if concluido:
+                self.download_finished.emit(True, "Download concluído!")
+            elif aceita_intervalos and total_size > 0 and validador:
+                # Sem validador o diário não é aproveitado: a próxima tentativa começa do zero
+                self.download_finished.emit(False, "Download cancelado. Baixe de novo para a mesma pasta para continuar de onde parou.")
+            else:
+                self.download_finished.emit(False, "Download cancelado.")
+            
+        except Exception as e:
+            self.download_finished.emit(False, f"Erro: {str(e)}")
+
+    def _emitir_progresso(self, downloaded, total_size):
+        if self.medidor is not None:
+            self.medidor.relatar(self.chave, downloaded, total_size)
             return
+        speed = self.velocidade.atualizar(downloaded)
+        if total_size > 0:
+            progress = int((downloaded / total_size) * 100)
+            self.progress_updated.emit(progress, downloaded, total_size, int(speed))
+        else:
+            self.progress_updated.emit(0, downloaded, 0, int(speed))
+
+    def _baixar_segmentado(self, total_size, validador):
+        """Várias conexões, cada uma com um intervalo de bytes do arquivo (continua um download interrompido)"""
+        conexoes = self.conexoes if total_size >= MIN_SEGMENTADO else 1
+        download = SegmentedDownload.retomar(
+            self.file_url, self.save_path, total_size, validador,
+            conexoes=conexoes, cancelado=lambda: not self.running, baldes=self.baldes
+        )
+        return download.baixar(lambda downloaded: self._emitir_progresso(downloaded, total_size),
+                               self.INTERVALO_PROGRESSO)
+
+    def _baixar_direto(self):
+        """Uma conexão só (servidor sem suporte a Range): sempre desde o início"""
+        apagar_diario(self.save_path)
+        # Sem compressão: o arquivo fica idêntico ao do servidor e o progresso bate com o Content-Length
+        with http_session.get(self.file_url, stream=True, headers={'Accept-Encoding': 'identity'}) as response:
+            response.raise_for_status()
             
-        try:
-            # Configurar sessão do libtorrent
-            self.session = lt.session({'listen_interfaces': '0.0.0.0:6881'})
+            total_size = int(response.headers.get('content-length', 0))
+            downloaded = 0
+            ultimo_aviso = 0
             
-            # Adicionar torrent
-            params = lt.parse_magnet_uri(self.torrent_url)
-            params.save_path = self.save_path
-            self.torrent_handle = self.session.add_torrent(params)
+            with open(self.save_path, 'wb') as f:
+                # Blocos de até alguns MB lidos num buffer reutilizável; a interface é avisada
+                # no máximo a cada INTERVALO_PROGRESSO, não a cada bloco
+                for bloco in ler_blocos(response):
+                    if not self.running:
+                        return False
+                    f.write(bloco)
+                    downloaded += len(bloco)
+                    limitar(len(bloco), self.baldes, lambda: not self.running)
+                    agora = time.monotonic()
+                    if agora - ultimo_aviso >= self.INTERVALO_PROGRESSO:
+                        ultimo_aviso = agora
+                        self._emitir_progresso(downloaded, total_size)
+            self._emitir_progresso(downloaded, total_size)
+        return True
             
-            # Aguardar metadados
-            while not self.torrent_handle.has_metadata() and self.running:
-                time.sleep(0.1)
-                self.session.post_torrent_updates()
-                
-            if not self.running:
-                self.session.remove_torrent(self.torrent_handle)
-                return
-                
-            # Agora que temos metadados, podemos obter o tamanho
-            torrent_file = self.torrent_handle.torrent_file()
-            total_size = torrent_file.total_size() if torrent_file else 0
-
-            # Monitorar progresso
-            while self.running:
-                status = self.torrent_handle.status()
-                
-                # Se o download acabou ou está semeando, paramos de monitorar
-                if status.state == lt.torrent_status.seeding or status.state == lt.torrent_status.finished:
+    def stop(self):
+        self.running = False
+
+class TorrentEngineThread(QThread):
+    """Thread do motor de torrents: executa os comandos da interface e repassa os alertas da sessão"""
+    eventos = pyqtSignal(object)  # lista de (tipo, chave, dados)
+
+    ESPERA_ALERTAS = 250  # ms; também é o atraso máximo para atender um comando
+
+    def __init__(self, pasta):
+        super().__init__()
+        self.pasta = pasta
+        self.comandos = queue.Queue()
+        self.running = True
+
+    def pedir(self, metodo, *args):
+        """Agenda `TorrentEngine.metodo(*args)` na thread do motor"""
+        self.comandos.put((metodo, args))
+
+    def run(self):
+        try:
+            motor = TorrentEngine(self.pasta)
+        except Exception as e:
+            self.eventos.emit([('falha', None, str(e))])
+            return
+        eventos = motor.restaurar()
+        while self.running:
+            while True:
+                try:
+                    metodo, args = self.comandos.get_nowait()
+                except queue.Empty:
                     break
+                try:
+                    getattr(motor, metodo)(*args)
+                except Exception as e:
+                    eventos.append(('erro', args[0] if args else None, str(e)))
+            eventos.extend(motor.processar_alertas(self.ESPERA_ALERTAS))
+            if eventos:
+                self.eventos.emit(eventos)
+                eventos = []
+        motor.encerrar()
 
-                progress = int(status.progress * 100)
-                
-                self.progress_updated.emit(
-                    progress,
-                    status.download_rate,
-                    status.upload_rate,
-                    status.num_peers,
-                    status.num_seeds,
-                    status.total_done,
-                    total_size
-                )
-                
-                time.sleep(1)
-                self.session.post_torrent_updates()
+    def stop(self):
+        self.running = False
 
-            if self.running:
-                self.download_finished.emit(True, "Download concluído!")
-            else:
-                self.download_finished.emit(False, "Download cancelado.")
+class DownloadJobsModel(QAbstractTableModel):
+    """Tabela do painel de downloads: uma linha por job da fila, na ordem da fila"""
+    COLUNAS = ('Arquivo', 'Estado', 'Progresso', 'Velocidade', 'Prioridade')
+
+    def __init__(self, fila, parent=None):
+        super().__init__(parent)
+        self.fila = fila
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fila.jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUNAS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUNAS[section]
+        return None
+
+    def job_em(self, row):
+        if 0 <= row < len(self.fila.jobs):
+            return self.fila.jobs[row]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        job = self.job_em(index.row())
+        if job is None:
+            return None
+        coluna = index.column()
+        if role == Qt.ToolTipRole:
+            return job.mensagem or job.destino
+        if role != Qt.DisplayRole:
+            return None
+        if coluna == 0:
+            return job.titulo
+        if coluna == 1:
+            return job.estado
+        if coluna == 2:
+            if job.total > 0:
+                return f"{job.progresso}% ({job.baixados / (1024*1024):.2f} MB / {job.total / (1024*1024):.2f} MB)"
+            return f"{job.baixados / (1024*1024):.2f} MB" if job.baixados else ""
+        if coluna == 3:
+            if job.estado != BAIXANDO:
+                return ""
+            eta_str = "N/A"
+            if job.velocidade > 0 and job.total > job.baixados:
+                eta_str = time.strftime('%H:%M:%S', time.gmtime((job.total - job.baixados) / job.velocidade))
+            texto = f"{job.velocidade / 1024:.1f} KB/s | ETA: {eta_str}"
+            if job.limite:
+                texto += f" (máx. {job.limite // 1024} KB/s)"
+            return texto
+        if coluna == 4:
+            return PRIORIDADES.get(job.prioridade, str(job.prioridade))
+        return None
+
+    def job_alterado(self, job):
+        try:
+            row = self.fila.posicao(job)
+        except ValueError:
+            return
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUNAS) - 1))
+
+    def progresso_alterado(self, jobs):
+        """Um único dataChanged (colunas de progresso e velocidade) cobrindo todos os jobs atualizados"""
+        posicoes = {id(job): row for row, job in enumerate(self.fila.jobs)}
+        rows = [posicoes[id(job)] for job in jobs if id(job) in posicoes]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 2), self.index(max(rows), 3))
+
+    def recarregar(self):
+        self.beginResetModel()
+        self.endResetModel()
+
+
+class DownloadManager(QObject):
+    """Fila de downloads diretos com limite de downloads simultâneos.
+
+    Cada job em andamento tem o seu FileDownloader. Pausar para a thread e
+    guarda o andamento no diário (.kdm), então retomar continua de onde parou;
+    cancelar apaga o arquivo parcial. Baixar o limite não interrompe quem já
+    começou: só novos downloads esperam.
 
-            self.session.remove_torrent(self.torrent_handle)
+    O progresso das threads é lido por um único timer, INTERVALO_TELA vezes
+    por segundo, e sai num só sinal com todos os jobs que mudaram; o custo na
+    interface não cresce com o número de downloads nem com a velocidade.
 
+    Torrents e magnets entram na mesma fila, mas quem baixa é o motor
+    libtorrent (uma sessão só, numa TorrentEngineThread criada no primeiro
+    torrent). Os que estavam em andamento ao fechar voltam pausados.
+    """
+    job_alterado = pyqtSignal(object)
+    progresso_alterado = pyqtSignal(object)  # lista de jobs com progresso novo
+    fila_alterada = pyqtSignal()
+    job_finalizado = pyqtSignal(object)
+
+    INTERVALO_TELA = 500  # ms entre atualizações de progresso na interface
+
+    def __init__(self, limite=3, pasta_torrents=None, parent=None):
+        super().__init__(parent)
+        self.fila = DownloadQueue(limite)
+        self.threads = {}  # id do job -> FileDownloader em execução
+        self.pasta_torrents = pasta_torrents
+        self.motor = None  # TorrentEngineThread, criada no primeiro torrent
+        self.chaves_motor = {}  # id do job -> chave no motor (info-hash nos restaurados)
+        self.jobs_motor = {}    # chave no motor -> job
+        self.balde_global = TokenBucket()  # dividido por todos os downloads
+        self.baldes = {}  # id do job -> TokenBucket do próprio download
+        self.medidor = ProgressAggregator()
+        self.timer_progresso = QTimer(self)
+        self.timer_progresso.setInterval(self.INTERVALO_TELA)
+        self.timer_progresso.timeout.connect(self._coletar_progresso)
+        if TORRENT_AVAILABLE and pasta_torrents and os.path.isdir(pasta_torrents) and any(
+                nome.endswith(EXTENSAO_RESUMO) for nome in os.listdir(pasta_torrents)):
+            self._motor()  # Há torrents da sessão anterior para restaurar
+
+    def _motor(self):
+        if self.motor is None:
+            self.motor = TorrentEngineThread(self.pasta_torrents)
+            self.motor.eventos.connect(self._eventos_torrent)
+            self.motor.start()
+            if self.balde_global.taxa:
+                self.motor.pedir('limitar_global', self.balde_global.taxa)
+        return self.motor
+
+    def adicionar(self, url, destino, titulo=None, prioridade=PRIORIDADE_NORMAL):
+        job = self.fila.adicionar(DownloadJob(url, destino, titulo, prioridade))
+        self.fila_alterada.emit()
+        self._agendar()
+        return job
+
+    def definir_limite(self, limite):
+        self.fila.limite = max(1, limite)
+        self._agendar()
+
+    def definir_taxa_global(self, taxa):
+        """Limite total em bytes/s (0 = sem limite); vale na hora para os downloads em andamento.
+
+        A sessão libtorrent recebe o mesmo teto, e o que os torrents baixam é
+        descontado do balde global: HTTP e torrents dividem um só limite.
+        """
+        self.balde_global.definir_taxa(taxa)
+        if self.motor is not None:
+            self.motor.pedir('limitar_global', taxa)
+
+    def definir_taxa_job(self, job, taxa):
+        job.limite = taxa
+        if job.torrent:
+            if job.id in self.chaves_motor:
+                self._motor().pedir('limitar', self.chaves_motor[job.id], taxa)
+        else:
+            self._balde(job).definir_taxa(taxa)
+        self.job_alterado.emit(job)
+
+    def _balde(self, job):
+        balde = self.baldes.get(job.id)
+        if balde is None:
+            balde = self.baldes[job.id] = TokenBucket(job.limite)
+        return balde
+
+    def definir_prioridade(self, job, prioridade):
+        job.prioridade = prioridade
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def mover(self, job, deslocamento):
+        self.fila.mover(job, deslocamento)
+        self.fila_alterada.emit()
+
+    def pausar(self, job):
+        if job.estado not in (NA_FILA, BAIXANDO):
+            return
+        job.estado = PAUSADO
+        job.velocidade = 0
+        if job.torrent:
+            if job.id in self.chaves_motor:
+                self._motor().pedir('pausar', self.chaves_motor[job.id])
+        else:
+            downloader = self.threads.get(job.id)
+            if downloader is not None:
+                downloader.stop()
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def retomar(self, job):
+        if job.estado not in (PAUSADO, ERRO):
+            return
+        job.estado = NA_FILA
+        job.mensagem = ''
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def cancelar(self, job):
+        if job.estado not in ATIVOS:
+            return
+        job.estado = CANCELADO
+        job.velocidade = 0
+        downloader = self.threads.get(job.id)
+        if job.torrent:
+            chave = self.chaves_motor.pop(job.id, None)
+            if chave is not None:
+                self.jobs_motor.pop(chave, None)
+                self._motor().pedir('remover', chave, True)  # Apaga também os arquivos baixados
+        elif downloader is not None:
+            downloader.stop()  # O arquivo parcial é apagado quando a thread terminar
+        else:
+            self._apagar_parcial(job)
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def remover_finalizados(self):
+        for job in self.fila.remover_finalizados():
+            self.baldes.pop(job.id, None)
+        self.fila_alterada.emit()
+
+    def em_andamento(self):
+        return [job for job in self.fila.jobs if job.estado in ATIVOS]
+
+    def parar_todos(self):
+        """Para as threads (o diário de cada uma fica salvo) e espera terminarem"""
+        threads = list(self.threads.values())
+        if self.motor is not None:
+            threads.append(self.motor)  # O motor grava o resume data de cada torrent ao parar
+        for thread in threads:
+            thread.stop()
+        for thread in threads:
+            thread.wait()
+
+    def _agendar(self):
+        for job in self.fila.proximos():
+            if job.id in self.threads:
+                continue  # Ainda parando depois de uma pausa; recomeça quando a thread terminar
+            self._iniciar(job)
+
+    def _iniciar(self, job):
+        job.estado = BAIXANDO
+        job.mensagem = ''
+        if job.torrent:
+            chave = self.chaves_motor.setdefault(job.id, job.id)
+            self.jobs_motor[chave] = job
+            self._motor().pedir('adicionar', chave, job.url, job.destino, job.limite)
+            self.job_alterado.emit(job)
+            return
+        downloader = FileDownloader(job.url, job.destino, baldes=(self.balde_global, self._balde(job)),
+                                    medidor=self.medidor, chave=job.id)
+        downloader.download_finished.connect(
+            lambda success, msg, job=job: self._terminou(job, success, msg)
+        )
+        self.threads[job.id] = downloader
+        downloader.start()
+        self.timer_progresso.start()
+        self.job_alterado.emit(job)
+
+    def _coletar_progresso(self):
+        baixando = {job.id: job for job in self.fila.jobs if job.estado == BAIXANDO}
+        if not baixando:
+            self.timer_progresso.stop()
+            return
+        alterados = []
+        for chave, (downloaded, total_size, speed) in self.medidor.coletar().items():
+            job = baixando.get(chave)
+            if job is None:
+                continue
+            job.baixados = downloaded
+            job.total = total_size
+            job.velocidade = int(speed)
+            alterados.append(job)
+        if alterados:
+            self.progresso_alterado.emit(alterados)
+
+    def _terminou(self, job, success, msg):
+        downloader = self.threads.pop(job.id, None)
+        if downloader is not None:
+            downloader.wait()
+        progresso = self.medidor.coletar().get(job.id)
+        if progresso is not None:
+            job.baixados, job.total = progresso[0], progresso[1]
+        self.medidor.esquecer(job.id)
+        job.velocidade = 0
+        if job.estado == CANCELADO:
+            self._apagar_parcial(job)
+        elif job.estado == BAIXANDO:
+            job.estado = CONCLUIDO if success else ERRO
+            job.mensagem = msg
+            if success and job.total:
+                job.baixados = job.total
+            self.job_finalizado.emit(job)
+        # PAUSADO continua pausado; NA_FILA (retomado enquanto parava) é agendado abaixo
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def _eventos_torrent(self, eventos):
+        """Eventos do motor de torrents (uma lista por volta do laço de alertas)"""
+        alterados = []
+        taxa_torrents = 0
+        for tipo, chave, dados in eventos:
+            if tipo == 'falha':
+                # O motor não abriu (porta, pasta): os torrents da fila ficam com erro
+                self.motor.wait()
+                self.motor = None  # O próximo torrent tenta abrir de novo
+                for job in self.fila.jobs:
+                    if job.torrent and job.estado == BAIXANDO:
+                        self._finalizar_torrent(job, ERRO, dados)
+                continue
+            if tipo == 'restaurado':
+                job = DownloadJob(f'magnet:?xt=urn:btih:{chave}', dados['destino'], dados['titulo'])
+                job.estado = PAUSADO
+                self.fila.adicionar(job)
+                self.chaves_motor[job.id] = chave
+                self.jobs_motor[chave] = job
+                self.fila_alterada.emit()
+                continue
+            job = self.jobs_motor.get(chave)
+            if job is None:
+                continue
+            if tipo == 'estado':
+                if job.estado != BAIXANDO:
+                    continue  # Status atrasado de um torrent que acabou de ser pausado
+                job.baixados = dados['baixados']
+                job.total = dados['total']
+                job.velocidade = dados['velocidade']
+                taxa_torrents += dados['velocidade']
+                if dados['titulo']:
+                    job.titulo = dados['titulo']
+                job.mensagem = (f"{dados['peers']} peers, {dados['seeds']} seeds" if dados['metadados']
+                                else 'Buscando metadados...')
+                alterados.append(job)
+            elif tipo == 'concluido':
+                job.baixados = dados['baixados']
+                job.total = dados['total']
+                self._finalizar_torrent(job, CONCLUIDO, '')
+            elif tipo == 'erro':
+                self._finalizar_torrent(job, ERRO, dados)
+        if taxa_torrents:
+            # Cada status cobre cerca de INTERVALO_ESTADO segundos de tráfego dos torrents
+            self.balde_global.cobrar(taxa_torrents * INTERVALO_ESTADO)
+        if alterados:
+            self.progresso_alterado.emit(alterados)
+
+    def _finalizar_torrent(self, job, estado, mensagem):
+        chave = self.chaves_motor.pop(job.id, None)
+        if chave is not None:
+            self.jobs_motor.pop(chave, None)
+            if estado == ERRO:
+                # Os arquivos e o resume data ficam; retomar tenta de novo sem reconferir as peças
+                self._motor().pedir('arquivar', chave)
+        job.estado = estado
+        job.mensagem = mensagem
+        job.velocidade = 0
+        self.job_finalizado.emit(job)
+        self.job_alterado.emit(job)
+        self._agendar()
+
+    def _apagar_parcial(self, job):
+        for caminho in (job.destino, caminho_diario(job.destino)):
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+class JsonStreamLoader(QThread):
+    """Lê uma lista JSON (arquivo local ou URL) em blocos e entrega os downloads aos poucos"""
+    lote_carregado = pyqtSignal(int, object)  # geração, itens novos
+    progresso = pyqtSignal(int, int, str)     # geração, porcentagem, texto
+    concluido = pyqtSignal(int, object)       # geração, parser (com o cabeçalho da lista)
+    falhou = pyqtSignal(int, str)
+
+    TAMANHO_BLOCO = 1024 * 1024       # leitura do arquivo local
+    TAMANHO_BLOCO_REDE = 64 * 1024    # blocos menores na rede para a primeira página chegar logo
+    INTERVALO_LOTE = 0.2              # segundos entre lotes enviados para a interface
+
+    def __init__(self, origem, geracao, salvar_em=None):
+        super().__init__()
+        self.origem = origem
+        self.geracao = geracao
+        self.salvar_em = salvar_em  # Cópia dos bytes baixados (cache de URL)
+        self.running = True
+
+    def _blocos(self):
+        """Gera (bytes, lidos, total) do arquivo ou da resposta HTTP"""
+        if self.origem.startswith(('http://', 'https://')):
+            with http_session.get(self.origem, stream=True) as response:
+                response.raise_for_status()
+                total = int(response.headers.get('content-length', 0))
+                for chunk in response.iter_content(chunk_size=self.TAMANHO_BLOCO_REDE):
+                    if chunk:
+                        # Com gzip, o Content-Length conta bytes compactados: o progresso usa o que veio da rede
+                        lidos = response.raw.tell()
+                        yield chunk, lidos, total
+        else:
+            # .json.gz/.json.zst são descompactados; o progresso conta os bytes do arquivo em disco
+            yield from blocos_arquivo(self.origem, self.TAMANHO_BLOCO)
+
+    def run(self):
+        parser = StreamingDownloadsParser()
+        temporario = self.salvar_em + '.part' if self.salvar_em else None
+        cache = None
+        pendentes = []
+        ultimo_envio = 0
+        ultima_porcentagem = -1
+        try:
+            if temporario:
+                cache = open(temporario, 'wb')
+            for bloco, lidos, total in self._blocos():
+                if not self.running:
+                    return
+                if cache:
+                    cache.write(bloco)
+                pendentes.extend(compactar(parser.feed(bloco)))
+                # O primeiro lote sai assim que existir; os seguintes são agrupados por tempo
+                agora = time.time()
+                if pendentes and agora - ultimo_envio >= self.INTERVALO_LOTE:
+                    self.lote_carregado.emit(self.geracao, pendentes)
+                    pendentes = []
+                    ultimo_envio = agora
+                if total:
+                    porcentagem = min(100, lidos * 100 // total)
+                    if porcentagem != ultima_porcentagem:
+                        ultima_porcentagem = porcentagem
+                        self.progresso.emit(self.geracao, porcentagem, f"Carregando: {parser.total} itens ({porcentagem}%)")
+
+            pendentes.extend(compactar(parser.close()))
+            if pendentes:
+                self.lote_carregado.emit(self.geracao, pendentes)
+            if cache:
+                cache.close()
+                cache = None
+                os.replace(temporario, self.salvar_em)
+            self.concluido.emit(self.geracao, parser)
         except Exception as e:
-            self.download_finished.emit(False, f"Erro: {str(e)}")
-            
+            if self.running:
+                self.falhou.emit(self.geracao, str(e))
+        finally:
+            if cache:
+                cache.close()
+                try:
+                    os.remove(temporario)
+                except OSError:
+                    pass
+
     def stop(self):
         self.running = False
 
-class FileDownloader(QThread):
-    progress_updated = pyqtSignal(int, int, int, int)
-    download_finished = pyqtSignal(bool, str)
-    
-    def __init__(self, file_url, save_path):
+class CommunityListWorker(QThread):
+    """Baixa, descompacta e lê a lista da comunidade fora da thread da interface.
+
+    A lista nova só é entregue pronta (sinal concluido), para a interface
+    trocar os dados de uma vez. Com a lista da comunidade aberta, o delta em
+    relação a ela também é calculado aqui.
+    """
+    progresso = pyqtSignal(int, str)
+    sem_mudancas = pyqtSignal(object)               # metadados a gravar (None se o servidor respondeu 304)
+    concluido = pyqtSignal(object, object, object)  # dados novos, metadados, delta (ou None)
+    falhou = pyqtSignal(str)
+
+    URL = 'https://drive.google.com/uc?export=download'
+    FILE_ID = '1NXO_XnSl7Z9fEtQDejKhe0VbneQY7PC6'  # ID do arquivo ZIP
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+
+    def __init__(self, metadados, lista_atual, caminho_cache):
         super().__init__()
-        self.file_url = file_url
-        self.save_path = save_path
+        self.metadados = metadados
+        self.lista_atual = lista_atual      # lista da comunidade aberta (base do delta) ou None
+        # Retrato da lista no pedido: a interface só acrescenta itens no fim (remover troca a lista
+        # inteira), então os primeiros `total_atual` itens não mudam enquanto o delta é calculado
+        self.total_atual = len(lista_atual) if lista_atual is not None else 0
+        self.caminho_cache = caminho_cache  # onde gravar o cache binário da versão nova
         self.running = True
-        
+
     def run(self):
         try:
-            self.start_time = time.time()
-            response = requests.get(self.file_url, stream=True)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(self.save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if not self.running:
-                        self.download_finished.emit(False, "Download cancelado.")
-                        return
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        elapsed_time = time.time() - self.start_time
-                        speed = downloaded / elapsed_time if elapsed_time > 0 else 0
-                        
-                        if total_size > 0:
-                            progress = int((downloaded / total_size) * 100)
-                            self.progress_updated.emit(progress, downloaded, total_size, int(speed))
-                        else:
-                            self.progress_updated.emit(0, downloaded, 0, int(speed))
-                            
-            self.download_finished.emit(True, "Download concluído!")
-            
+            self._atualizar()
         except Exception as e:
-            self.download_finished.emit(False, f"Erro: {str(e)}")
-            
+            if self.running:
+                self.falhou.emit(str(e))
+
+    def _atualizar(self):
+        # A sessão compartilhada guarda os cookies do Google Drive
+        session = http_session.obter_sessao()
+        headers = {'User-Agent': self.USER_AGENT}
+        headers.update(cabecalhos_condicionais(self.metadados))
+
+        # Primeira requisição para obter o token de confirmação
+        response = session.get(self.URL, params={'id': self.FILE_ID}, stream=True, headers=headers, timeout=http_session.TEMPO_LIMITE)
+
+        token = None
+        for key, value in response.cookies.items():
+            if key.startswith('download_warning'):
+                token = value
+                break
+
+        # Se um token foi encontrado, fazer uma segunda requisição com ele
+        if token:
+            response.close()  # devolve a conexão ao pool antes do segundo pedido
+            params = {'id': self.FILE_ID, 'confirm': token}
+            response = session.get(self.URL, params=params, stream=True, headers=headers, timeout=http_session.TEMPO_LIMITE)
+
+        if mesma_versao(self.metadados, response):
+            response.close()
+            self.sem_mudancas.emit(None)
+            return
+        response.raise_for_status()
+
+        total_size = int(response.headers.get('content-length', 0))
+        downloaded_size = 0
+        ultima_porcentagem = -1
+        resumo = hashlib.sha1()
+
+        # Download, descompactação e leitura do JSON acontecem juntos, bloco a bloco,
+        # sem gravar o ZIP nem o JSON extraído em disco
+        membro = StreamingZipMember(lambda nome: nome.endswith('.json'))
+        parser = StreamingDownloadsParser()
+        downloads = []
+        # Sem ETag/Last-Modified, só o SHA-1 no fim diz se é a mesma versão: até lá os itens
+        # ficam como vieram do parser, e uma versão idêntica não passa pela conversão
+        adiar = bool(self.metadados.get('sha1')) and not (
+            response.headers.get('ETag') or response.headers.get('Last-Modified'))
+        converter = list if adiar else compactar
+        with response:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if not self.running:
+                    return
+                if chunk:
+                    resumo.update(chunk)
+                    json_bytes = membro.feed(chunk)
+                    if json_bytes:
+                        downloads.extend(converter(parser.feed(json_bytes)))
+                    downloaded_size += len(chunk)
+                    # Só avisa a interface quando a porcentagem muda
+                    if total_size > 0:
+                        porcentagem = min(100, downloaded_size * 100 // total_size)
+                        if porcentagem != ultima_porcentagem:
+                            ultima_porcentagem = porcentagem
+                            self.progresso.emit(porcentagem, f"Baixando e lendo: {porcentagem}% ({parser.total} itens)")
+        membro.close()
+        downloads.extend(converter(parser.close()))
+
+        metadados_novos = metadados_da_resposta(response)
+        metadados_novos['sha1'] = resumo.hexdigest()
+        if self.metadados.get('sha1') == metadados_novos['sha1']:
+            # Servidor sem validadores, mas o arquivo baixado é idêntico ao anterior
+            self.sem_mudancas.emit(metadados_novos)
+            return
+        if adiar:
+            downloads = compactar(downloads)
+
+        dados = parser.montar_dados(downloads)
+        delta = None
+        if self.lista_atual is not None:
+            self.progresso.emit(100, "Comparando com a lista aberta...")
+            delta = calcular_delta(islice(self.lista_atual, self.total_atual), downloads)
+        if not self.running:
+            return
+
+        # Cache da versão nova em um arquivo à parte: a interface só o coloca no lugar
+        # depois de soltar o cache antigo (no Windows um arquivo mapeado não pode ser substituído)
+        self.progresso.emit(100, "Salvando cache...")
+        try:
+            gravar_cache(self.caminho_cache, dados)
+        except (OSError, ValueError) as e:  # ValueError: título com caractere que o UTF-8 não aceita
+            print(f"Não foi possível gravar o cache da comunidade: {e}")
+        if self.running:
+            self.concluido.emit(dados, metadados_novos, delta)
+
     def stop(self):
         self.running = False
 
+class SearchWorker(QThread):
+    """Executa uma consulta no índice de títulos fora da thread da interface"""
+    resultado_pronto = pyqtSignal(int, str, object, int)
+
+    def __init__(self, indice, termo, geracao, base=None):
+        super().__init__()
+        self.indice = indice
+        self.termo = termo
+        self.geracao = geracao
+        self.base = base
+        self.running = True
+
+    def run(self):
+        # A versão é lida junto com a consulta, sob o lock do índice
+        resultado, versao = self.indice.consultar(self.termo, base=self.base, cancelado=lambda: not self.running)
+        if resultado is not None and self.running:
+            self.resultado_pronto.emit(self.geracao, self.termo, resultado, versao)
+
+    def stop(self):
+        self.running = False
+
+class DownloadListModel(QAbstractListModel):
+    """Modelo da lista de downloads: expõe self.filtered_downloads inteira sem criar widgets por linha"""
+    selecao_alterada = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._itens = []
+        # Marcação guardada como exceções: com _todos_marcados=True, as exceções são os desmarcados.
+        # Assim "Selecionar Todos" em 200 mil itens não cria 200 mil entradas.
+        self._todos_marcados = False
+        self._excecoes = set()  # id() dos itens
+
+    def definir_itens(self, itens, manter_marcacoes=False):
+        """Troca os itens exibidos sem copiar a lista (apenas guarda a referência)"""
+        self.beginResetModel()
+        self._itens = itens
+        if not manter_marcacoes:
+            self._todos_marcados = False
+            self._excecoes.clear()
+        self.endResetModel()
+        self.selecao_alterada.emit()
+
+    def anexar(self, novos):
+        """Acrescenta itens no fim da lista exibida (carregamento progressivo)"""
+        if not novos:
+            return
+        inicio = len(self._itens)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(novos) - 1)
+        self._itens.extend(novos)
+        self.endInsertRows()
+        self.selecao_alterada.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._itens)
+
+    def item_em(self, row):
+        """Retorna o dicionário original do item (sem passar por QVariant, que faria uma cópia)"""
+        if 0 <= row < len(self._itens):
+            return self._itens[row]
+        return None
+
+    def esta_marcado(self, item):
+        return (id(item) in self._excecoes) != self._todos_marcados
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item_em(index.row())
+        if item is None:
+            return None
+        if role == Qt.DisplayRole:
+            return item.get('title', 'Sem título')
+        if role == Qt.ToolTipRole:
+            file_size = item.get('fileSize', '')
+            return f"{item.get('title', 'Sem título')} [{file_size}]" if file_size else item.get('title', 'Sem título')
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.esta_marcado(item) else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        item = self.item_em(index.row())
+        if item is None:
+            return False
+        if (value == Qt.Checked) != self._todos_marcados:
+            self._excecoes.add(id(item))
+        else:
+            self._excecoes.discard(id(item))
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        self.selecao_alterada.emit()
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def alternar_marcado(self, index):
+        marcado = index.data(Qt.CheckStateRole) == Qt.Checked
+        self.setData(index, Qt.Unchecked if marcado else Qt.Checked, Qt.CheckStateRole)
+
+    def marcar_todos(self, marcado):
+        self._todos_marcados = marcado
+        self._excecoes.clear()
+        if self._itens:
+            self.dataChanged.emit(self.index(0), self.index(len(self._itens) - 1), [Qt.CheckStateRole])
+        self.selecao_alterada.emit()
+
+    def contar_marcados(self):
+        if self._todos_marcados:
+            return len(self._itens) - len(self._excecoes)
+        return len(self._excecoes)
+
+    def itens_marcados(self):
+        """Retorna os itens marcados na ordem em que aparecem na lista"""
+        if not self._todos_marcados and not self._excecoes:
+            return []
+        return [item for item in self._itens if self.esta_marcado(item)]
+
+class DownloadItemDelegate(QStyledItemDelegate):
+    """Desenha cada linha (caixa de seleção, título, tamanho, botões e estrelas) direto no QPainter"""
+    link_clicado = pyqtSignal(object)
+    editar_clicado = pyqtSignal(object)
+
+    ALTURA_LINHA = 42
+    MARGEM = 8
+    ESPACO = 12
+    TAMANHO_CAIXA = 16
+    ALTURA_BOTAO = 26
+
+    # (texto, cor de fundo, cor ao passar o mouse, cor do texto)
+    BOTAO_SEM_LINK = ("[Sem Link]", "#555555", "#666666", "#999999")
+    BOTAO_TORRENT = ("🔗 Torrent", "#27ae60", "#2ecc71", "#ffffff")
+    BOTAO_LINK = ("📥 Link", "#e74c3c", "#c0392b", "#ffffff")
+    BOTAO_EDITAR = ("✏️ Editar", "#3498db", "#2980b9", "#ffffff")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fonte_titulo = QFont()
+        self.fonte_titulo.setBold(True)
+        self.fonte_botao = QFont()
+        self.fonte_botao.setPixelSize(11)
+        self.fonte_botao.setBold(True)
+        self.fonte_estrelas = QFont()
+        self.fonte_estrelas.setPixelSize(18)
+        self.fonte_estrelas.setBold(True)
+        self._larguras = {}  # cache de largura de texto por (fonte, texto)
+        self._pos_mouse = None
+
+    def _largura(self, fonte, texto):
+        chave = (id(fonte), texto)
+        largura = self._larguras.get(chave)
+        if largura is None:
+            largura = QFontMetrics(fonte).horizontalAdvance(texto)
+            self._larguras[chave] = largura
+        return largura
+
+    @staticmethod
+    def tipo_link(item):
+        uris = item.get('uris', [])
+        if not uris:
+            return DownloadItemDelegate.BOTAO_SEM_LINK
+        if any(u.startswith('magnet:') or u.endswith('.torrent') for u in uris):
+            return DownloadItemDelegate.BOTAO_TORRENT
+        return DownloadItemDelegate.BOTAO_LINK
+
+    def _geometria(self, rect, item):
+        """Calcula os retângulos de cada elemento da linha (usado tanto no desenho quanto no clique)"""
+        geo = {}
+        meio = rect.top() + (rect.height() - 2) // 2
+        x = rect.left() + self.MARGEM
+        geo['caixa'] = QRect(x, meio - self.TAMANHO_CAIXA // 2, self.TAMANHO_CAIXA, self.TAMANHO_CAIXA)
+        direita = rect.right() - self.MARGEM
+
+        rating = item.get('rating', 0)
+        if rating > 0:
+            largura = self._largura(self.fonte_estrelas, "★★★★★") + 10
+            geo['estrelas'] = QRect(direita - largura, rect.top(), largura, rect.height() - 2)
+            direita -= largura + self.ESPACO
+
+        texto_editar = self.BOTAO_EDITAR[0]
+        largura = self._largura(self.fonte_botao, texto_editar) + 20
+        geo['editar'] = QRect(direita - largura, meio - self.ALTURA_BOTAO // 2, largura, self.ALTURA_BOTAO)
+        direita -= largura + self.ESPACO
+
+        texto_link = self.tipo_link(item)[0]
+        largura = self._largura(self.fonte_botao, texto_link) + 20
+        geo['link'] = QRect(direita - largura, meio - self.ALTURA_BOTAO // 2, largura, self.ALTURA_BOTAO)
+        direita -= largura + self.ESPACO
+
+        inicio_titulo = geo['caixa'].right() + self.ESPACO
+        geo['titulo'] = QRect(inicio_titulo, rect.top(), max(0, direita - inicio_titulo), rect.height() - 2)
+        return geo
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ALTURA_LINHA)
+
+    def _desenhar_botao(self, painter, rect, estilo, hover, habilitado=True):
+        texto, fundo, fundo_hover, cor_texto = estilo
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(fundo_hover if hover and habilitado else fundo))
+        painter.drawRoundedRect(rect, 3, 3)
+        painter.setPen(QColor(cor_texto))
+        painter.setFont(self.fonte_botao)
+        painter.drawText(rect, Qt.AlignCenter, texto)
+
+    def paint(self, painter, option, index):
+        item = index.model().item_em(index.row())
+        if item is None:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = option.rect
+
+        # Fundo com alternância de cor (zebra striping) e separador de 2px
+        if option.state & QStyle.State_Selected:
+            fundo = QColor('#0078d7')
+        elif option.state & QStyle.State_MouseOver:
+            fundo = QColor('#2a2f36')
+        else:
+            fundo = QColor('#23262e') if index.row() % 2 == 0 else QColor('#1b1e25')
+        painter.fillRect(rect.adjusted(0, 0, 0, -2), fundo)
+        painter.fillRect(QRect(rect.left(), rect.bottom() - 1, rect.width(), 2), QColor('#2c3e50'))
+
+        geo = self._geometria(rect, item)
+        mouse = self._pos_mouse if option.state & QStyle.State_MouseOver else None
+
+        # Caixa de seleção
+        caixa = geo['caixa']
+        marcado = index.data(Qt.CheckStateRole) == Qt.Checked
+        if marcado:
+            painter.setPen(QPen(QColor('#66c0f4'), 2))
+            painter.setBrush(QColor('#66c0f4'))
+        else:
+            cor_borda = '#66c0f4' if mouse is not None and caixa.contains(mouse) else '#555'
+            painter.setPen(QPen(QColor(cor_borda), 2))
+            painter.setBrush(QColor('#23262e'))
+        painter.drawRoundedRect(caixa, 3, 3)
+        if marcado:
+            painter.setPen(QPen(Qt.white, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+            x, y = caixa.left(), caixa.top()
+            painter.drawPolyline(QPoint(x + 3, y + 8), QPoint(x + 7, y + 12), QPoint(x + 13, y + 4))
+
+        # Título e tamanho
+        file_size = item.get('fileSize', '')
+        size_text = f' [{file_size}]' if file_size else ""
+        texto = f"{item.get('title', 'Sem título')}{size_text}"
+        painter.setFont(self.fonte_titulo)
+        painter.setPen(QColor('#ffffff') if option.state & QStyle.State_Selected else QColor('#c7d5e0'))
+        texto = QFontMetrics(self.fonte_titulo).elidedText(texto, Qt.ElideRight, geo['titulo'].width())
+        painter.drawText(geo['titulo'], Qt.AlignVCenter | Qt.AlignLeft, texto)
+
+        # Botões de link e de edição
+        estilo_link = self.tipo_link(item)
+        self._desenhar_botao(painter, geo['link'], estilo_link,
+                             mouse is not None and geo['link'].contains(mouse),
+                             habilitado=estilo_link is not self.BOTAO_SEM_LINK)
+        self._desenhar_botao(painter, geo['editar'], self.BOTAO_EDITAR,
+                             mouse is not None and geo['editar'].contains(mouse))
+
+        # Estrelas de avaliação
+        if 'estrelas' in geo:
+            rating = item.get('rating', 0)
+            painter.setFont(self.fonte_estrelas)
+            painter.setPen(QColor('#ffd700'))
+            painter.drawText(geo['estrelas'], Qt.AlignCenter, "★" * rating + "☆" * (5 - rating))
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """Hit-testing dos elementos desenhados: caixa de seleção e botões"""
+        if event.type() == QEvent.MouseMove:
+            self._pos_mouse = event.pos()
+            if self.parent() is not None:
+                self.parent().viewport().update()
+            return False
+        if event.type() not in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease) or event.button() != Qt.LeftButton:
+            return False
+        item = model.item_em(index.row())
+        if item is None:
+            return False
+        geo = self._geometria(option.rect, item)
+        pos = event.pos()
+        alvo = None
+        if geo['caixa'].contains(pos):
+            alvo = 'caixa'
+        elif geo['link'].contains(pos) and self.tipo_link(item) is not self.BOTAO_SEM_LINK:
+            alvo = 'link'
+        elif geo['editar'].contains(pos):
+            alvo = 'editar'
+        if alvo is None:
+            return False
+        # Consome o press para não alterar a seleção; a ação acontece no release
+        if event.type() == QEvent.MouseButtonRelease:
+            if alvo == 'caixa':
+                model.alternar_marcado(index)
+            elif alvo == 'link':
+                self.link_clicado.emit(item)
+            else:
+                self.editar_clicado.emit(item)
+        return True
+
 class JsonEditorApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -265,18 +1291,49 @@ class JsonEditorApp(QMainWindow):
         self.setWindowState(Qt.WindowMaximized)
         self.dados = None
         self.arquivo_atual = None
+        self.diario = None  # EditJournal de arquivo_atual, enquanto a lista em memória = arquivo + diário
+        self.posicoes_diario = None  # id(item) -> posição na lista, montado na primeira edição registrada
         self.todos_downloads = []
         self.filtered_downloads = []
-        self.current_page = 1
-        self.items_per_page = 400
+        self.indice_busca = TitleSearchIndex()
+        self.indice_aproximado = FuzzyTitleIndex()  # Montado só na primeira busca aproximada
+        self.geracao_busca = 0  # Identifica a busca mais recente; resultados de buscas antigas são descartados
+        self.busca_anterior = None  # (termo, resultados, versão do índice) para refinar a próxima busca
+        self.buscas_ativas = []
+        self.busca_pendente = False  # a barra de progresso está em "Buscando..."
+        self.geracao_carregamento = 0  # Identifica o carregamento de lista mais recente
+        self.carregamentos_ativos = []
+        self.carregamento = None  # (dados anteriores, arquivo anterior, ao_concluir, mensagem de erro)
         self.tema_escuro = True
-        self.is_downloading = False  # Flag para controlar downloads
         self.link_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'link')
         if not os.path.exists(self.link_dir):
             os.makedirs(self.link_dir)
+        self.gerenciador_downloads = DownloadManager(pasta_torrents=os.path.join(self.link_dir, 'torrents'))
+        self.gerenciador_downloads.job_alterado.connect(self.download_alterado)
+        self.modelo_downloads = DownloadJobsModel(self.gerenciador_downloads.fila)
+        self.gerenciador_downloads.progresso_alterado.connect(self.modelo_downloads.progresso_alterado)
+        self.gerenciador_downloads.fila_alterada.connect(self.fila_downloads_alterada)
+        self.gerenciador_downloads.job_finalizado.connect(self.download_finalizado)
+        self.downloads_avisados = set()  # jobs já incluídos no aviso de fim da fila
+        self.cache_comunidade = os.path.join(self.link_dir, 'comunidade.kdmc')
+        self.meta_comunidade = os.path.join(self.link_dir, 'comunidade.meta.json')  # ETag/Last-Modified da versão em cache
+        self.config_limites = os.path.join(self.link_dir, 'limites.json')
+        self.taxa_manual, self.agenda_banda = carregar_limites(self.config_limites)  # bytes/s e limites por horário
+        self.config_saida = os.path.join(self.link_dir, 'formato_saida.json')
+        self.perfil_saida = carregar_perfil(self.config_saida)  # json_output: legível, compacto, gzip...
+        self.dados_comunidade = None  # dados da lista da comunidade, enquanto ela estiver aberta
+        self.worker_comunidade = None
 
         # Inicializa a interface
         self.init_ui()
+        self.abrir_cache_comunidade()
+
+        # A agenda de limites é conferida a cada 30 s (basta para horários em minutos)
+        self.timer_agenda = QTimer(self)
+        self.timer_agenda.setInterval(30000)
+        self.timer_agenda.timeout.connect(self.aplicar_limite_banda)
+        self.timer_agenda.start()
+        self.aplicar_limite_banda()
         
         # Aplica o tema após um pequeno delay para garantir que todos os widgets foram criados
         QTimer.singleShot(100, self.aplicar_tema)
@@ -303,6 +1360,16 @@ class JsonEditorApp(QMainWindow):
         menu_exportar = menu_arquivo.addMenu('📤 Exportar')
         menu_exportar.addAction('Exportar JSON (com estrelas)', self.salvar_como)
         menu_exportar.addAction('Exportar JSON (sem estrelas)', self.exportar_json_sem_estrelas)
+
+        # Formato usado ao salvar, exportar e unir
+        menu_formato = menu_arquivo.addMenu('🗜️ Formato ao salvar')
+        self.acoes_formato = {}
+        for perfil, (nome, extensao) in PERFIS.items():
+            acao = menu_formato.addAction(f'{nome} ({extensao})')
+            acao.setCheckable(True)
+            acao.setChecked(perfil == self.perfil_saida)
+            acao.triggered.connect(lambda _, p=perfil: self.definir_perfil_saida(p))
+            self.acoes_formato[perfil] = acao
         
         menu_arquivo.addSeparator()
         menu_arquivo.addAction('🚪 Sair', self.close)
@@ -312,8 +1379,8 @@ class JsonEditorApp(QMainWindow):
         acao_sobre.triggered.connect(self.mostrar_sobre)
         
         menu_comunidade = menubar.addMenu('Comunidade')
-        acao_atualizar = menu_comunidade.addAction('Atualizar lista da comunidade')
-        acao_atualizar.triggered.connect(self.atualizar_lista_comunidade)
+        self.acao_atualizar_comunidade = menu_comunidade.addAction('Atualizar lista da comunidade')
+        self.acao_atualizar_comunidade.triggered.connect(self.atualizar_lista_comunidade)
 
         # Topo: nome e botões de tema
         top_layout = QHBoxLayout()
@@ -349,6 +1416,11 @@ class JsonEditorApp(QMainWindow):
         self.btn_unir = QPushButton('Unir JSON')
         self.btn_unir.clicked.connect(self.unir_arquivos)
         btn_layout.addWidget(self.btn_unir)
+        self.btn_duplicados = QPushButton('🧹 Repetidos')
+        self.btn_duplicados.setToolTip('Procura itens repetidos (mesmo magnet ou títulos parecidos)')
+        self.btn_duplicados.clicked.connect(lambda: self.procurar_duplicados())
+        self.btn_duplicados.setEnabled(False)
+        btn_layout.addWidget(self.btn_duplicados)
         self.btn_excluir = QPushButton('Excluir Selecionado')
         self.btn_excluir.clicked.connect(self.excluir_selecionado)
         self.btn_excluir.setEnabled(False)
@@ -369,6 +1441,10 @@ class JsonEditorApp(QMainWindow):
         self.btn_desmarcar_todos.clicked.connect(self.desmarcar_todos)
         self.btn_desmarcar_todos.setEnabled(False)
         selection_layout.addWidget(self.btn_desmarcar_todos)
+        self.btn_baixar_marcados = QPushButton('⬇️ Baixar Marcados')
+        self.btn_baixar_marcados.clicked.connect(self.baixar_marcados)
+        self.btn_baixar_marcados.setEnabled(False)
+        selection_layout.addWidget(self.btn_baixar_marcados)
         selection_layout.addStretch()
         layout.addLayout(selection_layout)
 
@@ -376,42 +1452,69 @@ class JsonEditorApp(QMainWindow):
         search_layout = QHBoxLayout()
         search_layout.addWidget(QLabel('Buscar:'))
         self.search_entry = QLineEdit()
-        self.search_entry.setPlaceholderText("Digite o termo e pressione Enter ou clique em Buscar")
-        self.search_entry.textChanged.connect(self.verificar_busca_limpa)
+        self.search_entry.setPlaceholderText("Digite para buscar (a lista filtra enquanto você digita)")
+        self.search_entry.textChanged.connect(self.agendar_busca)
         self.search_entry.returnPressed.connect(self.iniciar_busca)
         search_layout.addWidget(self.search_entry)
+        self.chk_busca_aproximada = QCheckBox("Busca aproximada")
+        self.chk_busca_aproximada.setToolTip("Tolera erros de digitação, pontuação e tags de repack/edição, ordenando pelos mais parecidos")
+        self.chk_busca_aproximada.toggled.connect(lambda _: self.iniciar_busca())
+        search_layout.addWidget(self.chk_busca_aproximada)
         self.btn_buscar = QPushButton("Buscar")
         self.btn_buscar.clicked.connect(self.iniciar_busca)
         search_layout.addWidget(self.btn_buscar)
         layout.addLayout(search_layout)
 
-        # Controles de Paginação
-        self.pagination_widget = QWidget()
-        pagination_layout = QHBoxLayout(self.pagination_widget)
-        self.btn_anterior = QPushButton("<< Anterior")
-        self.btn_anterior.clicked.connect(self.pagina_anterior)
-        self.page_label = QLabel("Página 1 / 1")
-        self.btn_proxima = QPushButton("Próximo >>")
-        self.btn_proxima.clicked.connect(self.proxima_pagina)
-        pagination_layout.addStretch()
-        pagination_layout.addWidget(self.btn_anterior)
-        pagination_layout.addWidget(self.page_label)
-        pagination_layout.addWidget(self.btn_proxima)
-        pagination_layout.addStretch()
-        pagination_layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.pagination_widget)
+        # Espera o usuário parar de digitar antes de disparar a busca
+        self.timer_busca = QTimer(self)
+        self.timer_busca.setSingleShot(True)
+        self.timer_busca.setInterval(250)
+        self.timer_busca.timeout.connect(self.executar_busca)
+
+        # Navegação rápida (a lista é virtualizada: só as linhas visíveis são desenhadas)
+        self.navegacao_widget = QWidget()
+        navegacao_layout = QHBoxLayout(self.navegacao_widget)
+        navegacao_layout.addStretch()
+        navegacao_layout.addWidget(QLabel("Ir para o item:"))
+        self.spin_ir_para = QSpinBox()
+        self.spin_ir_para.setRange(1, 1)
+        self.spin_ir_para.setMinimumWidth(100)
+        navegacao_layout.addWidget(self.spin_ir_para)
+        self.btn_ir_para = QPushButton("Ir")
+        self.btn_ir_para.clicked.connect(self.ir_para_item)
+        navegacao_layout.addWidget(self.btn_ir_para)
+        navegacao_layout.addStretch()
+        navegacao_layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.navegacao_widget)
 
         # Lista e contador
         self.label_contador = QLabel('Total de itens: 0')
         layout.addWidget(self.label_contador)
-        self.lista = QListWidget()
-        self.lista.itemDoubleClicked.connect(self.abrir_popup_edicao)
-        self.lista.setSelectionMode(QListWidget.ExtendedSelection)
-        self.lista.setAlternatingRowColors(True)
+        # QTableView de uma coluna com altura de linha fixa: a rolagem é virtual de verdade
+        # (o Qt não percorre as 200 mil linhas para montar o layout, como o QListView faz)
+        self.lista = QTableView()
+        self.lista.horizontalHeader().hide()
+        self.lista.verticalHeader().hide()
+        self.lista.horizontalHeader().setStretchLastSection(True)
+        self.lista.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.lista.verticalHeader().setDefaultSectionSize(DownloadItemDelegate.ALTURA_LINHA)
+        self.lista.setShowGrid(False)
+        self.lista.setWordWrap(False)
+        self.lista.setSelectionBehavior(QTableView.SelectRows)
+        self.modelo_lista = DownloadListModel(self)
+        self.modelo_lista.selecao_alterada.connect(self.verificar_selecao)
+        self.delegate_lista = DownloadItemDelegate(self.lista)
+        self.delegate_lista.link_clicado.connect(self.mostrar_opcoes_link)
+        self.delegate_lista.editar_clicado.connect(self.abrir_popup_edicao_direto)
+        self.lista.setModel(self.modelo_lista)
+        self.lista.setItemDelegate(self.delegate_lista)
+        self.lista.setMouseTracking(True)
+        self.lista.doubleClicked.connect(self.abrir_popup_edicao)
+        self.lista.setSelectionMode(QTableView.ExtendedSelection)
         self.lista.setContextMenuPolicy(Qt.CustomContextMenu)
         self.lista.customContextMenuRequested.connect(self.mostrar_menu_contexto)
         self.lista.setStyleSheet("""
-            QListWidget {
+            QTableView {
                 background-color: #181c20;
                 border: 1px solid #222;
                 border-radius: 4px;
@@ -419,54 +1522,63 @@ class JsonEditorApp(QMainWindow):
                 color: #fff;
                 outline: none;
             }
-            QListWidget::item {
-                padding: 8px;
-                margin: 2px 0;
-                border-radius: 4px;
-                color: #fff;
-                background: transparent;
-                border: none;
-            }
-            QListWidget::item:selected {
-                background-color: #0078d7;
-                color: #fff;
-            }
-            QListWidget::item:alternate {
-                background-color: #23272b;
-                color: #fff;
-            }
-            QListWidget::item:hover {
-                background-color: #222;
-                color: #fff;
-            }
-            QListWidget::item:focus {
-                border: none;
-                outline: none;
-            }
         """)
         layout.addWidget(self.lista)
 
-        # Seção de Progresso de Download (inicialmente oculta)
-        self.download_progress_frame = QFrame()
-        self.download_progress_frame.setFrameStyle(QFrame.StyledPanel)
-        download_layout = QGridLayout(self.download_progress_frame)
-        
-        self.download_title_label = QLabel("Download em andamento...")
+        # Painel de downloads (aparece quando há downloads na fila)
+        self.painel_downloads = QFrame()
+        self.painel_downloads.setFrameStyle(QFrame.StyledPanel)
+        download_layout = QVBoxLayout(self.painel_downloads)
+
+        download_topo = QHBoxLayout()
+        self.download_title_label = QLabel("Downloads")
         self.download_title_label.setStyleSheet("font-weight: bold;")
-        self.download_progress_bar = QProgressBar()
-        self.download_stats_label = QLabel("")
-        self.download_torrent_stats_label = QLabel("")
-        self.download_cancel_button = QPushButton("Cancelar Download")
-        self.download_cancel_button.clicked.connect(self.cancelar_download)
-
-        download_layout.addWidget(self.download_title_label, 0, 0, 1, 2)
-        download_layout.addWidget(self.download_progress_bar, 1, 0, 1, 2)
-        download_layout.addWidget(self.download_stats_label, 2, 0, 1, 2)
-        download_layout.addWidget(self.download_torrent_stats_label, 3, 0, 1, 2)
-        download_layout.addWidget(self.download_cancel_button, 4, 0, 1, 2)
-        
-        layout.addWidget(self.download_progress_frame)
-        self.download_progress_frame.setVisible(False)
+        download_topo.addWidget(self.download_title_label)
+        download_topo.addStretch()
+        self.label_agenda = QLabel("")
+        download_topo.addWidget(self.label_agenda)
+        download_topo.addWidget(QLabel("Limite total:"))
+        self.spin_limite_total = QSpinBox()
+        self.spin_limite_total.setRange(0, 10000000)
+        self.spin_limite_total.setSingleStep(100)
+        self.spin_limite_total.setSuffix(" KB/s")
+        self.spin_limite_total.setSpecialValueText("sem limite")
+        self.spin_limite_total.setValue(self.taxa_manual // 1024)
+        self.spin_limite_total.valueChanged.connect(self.definir_limite_total)
+        download_topo.addWidget(self.spin_limite_total)
+        btn_agenda = QPushButton("🕒 Agenda...")
+        btn_agenda.clicked.connect(self.editar_agenda_banda)
+        download_topo.addWidget(btn_agenda)
+        download_topo.addWidget(QLabel("Simultâneos:"))
+        self.spin_simultaneos = QSpinBox()
+        self.spin_simultaneos.setRange(1, 16)
+        self.spin_simultaneos.setValue(self.gerenciador_downloads.fila.limite)
+        self.spin_simultaneos.valueChanged.connect(self.gerenciador_downloads.definir_limite)
+        download_topo.addWidget(self.spin_simultaneos)
+        download_layout.addLayout(download_topo)
+
+        self.tabela_downloads = QTableView()
+        self.tabela_downloads.setModel(self.modelo_downloads)
+        self.tabela_downloads.setSelectionBehavior(QTableView.SelectRows)
+        self.tabela_downloads.verticalHeader().setVisible(False)
+        self.tabela_downloads.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tabela_downloads.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tabela_downloads.customContextMenuRequested.connect(self.mostrar_menu_downloads)
+        self.tabela_downloads.setMaximumHeight(180)
+        download_layout.addWidget(self.tabela_downloads)
+
+        download_botoes = QHBoxLayout()
+        for texto, acao in (("⏸ Pausar", self.pausar_downloads), ("▶ Retomar", self.retomar_downloads),
+                            ("✖ Cancelar", self.cancelar_download), ("▲ Subir", lambda: self.mover_downloads(-1)),
+                            ("▼ Descer", lambda: self.mover_downloads(1)), ("🧹 Limpar finalizados", self.limpar_downloads)):
+            botao = QPushButton(texto)
+            botao.clicked.connect(acao)
+            download_botoes.addWidget(botao)
+        download_botoes.addStretch()
+        download_layout.addLayout(download_botoes)
+
+        layout.addWidget(self.painel_downloads)
+        self.painel_downloads.setVisible(False)
 
         # Barra de progresso (para outras operações)
         self.progress_bar = QProgressBar()
@@ -540,7 +1652,7 @@ class JsonEditorApp(QMainWindow):
         QPushButton:pressed {
             background-color: #2a475e;
         }
-        QListWidget {
+        QListWidget, QTableView {
             background: #23262e;
             color: #c7d5e0;
             border: 1px solid #2a475e;
@@ -564,7 +1676,7 @@ class JsonEditorApp(QMainWindow):
         """
         self.setStyleSheet(qss)
         self.label_name.setObjectName('label_name')
-        self.lista.setStyleSheet('QListWidget { background: #23262e; color: #c7d5e0; }')
+        self.lista.setStyleSheet('QTableView { background: #23262e; color: #c7d5e0; }')
         self.search_entry.setStyleSheet('background: #23262e; color: #c7d5e0;')
 
     def editar_nome(self):
@@ -575,228 +1687,160 @@ class JsonEditorApp(QMainWindow):
         if ok and novo_nome.strip():
             self.dados['name'] = novo_nome.strip()
             self.label_name.setText(self.dados['name'])
+            self.invalidar_diario()  # Fica pendente até salvar
 
     def abrir_arquivo(self):
-        caminho, _ = QFileDialog.getOpenFileName(self, 'Abrir arquivo JSON', '', 'Arquivos JSON (*.json);;Todos os arquivos (*)')
+        caminho, _ = QFileDialog.getOpenFileName(self, 'Abrir arquivo JSON', '', FILTRO_JSON)
         if not caminho:
             QMessageBox.information(self, 'Informação', 'Nenhum arquivo foi selecionado.')
             return
-        try:
-            with open(caminho, 'r', encoding='utf-8') as f:
-                self.dados = json.load(f)
+
+        def concluido():
             self.arquivo_atual = caminho
-            self.label_name.setText(self.dados.get('name', '(sem nome)'))
-            self.btn_editar_nome.setEnabled(True)
-            self.btn_adicionar_item.setEnabled(True)
-            self.btn_excluir.setEnabled(True)
-            self.atualizar_lista()
             self.btn_salvar.setEnabled(True)
+            self.abrir_diario()
             num_downloads = len(self.dados.get('downloads', []))
             QMessageBox.information(self, 'Sucesso', f"Arquivo '{caminho}' carregado com sucesso!\nEncontrados {num_downloads} downloads.")
-        except Exception as e:
-            QMessageBox.critical(self, 'Erro', f'Falha ao abrir arquivo:\n{e}')
+
+        self.carregar_lista(caminho, concluido, 'Falha ao abrir arquivo')
+
+    def carregar_lista(self, origem, ao_concluir, mensagem_erro, salvar_em=None):
+        """Carrega uma lista em segundo plano; os itens aparecem na tela conforme são lidos"""
+        self.cancelar_carregamento()
+        self.invalidar_diario()
+        self.carregamento = (self.dados, self.arquivo_atual, ao_concluir, mensagem_erro)
+
+        # Lista vazia que vai crescendo a cada lote (o modelo e o índice aproximado guardam a mesma referência)
+        self.dados = None
+        self.todos_downloads = []
+        self.indice_busca.construir(self.todos_downloads)
+        self.indice_aproximado.preparar(self.todos_downloads)
+        self.search_entry.setText("")
+        self.filtrar_lista()
+        self.label_name.setText('Carregando...')
+        for botao in (self.btn_editar_nome, self.btn_adicionar_item, self.btn_excluir, self.btn_duplicados, self.btn_salvar):
+            botao.setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setFormat("Carregando lista...")
+
+        loader = JsonStreamLoader(origem, self.geracao_carregamento, salvar_em)
+        loader.lote_carregado.connect(self.receber_lote_carregado)
+        loader.progresso.connect(self.progresso_carregamento)
+        loader.concluido.connect(self.concluir_carregamento)
+        loader.falhou.connect(self.falha_carregamento)
+        # Mantém referência às threads até terminarem (inclusive as canceladas)
+        self.carregamentos_ativos = [l for l in self.carregamentos_ativos if not l.isFinished()]
+        self.carregamentos_ativos.append(loader)
+        loader.start()
+
+    def cancelar_carregamento(self):
+        self.geracao_carregamento += 1
+        for loader in self.carregamentos_ativos:
+            loader.stop()
+
+    def receber_lote_carregado(self, geracao, lote):
+        if geracao != self.geracao_carregamento:
+            return  # Lote de um carregamento que já foi substituído
+        if self.filtered_downloads is self.todos_downloads:
+            self.modelo_lista.anexar(lote)  # Estende todos_downloads avisando a view
+        else:
+            self.todos_downloads.extend(lote)
+        self.indice_busca.adicionar_varios(lote)
+        self.indice_aproximado.adicionar_varios(lote)
+
+        self.spin_ir_para.setRange(1, max(1, len(self.filtered_downloads)))
+        self.btn_ir_para.setEnabled(len(self.filtered_downloads) > 0)
+        self.label_contador.setText(f'Total de itens: {len(self.todos_downloads)} | Mostrando: {len(self.filtered_downloads)}')
+
+    def progresso_carregamento(self, geracao, valor, texto):
+        if geracao != self.geracao_carregamento:
+            return
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(valor)
+        self.progress_bar.setFormat(texto)
+
+    def concluir_carregamento(self, geracao, parser):
+        if geracao != self.geracao_carregamento:
+            return
+        ao_concluir = self.carregamento[2]
+        self.carregamento = None
+        self.dados = parser.montar_dados(self.todos_downloads)
+        self.label_name.setText(self.dados.get('name', '(sem nome)'))
+        self.btn_editar_nome.setEnabled(True)
+        self.btn_adicionar_item.setEnabled(True)
+        self.btn_excluir.setEnabled(True)
+        self.btn_duplicados.setEnabled(True)
+        if self.search_entry.text().strip():
+            self.filtrar_lista(manter_posicao=True)  # Busca feita no meio do carregamento não via os últimos lotes
+        else:
+            self.mostrar_itens_filtrados(manter_posicao=True)
+
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(100)
+        self.progress_bar.setFormat(f"Lista carregada: {len(self.todos_downloads)} itens")
+        QTimer.singleShot(3000, lambda: self.progress_bar.setFormat("") if self.progress_bar.value() == 100 else None)
+        ao_concluir()
+
+    def falha_carregamento(self, geracao, erro):
+        if geracao != self.geracao_carregamento:
+            return
+        # Volta para a lista que estava aberta antes
+        self.dados, self.arquivo_atual, _, mensagem_erro = self.carregamento
+        self.carregamento = None
+        self.label_name.setText(self.dados.get('name', '(sem nome)') if self.dados else '(sem nome)')
+        tem_lista = self.dados is not None
+        self.btn_editar_nome.setEnabled(tem_lista)
+        self.btn_adicionar_item.setEnabled(tem_lista)
+        self.btn_excluir.setEnabled(tem_lista)
+        self.btn_duplicados.setEnabled(tem_lista)
+        self.btn_salvar.setEnabled(tem_lista and self.arquivo_atual is not None)
+        self.atualizar_lista()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("")
+        QMessageBox.critical(self, 'Erro', f'{mensagem_erro}:\n{erro}')
 
     def atualizar_lista(self):
         self.todos_downloads = self.dados.get('downloads', []) if self.dados else []
+        # Os índices são montados na primeira busca, na thread de trabalho
+        self.indice_busca.preparar(self.todos_downloads)
+        self.indice_aproximado.preparar(self.todos_downloads)
         self.search_entry.setText("")  # Limpa a busca ao carregar
-        self.filtrar_lista() # A filtragem inicial irá configurar a paginação
+        self.filtrar_lista() # A filtragem inicial preenche o modelo da lista
         
         # Habilitar/desabilitar botões de seleção baseado na presença de dados
         has_data = len(self.todos_downloads) > 0
         self.btn_selecionar_todos.setEnabled(has_data)
         self.btn_desmarcar_todos.setEnabled(has_data)
 
-    def mostrar_pagina_atual(self, is_search_result=False):
-        self.lista.clear()
+    def mostrar_itens_filtrados(self, manter_posicao=False):
+        posicao = self.lista.verticalScrollBar().value()
 
-        if is_search_result:
-            items_to_display = self.filtered_downloads
-            self.pagination_widget.setVisible(False)
+        # O modelo só guarda a referência da lista; a view materializa apenas as linhas visíveis
+        self.modelo_lista.definir_itens(self.filtered_downloads, manter_marcacoes=manter_posicao)
+        if manter_posicao:
+            self.lista.verticalScrollBar().setValue(posicao)
         else:
-            self.pagination_widget.setVisible(True)
-            start_index = (self.current_page - 1) * self.items_per_page
-            end_index = start_index + self.items_per_page
-            items_to_display = self.filtered_downloads[start_index:end_index]
-            
-        total_pages = (len(self.filtered_downloads) + self.items_per_page - 1) // self.items_per_page or 1
-        self.page_label.setText(f"Página {self.current_page} / {total_pages}")
-        self.btn_anterior.setEnabled(self.current_page > 1)
-        self.btn_proxima.setEnabled(self.current_page < total_pages)
-
-        for idx, item in enumerate(items_to_display):
-            titulo = item.get('title', 'Sem título')
-            uris = item.get('uris', [])
-            file_size = item.get('fileSize', '')
+            self.lista.scrollToTop()
 
-            # Criar widget container
-            container = QWidget()
-            layout = QHBoxLayout(container)
-            layout.setContentsMargins(8, 6, 8, 6)
-            layout.setSpacing(12)
-
-            # Caixa de seleção
-            checkbox = QCheckBox()
-            checkbox.setStyleSheet("""
-                QCheckBox {
-                    color: #c7d5e0;
-                    spacing: 8px;
-                }
-                QCheckBox::indicator {
-                    width: 16px;
-                    height: 16px;
-                    border: 2px solid #555;
-                    border-radius: 3px;
-                    background-color: #23262e;
-                }
-                QCheckBox::indicator:checked {
-                    background-color: #66c0f4;
-                    border-color: #66c0f4;
-                    image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iMTIiIHZpZXdCb3g9IjAgMCAxMiAxMiIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHBhdGggZD0iTTEwIDNMNC41IDguNUwyIDYiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
-                }
-                QCheckBox::indicator:unchecked:hover {
-                    border-color: #66c0f4;
-                }
-            """)
-            checkbox.stateChanged.connect(self.verificar_selecao)
-            layout.addWidget(checkbox, 0)  # No stretch
-
-            # Label para o título e tamanho
-            size_text = f' [{file_size}]' if file_size else ""
-            titulo_label = QLabel(f"{titulo}{size_text}")
-            titulo_label.setStyleSheet("color: #c7d5e0; font-weight: bold;")
-            titulo_label.setWordWrap(True)
-            layout.addWidget(titulo_label, 1)  # Stretch factor 1
-
-            # Botão para link/torrent
-            if not uris:
-                link_btn = QPushButton("[Sem Link]")
-                link_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #555555;
-                        color: #999999;
-                        border: none;
-                        padding: 5px 10px;
-                        border-radius: 3px;
-                        font-size: 11px;
-                    }
-                    QPushButton:hover {
-                        background-color: #666666;
-                    }
-                """)
-                link_btn.setEnabled(False)
-            elif any(u.startswith('magnet:') or u.endswith('.torrent') for u in uris):
-                link_btn = QPushButton("🔗 Torrent")
-                link_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #27ae60;
-                        color: white;
-                        border: none;
-                        padding: 5px 10px;
-                        border-radius: 3px;
-                        font-size: 11px;
-                        font-weight: bold;
-                    }
-                    QPushButton:hover {
-                        background-color: #2ecc71;
-                    }
-                    QPushButton:pressed {
-                        background-color: #229954;
-                    }
-                """)
-                # Conectar o botão para abrir o torrent
-                link_btn.clicked.connect(lambda checked, item_data=item: self.mostrar_opcoes_link(item_data))
-            else:
-                link_btn = QPushButton("📥 Link")
-                link_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #e74c3c;
-                        color: white;
-                        border: none;
-                        padding: 5px 10px;
-                        border-radius: 3px;
-                        font-size: 11px;
-                        font-weight: bold;
-                    }
-                    QPushButton:hover {
-                        background-color: #c0392b;
-                    }
-                    QPushButton:pressed {
-                        background-color: #a93226;
-                    }
-                """)
-                # Conectar o botão para baixar o arquivo
-                link_btn.clicked.connect(lambda checked, item_data=item: self.mostrar_opcoes_link(item_data))
-
-            # Botão de editar
-            edit_btn = QPushButton("✏️ Editar")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #3498db;
-                    color: white;
-                    border: none;
-                    padding: 5px 10px;
-                    border-radius: 3px;
-                    font-size: 11px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #2980b9;
-                }
-                QPushButton:pressed {
-                    background-color: #21618c;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, item_data=item: self.abrir_popup_edicao_direto(item_data))
-
-            layout.addWidget(link_btn, 0)  # No stretch
-            layout.addWidget(edit_btn, 0)  # No stretch
-
-            # Exibir estrelas de avaliação se existir
-            rating = item.get('rating', 0)
-            if rating > 0:
-                rating_label = QLabel()
-                rating_text = "★" * rating + "☆" * (5 - rating)
-                rating_label.setText(rating_text)
-                rating_label.setStyleSheet("""
-                    QLabel {
-                        color: #ffd700;
-                        font-size: 18px;
-                        font-weight: bold;
-                        padding: 5px;
-                    }
-                """)
-                layout.addWidget(rating_label, 0)  # No stretch
-
-            # Criar o item da lista
-            list_item = QListWidgetItem()
-            list_item.setData(Qt.UserRole, item)
-            
-            # Alternância de cor de fundo (zebra striping)
-            if idx % 2 == 0:
-                list_item.setBackground(QColor('#23262e'))
-            else:
-                list_item.setBackground(QColor('#1b1e25'))
-            
-            self.lista.addItem(list_item)
-            self.lista.setItemWidget(list_item, container)
-            
-            # Ajustar altura do item
-            container.adjustSize()
-            list_item.setSizeHint(container.sizeHint())
-            
-            # Adicionar separador visual (exceto para o último item)
-            if idx < len(items_to_display) - 1:
-                separator_item = QListWidgetItem()
-                separator_item.setFlags(Qt.NoItemFlags)  # Item não selecionável
-                separator_item.setBackground(QColor('#2c3e50'))
-                separator_item.setSizeHint(QSize(0, 2))  # Altura de 2 pixels
-                self.lista.addItem(separator_item)
+        self.spin_ir_para.setRange(1, max(1, len(self.filtered_downloads)))
+        self.btn_ir_para.setEnabled(len(self.filtered_downloads) > 0)
         
         self.label_contador.setText(f'Total de itens: {len(self.todos_downloads)} | Mostrando: {len(self.filtered_downloads)}')
         
         # Verificar seleção após atualizar a lista
         self.verificar_selecao()
 
+    def ir_para_item(self):
+        """Rola a lista até o item informado (posição na lista filtrada, começando em 1)"""
+        row = self.spin_ir_para.value() - 1
+        index = self.modelo_lista.index(row)
+        if not index.isValid():
+            return
+        self.lista.scrollTo(index, QTableView.PositionAtTop)
+        self.lista.setCurrentIndex(index)
+        self.lista.setFocus()
+
     def mostrar_opcoes_link(self, item_data):
         """Mostra uma janela de diálogo com opções para copiar links ou baixar"""
         uris = item_data.get('uris', [])
@@ -997,183 +2041,75 @@ class JsonEditorApp(QMainWindow):
             except Exception as e:
                 QMessageBox.warning(self, 'Erro ao Copiar', f'Não foi possível copiar os links: {str(e)}')
         else:
-            QMessageBox.warning(self, 'Erro', 'Funcionalidade de copiar não disponível. Instale pyperclip.')
-    
-    def baixar_arquivo_direto(self, url):
-        """Inicia download direto de um arquivo"""
-        # Selecionar pasta de destino
-        save_dir = QFileDialog.getExistingDirectory(
-            self, 'Selecionar pasta de destino'
-        )
-        if not save_dir:
-            return
-            
-        filename = os.path.basename(url.split('?')[0])
-        if not filename:
-            filename = "download"
-
-        self.download_title_label.setText(f"Baixando: {filename}")
-        self.download_file(url, save_dir)
-
-    def filtrar_lista(self):
-        termo = self.search_entry.text().lower()
-        
-        if termo:
-            # Busca em todos os itens, desliga paginação
-            self.filtered_downloads = [
-                item for item in self.todos_downloads 
-                if termo in item.get('title', 'Sem título').lower()
-            ]
-            self.mostrar_pagina_atual(is_search_result=True)
-        else:
-            # Sem busca, reativa paginação
-            self.filtered_downloads = self.todos_downloads
-            self.current_page = 1
-            self.mostrar_pagina_atual()
-
-    def abrir_popup_edicao(self, item):
-        item_data = item.data(Qt.UserRole) # Pega o item diretamente
-        if not item_data:
-            return
-
-        # Cria a janela de edição
-        dialog = QDialog(self)
-        dialog.setWindowTitle(f"Editando: {item_data.get('title', '')}")
-        dialog.setMinimumWidth(600)
-        layout = QVBoxLayout(dialog)
-
-        # Campos de edição
-        campos = {}
-
-        # Title
-        layout.addWidget(QLabel("title:"))
-        entry_title = QLineEdit()
-        entry_title.setText(item_data.get('title', ''))
-        layout.addWidget(entry_title)
-        campos['title'] = entry_title
-
-        # URIs (lista multiline)
-        layout.addWidget(QLabel("uris (uma URI por linha):"))
-        text_uris = QTextEdit()
-        text_uris.setPlainText('\n'.join(item_data.get('uris', [])))
-        text_uris.setMaximumHeight(100)
-        layout.addWidget(text_uris)
-        campos['uris'] = text_uris
-
-        # uploadDate
-        layout.addWidget(QLabel("uploadDate:"))
-        entry_uploadDate = QLineEdit()
-        entry_uploadDate.setText(item_data.get('uploadDate', ''))
-        layout.addWidget(entry_uploadDate)
-        campos['uploadDate'] = entry_uploadDate
-
-        # fileSize
-        layout.addWidget(QLabel("fileSize:"))
-        entry_fileSize = QLineEdit()
-        entry_fileSize.setText(item_data.get('fileSize', ''))
-        layout.addWidget(entry_fileSize)
-        campos['fileSize'] = entry_fileSize
-
-        # repackLinkSource (opcional)
-        layout.addWidget(QLabel("repackLinkSource (opcional):"))
-        entry_repack = QLineEdit()
-        entry_repack.setText(item_data.get('repackLinkSource', ''))
-        layout.addWidget(entry_repack)
-        campos['repackLinkSource'] = entry_repack
-
-        # Nota (1-5 estrelas)
-        layout.addWidget(QLabel("Nota (1-5 estrelas):"))
-        nota_layout = QHBoxLayout()
-
-        estrelas = []
-        rating_atual = item_data.get('rating', 0)
-        # Usar um dicionário para contornar o problema de escopo do lambda
-        nota_selecionada = {'value': rating_atual}
-
-        def atualizar_estrelas(idx, b_estrelas):
-            nota_selecionada['value'] = idx + 1
-            for i, btn in enumerate(b_estrelas):
-                if i <= idx:
-                    btn.setText("★")
-                    btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: transparent;
-                            border: none;
-                            font-size: 26px;
-                            color: #ffd700;
-                        }
-                    """)
-                else:
-                    btn.setText("☆")
-                    btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: transparent;
-                            border: none;
-                            font-size: 26px;
-                            color: #888;
-                        }
-                        QPushButton:hover {
-                            color: #ffd700;
-                        }
-                    """)
-        
-        for i in range(5):
-            estrela_btn = QPushButton("☆")
-            estrela_btn.setFixedSize(35, 35)
-            # Usamos uma função anônima para capturar o valor de 'i' corretamente
-            estrela_btn.clicked.connect(lambda checked, idx=i, b=estrelas: atualizar_estrelas(idx, b))
-            estrelas.append(estrela_btn)
-            nota_layout.addWidget(estrela_btn)
-        
-        # Define o estado inicial das estrelas
-        if rating_atual > 0:
-            atualizar_estrelas(rating_atual - 1, estrelas)
-        else:
-            atualizar_estrelas(-1, estrelas)
+            QMessageBox.warning(self, 'Erro', 'Funcionalidade de copiar não disponível. Instale pyperclip.')
+    
+    def baixar_arquivo_direto(self, url):
+        """Inicia download direto de um arquivo"""
+        # Selecionar pasta de destino
+        save_dir = QFileDialog.getExistingDirectory(
+            self, 'Selecionar pasta de destino'
+        )
+        if not save_dir:
+            return
 
-        nota_layout.addStretch()
-        layout.addLayout(nota_layout)
-        campos['estrelas'] = estrelas
-        campos['nota_atual'] = nota_selecionada['value']  # Carregar nota atual
+        self.download_file(url, save_dir)
 
-        # Botões
-        btn_layout = QHBoxLayout()
-        btn_salvar = QPushButton('Salvar')
-        btn_cancelar = QPushButton('Cancelar')
-        btn_layout.addWidget(btn_salvar)
-        btn_layout.addWidget(btn_cancelar)
-        layout.addLayout(btn_layout)
+    def baixar_marcados(self):
+        """Coloca na fila o primeiro link direto (ou torrent, com o motor embutido) de cada item marcado"""
+        selected_items = self.modelo_lista.itens_marcados()
+        if not selected_items:
+            QMessageBox.warning(self, 'Aviso', 'Selecione pelo menos um item para baixar.')
+            return
 
-        def salvar_edicao():
-            item_data['title'] = campos['title'].text().strip()
-            uris_novo = campos['uris'].toPlainText().strip()
-            item_data['uris'] = [u.strip() for u in uris_novo.splitlines() if u.strip()]
-            item_data['uploadDate'] = campos['uploadDate'].text().strip()
-            item_data['fileSize'] = campos['fileSize'].text().strip()
-            repack_val = campos['repackLinkSource'].text().strip()
-            if repack_val:
-                item_data['repackLinkSource'] = repack_val
-            elif 'repackLinkSource' in item_data:
-                del item_data['repackLinkSource']
-            
-            # Salvar nota se selecionada
-            nova_nota = nota_selecionada['value']
-            if nova_nota > 0:
-                item_data['rating'] = nova_nota
-            elif 'rating' in item_data:
-                del item_data['rating']
+        links = []
+        sem_link_direto = 0
+        for item in selected_items:
+            uris = [u for u in item.get('uris', []) if isinstance(u, str)]
+            uri = next((u for u in uris if u.startswith(('http://', 'https://')) and not eh_torrent(u)), None)
+            if uri is None and TORRENT_AVAILABLE:
+                uri = next((u for u in uris if eh_torrent(u)), None)
+            if uri is None:
+                sem_link_direto += 1
+            else:
+                links.append((uri, item.get('title')))
+        if not links:
+            if TORRENT_AVAILABLE:
+                QMessageBox.warning(self, 'Aviso', 'Nenhum dos itens marcados tem link direto ou torrent.')
+            else:
+                QMessageBox.warning(self, 'Aviso', 'Nenhum dos itens marcados tem link direto (torrents abrem pelo cliente torrent).')
+            return
 
-            self.filtrar_lista() # Atualiza a lista respeitando a busca/paginação
-            
-            # Salva as alterações no arquivo atual
-            self.salvar_arquivo_atual()
-            
-            dialog.accept()
+        save_dir = QFileDialog.getExistingDirectory(self, 'Selecionar pasta de destino')
+        if not save_dir:
+            return
+        for uri, titulo in links:
+            self.download_file(uri, save_dir, titulo)
+        if sem_link_direto:
+            if TORRENT_AVAILABLE:
+                motivo = 'sem link direto ou torrent ficaram de fora.'
+            else:
+                motivo = 'sem link direto ficaram de fora (torrents abrem pelo cliente torrent em "Copiar Links").'
+            QMessageBox.information(
+                self, 'Downloads',
+                f'{len(links)} download(s) na fila.\n{sem_link_direto} item(ns) {motivo}'
+            )
 
-        btn_salvar.clicked.connect(salvar_edicao)
-        btn_cancelar.clicked.connect(dialog.reject)
+    def filtrar_lista(self, manter_posicao=False):
+        self.cancelar_busca_em_andamento()
+        termo = self.search_entry.text().lower()
+        
+        if termo:
+            # Consulta o índice em vez de varrer todos os títulos
+            self.filtered_downloads = self.indice_ativo().buscar(termo)
+        else:
+            self.filtered_downloads = self.todos_downloads
+        self.mostrar_itens_filtrados(manter_posicao)
 
-        dialog.exec_()
+    def abrir_popup_edicao(self, index):
+        item_data = self.modelo_lista.item_em(index.row()) # Pega o item diretamente do modelo
+        if not item_data:
+            return
+        self.abrir_popup_edicao_direto(item_data)
 
     def abrir_popup_edicao_direto(self, item_data):
         """Abre a janela de edição diretamente com os dados do item"""
@@ -1307,10 +2243,12 @@ class JsonEditorApp(QMainWindow):
             elif 'rating' in item_data:
                 del item_data['rating']
 
-            self.filtrar_lista() # Atualiza a lista respeitando a busca/paginação
+            self.indice_busca.atualizar(item_data)
+            self.indice_aproximado.atualizar(item_data)
+            self.filtrar_lista(manter_posicao=True) # Atualiza a lista respeitando a busca
             
-            # Salva as alterações no arquivo atual
-            self.salvar_arquivo_atual()
+            # Salva a edição (no diário, sem regravar a lista inteira)
+            self.registrar_edicao(item_data)
             
             dialog.accept()
 
@@ -1321,10 +2259,6 @@ class JsonEditorApp(QMainWindow):
 
     def iniciar_download(self, item_data):
         """Inicia o processo de download do item selecionado"""
-        if self.is_downloading:
-            QMessageBox.warning(self, 'Aviso', 'Um download já está em andamento.')
-            return
-
         uris = item_data.get('uris', [])
         if not uris:
             QMessageBox.warning(self, 'Aviso', 'Nenhuma URI disponível para download.')
@@ -1343,10 +2277,10 @@ class JsonEditorApp(QMainWindow):
             uri = uris[0]
             
         # Verificar se é torrent ou arquivo normal
-        is_torrent = uri.startswith('magnet:') or uri.endswith('.torrent')
+        is_torrent = eh_torrent(uri)
         
-        if is_torrent:
-            # Para torrents, abrir cliente externo
+        if is_torrent and not TORRENT_AVAILABLE:
+            # Sem libtorrent, abrir cliente externo
             self.abrir_cliente_torrent(uri, item_data.get('title', 'Torrent'))
         else:
             # Para arquivos normais, continuar com o download interno
@@ -1356,13 +2290,8 @@ class JsonEditorApp(QMainWindow):
             )
             if not save_dir:
                 return
-                
-            filename = os.path.basename(uri.split('?')[0])
-            if not filename:
-                filename = "download"
 
-            self.download_title_label.setText(f"Baixando: {filename}")
-            self.download_file(uri, save_dir)
+            self.download_file(uri, save_dir, item_data.get('title'))
             
     def abrir_cliente_torrent(self, torrent_url, title):
         """Abre um cliente torrent externo com o link fornecido"""
@@ -1505,163 +2434,208 @@ class JsonEditorApp(QMainWindow):
                     f'Não foi possível copiar o link: {str(e)}'
                 )
 
-    def download_file(self, file_url, save_dir):
-        """Inicia download de arquivo normal"""
+    def download_file(self, file_url, save_dir, titulo=None):
+        """Coloca um arquivo normal (ou um torrent, baixado pelo motor embutido) na fila de downloads"""
+        if eh_torrent(file_url):
+            # Os arquivos do torrent ficam dentro da pasta escolhida
+            self.gerenciador_downloads.adicionar(file_url, save_dir, titulo or 'Torrent')
+            return
         # Extrair nome do arquivo da URL
         filename = os.path.basename(file_url.split('?')[0])
         if not filename:
             filename = "download"
         save_path = os.path.join(save_dir, filename)
-        
-        self.is_downloading = True
-        self.download_progress_frame.setVisible(True)
-        self.download_cancel_button.setEnabled(True)
-        
-        # Criar e configurar downloader
-        self.file_downloader = FileDownloader(file_url, save_path)
-        self.file_downloader.progress_updated.connect(
-            self.atualizar_progresso_arquivo
-        )
-        self.file_downloader.download_finished.connect(
-            lambda success, msg: self.finalizar_download(success, msg, is_torrent=False)
+
+        self.gerenciador_downloads.adicionar(file_url, save_path, titulo or filename)
+
+    def download_alterado(self, job):
+        self.modelo_downloads.job_alterado(job)
+        self.atualizar_resumo_downloads()
+
+    def fila_downloads_alterada(self):
+        self.modelo_downloads.recarregar()
+        self.painel_downloads.setVisible(bool(self.gerenciador_downloads.fila.jobs))
+        self.atualizar_resumo_downloads()
+
+    def atualizar_resumo_downloads(self):
+        contagem = {}
+        for job in self.gerenciador_downloads.fila.jobs:
+            contagem[job.estado] = contagem.get(job.estado, 0) + 1
+        partes = [f"{n} {estado.lower()}" for estado, n in contagem.items()]
+        self.download_title_label.setText("Downloads: " + ", ".join(partes) if partes else "Downloads")
+
+    def download_finalizado(self, job):
+        """Avisa uma vez quando a fila esvazia (e não a cada download, com dezenas na fila)"""
+        if self.gerenciador_downloads.em_andamento():
+            return
+        jobs = [j for j in self.gerenciador_downloads.fila.jobs if j.id not in self.downloads_avisados]
+        self.downloads_avisados.update(j.id for j in jobs)
+        concluidos = sum(1 for j in jobs if j.estado == CONCLUIDO)
+        erros = [j for j in jobs if j.estado == ERRO]
+        if erros:
+            detalhes = '\n'.join(f"• {j.titulo}: {j.mensagem}" for j in erros[:10])
+            QMessageBox.critical(self, 'Erro', f'{concluidos} download(s) concluído(s), {len(erros)} com erro:\n{detalhes}')
+        elif concluidos:
+            QMessageBox.information(self, 'Sucesso', f'Download concluído!\n{concluidos} arquivo(s) baixado(s).')
+
+    def downloads_selecionados(self):
+        linhas = sorted({index.row() for index in self.tabela_downloads.selectionModel().selectedRows()})
+        return [self.modelo_downloads.job_em(linha) for linha in linhas]
+
+    def pausar_downloads(self):
+        for job in self.downloads_selecionados():
+            self.gerenciador_downloads.pausar(job)
+
+    def retomar_downloads(self):
+        for job in self.downloads_selecionados():
+            self.gerenciador_downloads.retomar(job)
+
+    def mover_downloads(self, deslocamento):
+        jobs = self.downloads_selecionados()
+        if deslocamento > 0:
+            jobs.reverse()  # Descendo, o de baixo anda primeiro para não trocar de lugar com o vizinho selecionado
+        for job in jobs:
+            self.gerenciador_downloads.mover(job, deslocamento)
+        selecao = self.tabela_downloads.selectionModel()
+        for job in jobs:
+            linha = self.gerenciador_downloads.fila.posicao(job)
+            selecao.select(self.modelo_downloads.index(linha, 0), selecao.Select | selecao.Rows)
+
+    def definir_prioridade_downloads(self, prioridade):
+        for job in self.downloads_selecionados():
+            self.gerenciador_downloads.definir_prioridade(job, prioridade)
+
+    def limitar_downloads(self):
+        jobs = self.downloads_selecionados()
+        kb, ok = QInputDialog.getInt(
+            self, 'Limitar velocidade',
+            'Velocidade máxima de cada download selecionado (KB/s, 0 = sem limite):',
+            jobs[0].limite // 1024, 0, 10000000, 100
         )
-        
-        self.file_downloader.start()
-        
-    def atualizar_progresso_arquivo(self, progress, downloaded, total_size, speed):
-        """Atualiza a interface de progresso para arquivos normais"""
-        self.download_progress_bar.setValue(progress)
-        
-        # Formata as strings de informação
-        if total_size > 0:
-            size_str = f"{downloaded / (1024*1024):.2f} MB / {total_size / (1024*1024):.2f} MB"
+        if ok:
+            for job in jobs:
+                self.gerenciador_downloads.definir_taxa_job(job, kb * 1024)
+
+    def definir_limite_total(self, kb):
+        self.taxa_manual = kb * 1024
+        self.salvar_limites_banda()
+        self.aplicar_limite_banda()
+
+    def aplicar_limite_banda(self):
+        """Aplica o limite da agenda para o horário atual (ou o limite manual, fora da agenda)"""
+        taxa = self.agenda_banda.taxa_em(datetime.now(), self.taxa_manual)
+        self.gerenciador_downloads.definir_taxa_global(taxa)
+        if self.agenda_banda.taxa_em(datetime.now(), None) is None:
+            self.label_agenda.setText("")
         else:
-            size_str = f"{downloaded / (1024*1024):.2f} MB"
-            
-        speed_str = f"{speed / 1024:.1f} KB/s"
-        
-        eta_str = "N/A"
-        if speed > 0 and total_size > 0 and downloaded < total_size:
+            self.label_agenda.setText(f"Agenda: {taxa // 1024} KB/s" if taxa else "Agenda: sem limite")
+
+    def editar_agenda_banda(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle('Agenda de limites')
+        dialog.setMinimumSize(400, 300)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(
+            'Uma regra por linha: HH:MM-HH:MM KB/s (0 = sem limite).\n'
+            'Exemplo: 08:00-18:00 500 limita o total a 500 KB/s durante o dia.\n'
+            'Fora dos horários da agenda vale o "Limite total".'
+        ))
+        texto = QTextEdit()
+        texto.setPlainText(self.agenda_banda.como_texto())
+        layout.addWidget(texto)
+        botoes = QHBoxLayout()
+        btn_salvar = QPushButton('Salvar')
+        btn_cancelar = QPushButton('Cancelar')
+        botoes.addWidget(btn_salvar)
+        botoes.addWidget(btn_cancelar)
+        layout.addLayout(botoes)
+
+        def salvar():
             try:
-                eta = (total_size - downloaded) / speed
-                eta_str = time.strftime('%H:%M:%S', time.gmtime(eta))
-            except (ValueError, OSError):
-                eta_str = "Calculando..."
-
-        stats_str = f"{size_str} | Velocidade: {speed_str} | ETA: {eta_str}"
-        self.download_stats_label.setText(stats_str)
-        self.download_torrent_stats_label.setText("")
-        
-    def finalizar_download(self, success, message, is_torrent=False):
-        """Finaliza o download e restaura a interface"""
-        self.is_downloading = False
-        self.download_progress_frame.setVisible(False)
-        self.download_cancel_button.setEnabled(False)
-        
-        if success:
-            QMessageBox.information(self, 'Sucesso', f'Download concluído!\n{message}')
-        else:
-            if "cancelado" not in message.lower():
-                QMessageBox.critical(self, 'Erro', f'Erro no download:\n{message}')
-            
-        # Parar o downloader
-        if is_torrent and hasattr(self, 'torrent_downloader'):
-            self.torrent_downloader.stop()
-        elif not is_torrent and hasattr(self, 'file_downloader'):
-            self.file_downloader.stop()
-
-    def atualizar_progresso(self, valor, texto=""):
-        """Atualiza a barra de progresso e o texto"""
-        self.progress_bar.setValue(int(valor))
-        self.progress_bar.setFormat(texto)
-        QApplication.processEvents()
+                self.agenda_banda = BandwidthSchedule.de_texto(texto.toPlainText())
+            except ValueError as e:
+                QMessageBox.warning(dialog, 'Agenda inválida', str(e))
+                return
+            self.salvar_limites_banda()
+            self.aplicar_limite_banda()
+            dialog.accept()
+
+        btn_salvar.clicked.connect(salvar)
+        btn_cancelar.clicked.connect(dialog.reject)
+        dialog.exec_()
 
-    def baixar_e_salvar_json(self, url):
-        """Baixa um JSON de uma URL e salva localmente"""
+    def definir_perfil_saida(self, perfil):
+        self.perfil_saida = perfil
+        for chave, acao in self.acoes_formato.items():
+            acao.setChecked(chave == perfil)
         try:
-            # Gera um nome de arquivo único baseado na URL
-            url_hash = hashlib.md5(url.encode()).hexdigest()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{url_hash}_{timestamp}.json"
-            filepath = os.path.join(self.link_dir, filename)
-
-            # Verifica se já existe uma versão recente (menos de 1 hora)
-            for existing_file in os.listdir(self.link_dir):
-                if existing_file.startswith(url_hash):
-                    existing_path = os.path.join(self.link_dir, existing_file)
-                    file_time = os.path.getmtime(existing_path)
-                    if (datetime.now().timestamp() - file_time) < 3600:  # 1 hora
-                        print(f"Usando arquivo em cache: {existing_path}")
-                        self.atualizar_progresso(100, "Usando arquivo em cache")
-                        with open(existing_path, 'r', encoding='utf-8') as f:
-                            return json.load(f)
-
-            # Se não encontrou em cache, baixa e salva
-            print(f"Baixando JSON da URL: {url}")
-            self.atualizar_progresso(0, "Iniciando download...")
-            
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            # Calcula o tamanho total do arquivo
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024  # 1 Kibibyte
-            downloaded = 0
-            
-            # Baixa o arquivo em chunks
-            data = bytearray()
-            for chunk in response.iter_content(chunk_size=block_size):
-                if chunk:
-                    data.extend(chunk)
-                    downloaded += len(chunk)
-                    if total_size:
-                        progresso = (downloaded / total_size) * 100
-                        self.atualizar_progresso(
-                            progresso,
-                            f"Baixando: {downloaded}/{total_size} bytes"
-                        )
-            
-            # Processa o JSON
-            self.atualizar_progresso(90, "Processando JSON...")
-            dados = json.loads(data.decode('utf-8'))
-            
-            # Salva o arquivo
-            self.atualizar_progresso(95, "Salvando arquivo...")
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, indent=4, ensure_ascii=False)
+            salvar_perfil(self.config_saida, perfil)
+        except OSError as e:
+            QMessageBox.warning(self, 'Aviso', f'Não foi possível salvar o formato escolhido:\n{e}')
 
-            print(f"Arquivo salvo em: {filepath}")
-            self.atualizar_progresso(100, "Download concluído!")
-            return dados
+    def salvar_limites_banda(self):
+        try:
+            salvar_limites(self.config_limites, self.taxa_manual, self.agenda_banda)
+        except OSError as e:
+            QMessageBox.warning(self, 'Aviso', f'Não foi possível salvar os limites de velocidade:\n{e}')
 
-        except Exception as e:
-            self.atualizar_progresso(0, "Erro no download")
-            raise Exception(f"Erro ao baixar/salvar JSON: {str(e)}")
+    def limpar_downloads(self):
+        self.gerenciador_downloads.remover_finalizados()
+
+    def mostrar_menu_downloads(self, pos):
+        if not self.downloads_selecionados():
+            return
+        menu = QMenu()
+        menu.addAction("⏸ Pausar", self.pausar_downloads)
+        menu.addAction("▶ Retomar", self.retomar_downloads)
+        menu.addAction("✖ Cancelar", self.cancelar_download)
+        menu.addSeparator()
+        menu_prioridade = menu.addMenu("Prioridade")
+        for prioridade, nome in PRIORIDADES.items():
+            menu_prioridade.addAction(nome, lambda p=prioridade: self.definir_prioridade_downloads(p))
+        menu.addAction("🐢 Limitar velocidade...", self.limitar_downloads)
+        menu.exec_(self.tabela_downloads.viewport().mapToGlobal(pos))
+
+    def baixar_e_salvar_json(self, url, ao_concluir):
+        """Carrega um JSON de uma URL, guardando uma cópia local em link_dir"""
+        # Gera um nome de arquivo único baseado na URL
+        url_hash = hashlib.md5(url.encode()).hexdigest()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{url_hash}_{timestamp}.json"
+        filepath = os.path.join(self.link_dir, filename)
+
+        # Verifica se já existe uma versão recente (menos de 1 hora)
+        for existing_file in os.listdir(self.link_dir):
+            if existing_file.startswith(url_hash) and existing_file.endswith('.json'):
+                existing_path = os.path.join(self.link_dir, existing_file)
+                file_time = os.path.getmtime(existing_path)
+                if (datetime.now().timestamp() - file_time) < 3600:  # 1 hora
+                    print(f"Usando arquivo em cache: {existing_path}")
+                    self.carregar_lista(existing_path, ao_concluir, 'Erro ao processar URL')
+                    return
+
+        # Se não encontrou em cache, baixa lendo a lista enquanto os bytes chegam
+        # (os bytes são gravados como vieram em filepath, sem montar o documento em memória)
+        print(f"Baixando JSON da URL: {url}")
+        self.carregar_lista(url, ao_concluir, 'Erro ao baixar/salvar JSON', salvar_em=filepath)
 
     def abrir_de_url(self):
         url, ok = QInputDialog.getText(self, 'Abrir de URL', 'Digite a URL do arquivo JSON:')
         if not ok or not url:
             return
-            
-        try:
-            self.dados = self.baixar_e_salvar_json(url)
-            print(f"Conteúdo baixado: {self.dados}")  # Debug
-            
-            
+
+        def concluido():
             self.arquivo_atual = None  # Não temos arquivo local
-            self.label_name.setText(self.dados.get('name', '(sem nome)'))
-            self.btn_editar_nome.setEnabled(True)
-            self.btn_adicionar_item.setEnabled(True)
-            self.btn_excluir.setEnabled(True)
-            self.atualizar_lista()
             self.btn_salvar.setEnabled(False)  # Desabilita salvar pois não temos arquivo local
-            
+
             # Mostrar quantidade de downloads encontrados
             num_downloads = len(self.dados.get('downloads', []))
             QMessageBox.information(self, 'Sucesso', 
                               f"JSON baixado com sucesso!\n"
                               f"Encontrados {num_downloads} downloads.")
-                              
+
+        try:
+            self.baixar_e_salvar_json(url, concluido)
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f"Erro ao processar URL:\n{e}")
 
@@ -1684,25 +2658,103 @@ class JsonEditorApp(QMainWindow):
             return
 
         try:
-            with open(self.arquivo_atual, 'w', encoding='utf-8') as f:
-                json.dump(self.dados, f, indent=4, ensure_ascii=False)
+            # Compactação: a lista inteira (com as edições do diário) vai para o arquivo, e o diário recomeça
+            if not self.diario_em_dia():
+                self.invalidar_diario()
+                self.diario = EditJournal(self.arquivo_atual)
+            self.diario.compactar(self.dados, self.perfil_saida)
             
             self.statusBar().showMessage(f"Arquivo salvo: {os.path.basename(self.arquivo_atual)}", 3000)
             self.btn_salvar.setEnabled(False) # Desabilita o botão após salvar
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f'Erro ao salvar arquivo:\n{e}')
 
+    def diario_em_dia(self):
+        return self.diario is not None and self.arquivo_atual is not None and self.diario.caminho_lista == self.arquivo_atual
+
+    def invalidar_diario(self):
+        """A lista em memória deixou de ser arquivo + diário (remoção, outra lista...)"""
+        if self.diario is not None:
+            self.diario.fechar()
+            self.diario = None
+        self.posicoes_diario = None
+
+    def posicao_no_diario(self, item):
+        """Posição do item na lista do arquivo, ou None.
+
+        O mapa vale enquanto o diário estiver em dia: remover itens invalida
+        o diário, e os itens novos só entram no fim.
+        """
+        if self.posicoes_diario is None:
+            self.posicoes_diario = {id(d): i for i, d in enumerate(self.dados['downloads'])}
+        return self.posicoes_diario.get(id(item))
+
+    def abrir_diario(self):
+        """Depois de abrir um arquivo local: reaplica as edições que ainda não foram compactadas"""
+        self.diario = EditJournal(self.arquivo_atual)
+        try:
+            registros = self.diario.carregar()
+        except OSError as e:
+            print(f"Não foi possível ler o diário de edições: {e}")
+            self.diario = None
+            return
+        lista = self.dados['downloads']
+        adicionados = []
+        for registro in registros:
+            if 'editar' in registro:
+                posicao = registro['editar']
+                if not 0 <= posicao < len(lista):
+                    break
+                item = lista[posicao]
+                item.clear()
+                item.update(registro['item'])
+                self.indice_busca.atualizar(item)
+                self.indice_aproximado.atualizar(item)
+            elif 'adicionar' in registro:
+                item = DownloadRecord.de_dict(registro['adicionar'])
+                lista.append(item)
+                adicionados.append(item)
+        if adicionados:
+            self.indice_busca.adicionar_varios(adicionados)
+            self.indice_aproximado.adicionar_varios(adicionados)
+        if registros:
+            self.filtrar_lista(manter_posicao=True)
+            self.statusBar().showMessage(f"{len(registros)} edição(ões) recuperada(s) do diário", 5000)
+
+    def registrar_edicao(self, item):
+        """Grava a edição de um item: uma linha no diário; a lista inteira só de tempos em tempos"""
+        if not self.diario_em_dia():
+            self.salvar_arquivo_atual()
+            return
+        posicao = self.posicao_no_diario(item)
+        if posicao is None:
+            self.salvar_arquivo_atual()  # Item que já não está na lista: regrava tudo
+            return
+        try:
+            self.diario.editar(posicao, item)
+        except (OSError, ValueError):
+            self.salvar_arquivo_atual()
+            return
+        if self.diario.precisa_compactar():
+            self.salvar_arquivo_atual()
+        else:
+            self.statusBar().showMessage(f"Edição salva: {os.path.basename(self.arquivo_atual)}", 3000)
+            self.btn_salvar.setEnabled(False)
+
     def salvar_como(self):
         if not self.dados:
             QMessageBox.warning(self, 'Aviso', 'Não há dados para salvar.')
             return
 
-        caminho, _ = QFileDialog.getSaveFileName(self, 'Salvar como...', '', 'Arquivos JSON (*.json);;Todos os arquivos (*)')
+        caminho, _ = QFileDialog.getSaveFileName(self, 'Salvar como...', '', FILTRO_JSON)
         if caminho:
+            caminho = ajustar_extensao(caminho, self.perfil_saida)
             try:
-                with open(caminho, 'w', encoding='utf-8') as f:
-                    json.dump(self.dados, f, indent=4, ensure_ascii=False)
+                self.invalidar_diario()
+                salvar_json(caminho, self.dados, self.perfil_saida)
                 self.arquivo_atual = caminho
+                self.diario = EditJournal(caminho)
+                self.diario.descartar()  # Diário de um arquivo antigo com o mesmo nome não vale mais
                 self.setWindowTitle(f'SuperBase editor e gerenciador - {os.path.basename(caminho)}')
                 QMessageBox.information(self, 'Sucesso', f'Arquivo salvo em:\n{caminho}')
             except Exception as e:
@@ -1715,7 +2767,7 @@ class JsonEditorApp(QMainWindow):
             return
 
         # Cria uma cópia profunda dos dados para não alterar a sessão atual
-        dados_para_exportar = json.loads(json.dumps(self.dados))
+        dados_para_exportar = json.loads(json.dumps(self.dados, default=para_json))
 
         # Remove a chave 'rating' de cada item na lista de downloads
         if 'downloads' in dados_para_exportar:
@@ -1723,28 +2775,18 @@ class JsonEditorApp(QMainWindow):
                 if 'rating' in item:
                     del item['rating']
         
-        caminho, _ = QFileDialog.getSaveFileName(self, 'Exportar como (sem estrelas)...', '', 'Arquivos JSON (*.json);;Todos os arquivos (*)')
+        caminho, _ = QFileDialog.getSaveFileName(self, 'Exportar como (sem estrelas)...', '', FILTRO_JSON)
         if caminho:
+            caminho = ajustar_extensao(caminho, self.perfil_saida)
             try:
-                with open(caminho, 'w', encoding='utf-8') as f:
-                    json.dump(dados_para_exportar, f, indent=4, ensure_ascii=False)
+                salvar_json(caminho, dados_para_exportar, self.perfil_saida)
                 QMessageBox.information(self, 'Sucesso', f'Arquivo exportado (sem estrelas) em:\n{caminho}')
             except Exception as e:
                 QMessageBox.critical(self, 'Erro', f'Falha ao exportar arquivo:\n{e}')
 
     def excluir_selecionado(self):
         # Coletar itens selecionados através das caixas de seleção
-        selected_items = []
-        for i in range(self.lista.count()):
-            item = self.lista.item(i)
-            if item.flags() & Qt.ItemIsSelectable:  # Ignorar separadores
-                widget = self.lista.itemWidget(item)
-                if widget:
-                    # Encontrar a caixa de seleção no widget
-                    for child in widget.findChildren(QCheckBox):
-                        if child.isChecked():
-                            selected_items.append(item)
-                            break
+        selected_items = self.modelo_lista.itens_marcados()
         
         if not selected_items:
             QMessageBox.warning(self, 'Aviso', 'Selecione pelo menos um item para excluir.')
@@ -1757,30 +2799,66 @@ class JsonEditorApp(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            # Pega os dados dos itens a serem removidos
-            items_to_remove = {id(item.data(Qt.UserRole)) for item in selected_items}
+            self.remover_itens(selected_items)
+            QMessageBox.information(self, 'Sucesso', 'Itens excluídos com sucesso!')
 
-            # Filtra a lista de downloads principal, mantendo os que não foram selecionados
+    def remover_itens(self, itens):
+        self.invalidar_diario()  # As remoções ficam pendentes até salvar
+        # Filtra a lista de downloads principal, mantendo os que não foram removidos
+        if isinstance(self.dados['downloads'], MappedDownloadList):
+            # Lista da comunidade: as linhas que ninguém abriu continuam sem decodificar
+            self.dados['downloads'] = self.dados['downloads'].sem(itens)
+        else:
+            items_to_remove = {id(item) for item in itens}
             self.dados['downloads'] = [
                 d for d in self.dados['downloads'] if id(d) not in items_to_remove
             ]
-            
-            # Atualiza a lista na interface
-            self.atualizar_lista()
-            
-            QMessageBox.information(self, 'Sucesso', 'Itens excluídos com sucesso!')
-            
-            # Habilita o botão de salvar após a exclusão
-            self.btn_salvar.setEnabled(True)
+        self.todos_downloads = self.dados['downloads']
+        for indice in (self.indice_busca, self.indice_aproximado):
+            indice.remover_varios(itens)
+            indice.nova_referencia(self.todos_downloads)  # Índice ainda não montado passa a olhar a lista nova
+
+        # Atualiza a lista na interface (o índice já foi ajustado, não precisa reconstruir)
+        self.filtrar_lista(manter_posicao=True)
+
+        # Habilita o botão de salvar após a exclusão
+        self.btn_salvar.setEnabled(True)
+
+    def procurar_duplicados(self, apos_uniao=False):
+        """Agrupa os itens repetidos da lista e deixa o usuário escolher quais remover"""
+        itens = self.todos_downloads
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            grupos = DuplicateFinder().agrupar(itens)
+        finally:
+            QApplication.restoreOverrideCursor()
+        if not grupos:
+            if not apos_uniao:
+                QMessageBox.information(self, 'Repetidos', 'Nenhum item repetido encontrado.')
+            return
+        dialog = DuplicateReviewDialog(itens, grupos, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        removidos = dialog.itens_removidos()
+        if removidos:
+            self.remover_itens(removidos)
+            QMessageBox.information(self, 'Repetidos', f'{len(removidos)} item(ns) repetido(s) removido(s).')
 
     def unir_arquivos(self):
-        dialog = MergeFilesDialog(self)
+        dialog = MergeFilesDialog(self, self.perfil_saida)
         dialog.exec_()
-        if dialog.merged_data:
-            self.dados = dialog.merged_data
-            self.atualizar_lista()
-            QMessageBox.information(self, 'Sucesso', 'Arquivos unidos com sucesso!')
-            self.btn_salvar.setEnabled(True)
+        if dialog.arquivo_unido:
+            caminho = dialog.arquivo_unido
+
+            def concluido():
+                # O arquivo unido já está salvo; vira o arquivo atual, como se tivesse sido aberto
+                self.arquivo_atual = caminho
+                self.btn_salvar.setEnabled(True)
+                self.abrir_diario()
+                # A união só descarta repetidos exatos; os parecidos passam pela revisão
+                self.procurar_duplicados(apos_uniao=True)
+
+            self.carregar_lista(caminho, concluido, 'Falha ao abrir o arquivo unido')
 
     def mostrar_sobre(self):
         msg_box = QMessageBox(self)
@@ -1804,6 +2882,16 @@ class JsonEditorApp(QMainWindow):
         QDesktopServices.openUrl(QUrl("https://www.instagram.com/prietto_polar/?igsh=MXgycXg5eThzNmprZw%3D%3D#"))
 
     def atualizar_lista_comunidade(self):
+        if self.worker_comunidade is not None:
+            reply = QMessageBox.question(
+                self, 'Cancelar Atualização',
+                "A lista da comunidade está sendo atualizada. Deseja cancelar?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if reply == QMessageBox.Yes:
+                self.cancelar_atualizacao_comunidade()
+            return
+
         # Caixa de diálogo de aviso
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle("Aviso de Responsabilidade")
@@ -1821,162 +2909,287 @@ class JsonEditorApp(QMainWindow):
         if msg_box.clickedButton() != download_button:
             return # O usuário cancelou
 
-        url = 'https://drive.google.com/uc?export=download'
-        file_id = '1NXO_XnSl7Z9fEtQDejKhe0VbneQY7PC6' # ID do arquivo ZIP
-        
-        try:
-            # Usar uma sessão para lidar com cookies do Google Drive
-            session = requests.Session()
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+        # Só pergunta ao servidor "mudou desde esta versão?" se a versão em cache ainda existe
+        metadados = carregar_metadados(self.meta_comunidade) if os.path.exists(self.cache_comunidade) else {}
+        lista_base = self.todos_downloads if self.lista_comunidade_aberta() else None
+
+        worker = CommunityListWorker(metadados, lista_base, self.cache_comunidade + '.novo')
+        worker.progresso.connect(self.progresso_atualizacao_comunidade)
+        worker.sem_mudancas.connect(self.comunidade_sem_mudancas)
+        worker.concluido.connect(self.concluir_atualizacao_comunidade)
+        worker.falhou.connect(self.falha_atualizacao_comunidade)
+        worker.finished.connect(self.fim_atualizacao_comunidade)
+        self.worker_comunidade = worker
+        self.acao_atualizar_comunidade.setText('Cancelar atualização da lista da comunidade')
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setFormat("Conectando...")
+        worker.start()
+
+    def cancelar_atualizacao_comunidade(self):
+        if self.worker_comunidade is not None:
+            self.worker_comunidade.stop()
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat("Atualização da lista da comunidade cancelada")
+            QTimer.singleShot(3000, lambda: self.progress_bar.setFormat(""))
 
-            # Primeira requisição para obter o token de confirmação
-            response = session.get(url, params={'id': file_id}, stream=True, headers=headers)
-            
-            token = None
-            for key, value in response.cookies.items():
-                if key.startswith('download_warning'):
-                    token = value
-                    break
+    def progresso_atualizacao_comunidade(self, valor, texto):
+        if self.sender() is not self.worker_comunidade or not self.worker_comunidade.running:
+            return
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(valor)
+        self.progress_bar.setFormat(texto)
 
-            # Se um token foi encontrado, fazer uma segunda requisição com ele
-            if token:
-                params = {'id': file_id, 'confirm': token}
-                response = session.get(url, params=params, stream=True, headers=headers)
-            
-            response.raise_for_status()
+    def fim_atualizacao_comunidade(self):
+        if self.sender() is self.worker_comunidade:
+            self.worker_comunidade = None
+            self.acao_atualizar_comunidade.setText('Atualizar lista da comunidade')
 
-            # Configurar barra de progresso para porcentagem
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-            self.progress_bar.setRange(0, 100)
-            self.progress_bar.setValue(0)
-            QApplication.processEvents()
+    def comunidade_sem_mudancas(self, metadados_novos):
+        if metadados_novos is not None:
+            salvar_metadados(self.meta_comunidade, metadados_novos)
+        self.lista_comunidade_sem_mudancas()
 
-            # Salvar o arquivo ZIP temporariamente
-            zip_path = os.path.join(self.link_dir, 'superbase.zip')
-            with open(zip_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if total_size > 0:
-                            progress = (downloaded_size / total_size) * 100
-                            self.progress_bar.setValue(int(progress))
-                            self.progress_bar.setFormat(f"Baixando: {int(progress)}%")
-                            QApplication.processEvents()
-            
-            self.progress_bar.setFormat("Extraindo arquivo...")
-            QApplication.processEvents()
-            
-            # Extrair o arquivo ZIP
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                # Listar arquivos no ZIP
-                json_files = [f for f in zf.namelist() if f.endswith('.json')]
-                if not json_files:
-                    raise Exception("Nenhum arquivo JSON encontrado no arquivo baixado.")
-                
-                # Extrair o primeiro arquivo JSON encontrado
-                json_filename = json_files[0]
-                zf.extract(json_filename, self.link_dir)
-                json_path = os.path.join(self.link_dir, json_filename)
-            
-            self.progress_bar.setFormat("Carregando dados...")
-            QApplication.processEvents()
-            
-            # Carregar o arquivo JSON extraído
-            with open(json_path, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-            
-            # Limpar arquivos temporários
-            try:
-                os.remove(zip_path)
-                os.remove(json_path)
-            except:
-                pass
-            
-            # Atualizar a interface
+    def falha_atualizacao_comunidade(self, erro):
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("")
+        QMessageBox.critical(self, 'Erro', f'Erro ao baixar/extrair lista da comunidade:\n{erro}')
+
+    def concluir_atualizacao_comunidade(self, dados, metadados_novos, delta):
+        """Troca a lista exibida pela versão nova em um único passo na thread da interface"""
+        worker = self.sender()
+        anterior = self.todos_downloads
+        if delta is not None and self.lista_comunidade_aberta() and anterior is worker.lista_atual:
+            # Aplica só as diferenças sobre a lista aberta, sem reconstruir lista e índices
+            adicionados, removidos, alterados = delta
+            self.aplicar_delta_comunidade(dados, adicionados, removidos, alterados)
+            mensagem = (f'Lista da comunidade atualizada com sucesso!\n'
+                        f'{len(adicionados)} novos, {len(removidos)} removidos, {len(alterados)} alterados.')
+            # A comparação do delta já decodificou todos os itens: o mapeamento antigo pode ser fechado
+            if isinstance(anterior, MappedDownloadList):
+                anterior.fechar()
+        else:
+            antiga = self.dados_comunidade.get('downloads') if self.dados_comunidade else None
             self.dados = dados
+            self.dados_comunidade = dados
             self.todos_downloads = dados.get('downloads', [])
             self.label_name.setText(dados.get('name', '(sem nome)'))
             self.btn_editar_nome.setEnabled(True)
             self.btn_adicionar_item.setEnabled(True)
             self.btn_excluir.setEnabled(True)
+            self.btn_duplicados.setEnabled(True)
             self.atualizar_lista()
-            
-            self.progress_bar.setRange(0, 100)
-            self.progress_bar.setValue(100)
-            self.progress_bar.setFormat("Lista da comunidade atualizada!")
-            
-            QMessageBox.information(self, 'Sucesso', 'Lista da comunidade atualizada com sucesso!')
-            self.btn_salvar.setEnabled(True)
-            
-            # Limpar a mensagem de progresso após 3 segundos
-            QTimer.singleShot(3000, lambda: self.progress_bar.setFormat(""))
-            
+            # Solta o cache antigo antes do os.replace abaixo (no Windows um arquivo mapeado não pode ser substituído)
+            if isinstance(antiga, MappedDownloadList):
+                antiga.fechar()
+            mensagem = 'Lista da comunidade atualizada com sucesso!'
+
+        # Coloca o cache novo no lugar para abrir direto na próxima execução
+        novo = self.cache_comunidade + '.novo'
+        if os.path.exists(novo):
+            try:
+                os.replace(novo, self.cache_comunidade)
+                salvar_metadados(self.meta_comunidade, metadados_novos)
+            except OSError as e:
+                print(f"Não foi possível gravar o cache da comunidade: {e}")
+
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(100)
+        self.progress_bar.setFormat("Lista da comunidade atualizada!")
+
+        QMessageBox.information(self, 'Sucesso', mensagem)
+        self.btn_salvar.setEnabled(True)
+
+        # Limpar a mensagem de progresso após 3 segundos
+        QTimer.singleShot(3000, lambda: self.progress_bar.setFormat(""))
+
+    def lista_comunidade_aberta(self):
+        return self.dados is not None and self.dados is self.dados_comunidade
+
+    def lista_comunidade_sem_mudancas(self):
+        """O servidor confirmou que a versão em cache é a atual: só reabre o cache se preciso"""
+        if not self.lista_comunidade_aberta():
+            self.abrir_cache_comunidade()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(100)
+        self.progress_bar.setFormat("Lista da comunidade já está atualizada")
+        QMessageBox.information(self, 'Sucesso', 'A lista da comunidade já está atualizada.')
+        QTimer.singleShot(3000, lambda: self.progress_bar.setFormat(""))
+
+    def aplicar_delta_comunidade(self, dados, adicionados, removidos, alterados):
+        """Atualiza a lista aberta e os índices item a item"""
+        for chave, valor in dados.items():
+            if chave != 'downloads':
+                self.dados[chave] = valor
+
+        ids_removidos = {id(item) for item in removidos}
+        # Lista nova (comum) mesmo sem remoções: a antiga pode estar presa ao arquivo de cache
+        self.dados['downloads'] = [d for d in self.todos_downloads if id(d) not in ids_removidos]
+        self.todos_downloads = self.dados['downloads']
+        for indice in (self.indice_busca, self.indice_aproximado):
+            indice.remover_varios(removidos)
+            indice.nova_referencia(self.todos_downloads)  # Índice ainda não montado passa a olhar a lista nova
+
+        for antigo, novo in alterados:
+            # Mantém o mesmo objeto (seleções e posição na lista continuam valendo)
+            antigo.clear()
+            antigo.update(novo)
+            self.indice_busca.atualizar(antigo)
+            self.indice_aproximado.atualizar(antigo)
+
+        self.todos_downloads.extend(adicionados)
+        self.indice_busca.adicionar_varios(adicionados)
+        self.indice_aproximado.adicionar_varios(adicionados)
+
+        self.label_name.setText(self.dados.get('name', '(sem nome)'))
+        self.filtrar_lista(manter_posicao=True)
+
+    def abrir_cache_comunidade(self):
+        """Abre a última lista da comunidade baixada (mapeando o cache binário, sem reprocessar o JSON)"""
+        if not os.path.exists(self.cache_comunidade):
+            return
+        try:
+            self.dados = abrir_cache(self.cache_comunidade)
+            self.dados_comunidade = self.dados
         except Exception as e:
-            self.progress_bar.setRange(0, 100)
-            self.progress_bar.setValue(0)
-            self.progress_bar.setFormat("")
-            QMessageBox.critical(self, 'Erro', f'Erro ao baixar/extrair lista da comunidade:\n{e}')
+            print(f"Cache da comunidade inválido, descartando: {e}")
+            try:
+                os.remove(self.cache_comunidade)
+            except OSError:
+                pass
+            return
+        self.arquivo_atual = None
+        self.label_name.setText(self.dados.get('name', '(sem nome)'))
+        self.btn_editar_nome.setEnabled(True)
+        self.btn_adicionar_item.setEnabled(True)
+        self.btn_excluir.setEnabled(True)
+        self.btn_duplicados.setEnabled(True)
+        self.btn_salvar.setEnabled(False)  # Nada alterado ainda, e sem arquivo para salvar por cima
+        self.atualizar_lista()
 
     def cancelar_download(self):
-        if not self.is_downloading:
+        jobs = [job for job in self.downloads_selecionados() if job.estado in ATIVOS]
+        if not jobs:
             return
         
         reply = QMessageBox.question(
             self, 'Cancelar Download',
-            "Tem certeza que deseja cancelar o download em andamento?",
+            f"Tem certeza que deseja cancelar {len(jobs)} download(s)? Os arquivos parciais serão apagados.",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            if hasattr(self, 'torrent_downloader') and self.torrent_downloader.isRunning():
-                self.torrent_downloader.stop()
-            if hasattr(self, 'file_downloader') and self.file_downloader.isRunning():
-                self.file_downloader.stop()
-            
-            self.finalizar_download(False, "Download cancelado pelo usuário.")
-            QMessageBox.information(self, "Cancelado", "O download foi cancelado.")
-
-    def proxima_pagina(self):
-        total_pages = (len(self.filtered_downloads) + self.items_per_page - 1) // self.items_per_page
-        if self.current_page < total_pages:
-            self.current_page += 1
-            self.mostrar_pagina_atual()
-
-    def pagina_anterior(self):
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.mostrar_pagina_atual()
+            for job in jobs:
+                self.gerenciador_downloads.cancelar(job)
+
+    def closeEvent(self, event):
+        """Downloads em andamento param com o andamento salvo no diário (.kdm) e continuam numa próxima vez"""
+        if any(job.estado == BAIXANDO for job in self.gerenciador_downloads.fila.jobs):
+            reply = QMessageBox.question(
+                self, 'Downloads em andamento',
+                "Há downloads em andamento. Sair mesmo assim? Eles continuam de onde pararam se forem baixados de novo.",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+        self.gerenciador_downloads.parar_todos()
+        # Threads que usam a sessão HTTP ou a lista terminam antes de a sessão fechar
+        for dialogo in self.findChildren(MergeFilesDialog):
+            dialogo.reject()
+        self.cancelar_carregamento()
+        self.cancelar_busca_em_andamento()
+        threads = self.carregamentos_ativos + self.buscas_ativas
+        if self.worker_comunidade is not None:
+            self.worker_comunidade.stop()
+            threads.append(self.worker_comunidade)
+        for thread in threads:
+            thread.wait()
+        http_session.fechar_sessao()
+        if self.diario_em_dia() and self.diario.registros:
+            try:
+                self.diario.compactar(self.dados, self.perfil_saida)
+            except (OSError, ValueError) as e:  # ValueError: título com caractere que o UTF-8 não aceita
+                print(f"Não foi possível compactar o diário de edições: {e}")  # Ele é reaplicado na próxima abertura
+        super().closeEvent(event)
 
     def iniciar_busca(self):
-        """Inicia a busca manual e atualiza a barra de progresso."""
-        termo = self.search_entry.text()
-        if not termo.strip():
+        """Busca imediatamente (Enter ou botão Buscar), sem esperar o intervalo da digitação."""
+        self.timer_busca.stop()
+        self.executar_busca()
+
+    def agendar_busca(self, texto):
+        """Reinicia o intervalo de espera a cada tecla; campo vazio volta para a lista completa."""
+        if not texto.strip():
+            self.timer_busca.stop()
             self.filtrar_lista()
+            self.progress_bar.setRange(0, 100)
             self.progress_bar.setFormat("")
             self.progress_bar.setValue(0)
             return
+        self.timer_busca.start()
+
+    def indice_ativo(self):
+        """Índice usado pela busca: substring exata ou aproximada ranqueada"""
+        if self.chk_busca_aproximada.isChecked():
+            return self.indice_aproximado
+        return self.indice_busca
+
+    def cancelar_busca_em_andamento(self):
+        self.geracao_busca += 1
+        for worker in self.buscas_ativas:
+            worker.stop()
+        if self.busca_pendente:
+            # O resultado da busca cancelada vai ser ignorado: a barra não pode ficar em "Buscando..."
+            self.busca_pendente = False
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setFormat("")
+
+    def executar_busca(self):
+        """Dispara a busca em uma thread; uma tecla nova cancela a busca anterior."""
+        termo = self.search_entry.text().lower()
+        if not termo.strip():
+            self.filtrar_lista()
+            return
+
+        self.cancelar_busca_em_andamento()
+
+        indice = self.indice_ativo()
 
-        self.progress_bar.setRange(0, 0)  # Modo indeterminado
+        # Se o termo novo contém o anterior, basta refinar os resultados anteriores
+        # (não vale para a busca aproximada, que reordena tudo pela pontuação)
+        base = None
+        if self.busca_anterior is not None and indice is self.indice_busca:
+            termo_anterior, resultados_anteriores, versao = self.busca_anterior
+            if versao == self.indice_busca.versao and termo_anterior in termo:
+                base = resultados_anteriores
+
+        worker = SearchWorker(indice, termo, self.geracao_busca, base)
+        worker.resultado_pronto.connect(self.receber_resultado_busca)
+        # Mantém referência às threads até terminarem (inclusive as canceladas)
+        self.buscas_ativas = [w for w in self.buscas_ativas if not w.isFinished()]
+        self.buscas_ativas.append(worker)
+        worker.start()
+
+        self.progress_bar.setRange(0, 0)  # Modo indeterminado (a interface continua livre)
         self.progress_bar.setFormat("Buscando...")
-        QApplication.processEvents()
+        self.busca_pendente = True
 
-        self.filtrar_lista()
+    def receber_resultado_busca(self, geracao, termo, resultado, versao):
+        if geracao != self.geracao_busca:
+            return  # Resultado de uma busca que já foi substituída
+        self.busca_pendente = False
+        self.busca_anterior = (termo, resultado, versao) if self.indice_ativo() is self.indice_busca else None
+        self.filtered_downloads = resultado
+        self.mostrar_itens_filtrados()
 
-        num_resultados = len(self.filtered_downloads)
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(100)
-        self.progress_bar.setFormat(f"Encontrados {num_resultados} resultados")
+        self.progress_bar.setFormat(f"Encontrados {len(resultado)} resultados")
         
         QTimer.singleShot(4000, lambda: self.progress_bar.setFormat("") if self.progress_bar.value() == 100 else None)
 
-    def verificar_busca_limpa(self, texto):
-        """Reseta a lista se o campo de busca for limpo."""
-        if not texto:
-            self.filtrar_lista()
-            self.progress_bar.setFormat("")
-            self.progress_bar.setValue(0)
-
     def criar_nova_lista(self):
         """Cria uma nova lista do zero"""
         # Pedir nome para a nova lista
@@ -2003,6 +3216,7 @@ class JsonEditorApp(QMainWindow):
         self.btn_editar_nome.setEnabled(True)
         self.btn_adicionar_item.setEnabled(True)
         self.btn_excluir.setEnabled(True)
+        self.btn_duplicados.setEnabled(True)
         self.atualizar_lista()
         self.btn_salvar.setEnabled(True)
         
@@ -2136,11 +3350,19 @@ class JsonEditorApp(QMainWindow):
                 novo_item['rating'] = nota_selecionada['value']
 
             # Adicionar à lista
+            novo_item = DownloadRecord.de_dict(novo_item)
             self.dados['downloads'].append(novo_item)
+            self.indice_busca.adicionar(novo_item)
+            self.indice_aproximado.adicionar(novo_item)
             
             # Atualizar interface
-            self.atualizar_lista()
+            self.todos_downloads = self.dados['downloads']
+            self.filtrar_lista(manter_posicao=True)
             self.btn_salvar.setEnabled(True)
+            if self.diario_em_dia():
+                self.diario.adicionar(novo_item)
+                if self.posicoes_diario is not None:
+                    self.posicoes_diario[id(novo_item)] = len(self.dados['downloads']) - 1
             
             dialog.accept()
             QMessageBox.information(self, 'Sucesso', f'Item "{titulo}" adicionado com sucesso!')
@@ -2174,67 +3396,42 @@ class JsonEditorApp(QMainWindow):
             menu.addSeparator()
         
         # Opções para item selecionado
-        item = self.lista.itemAt(pos)
-        if item:
-            item_data = item.data(Qt.UserRole)
+        index = self.lista.indexAt(pos)
+        if index.isValid():
+            item_data = self.modelo_lista.item_em(index.row())
             if item_data:
-                menu.addAction("✏️ Editar", lambda: self.abrir_popup_edicao(item))
+                menu.addAction("✏️ Editar", lambda: self.abrir_popup_edicao_direto(item_data))
                 menu.addAction("🗑️ Excluir", lambda: self.excluir_selecionado())
                 menu.addSeparator()
                 menu.addAction("📋 Copiar Links", lambda: self.mostrar_opcoes_link(item_data))
+                menu.addAction("⬇️ Baixar", lambda: self.iniciar_download(item_data))
         
         # Mostrar menu apenas se há opções
         if menu.actions():
-            menu.exec_(self.lista.mapToGlobal(pos))
+            menu.exec_(self.lista.viewport().mapToGlobal(pos))
 
     def verificar_selecao(self):
         """Verifica se há itens selecionados e atualiza o estado dos botões"""
-        has_selected = False
-        all_selected = True
-        total_items = 0
-        
-        for i in range(self.lista.count()):
-            item = self.lista.item(i)
-            if item.flags() & Qt.ItemIsSelectable:  # Ignorar separadores
-                total_items += 1
-                widget = self.lista.itemWidget(item)
-                if widget:
-                    for child in widget.findChildren(QCheckBox):
-                        if child.isChecked():
-                            has_selected = True
-                        else:
-                            all_selected = False
-                        break
+        total_items = self.modelo_lista.rowCount()
+        marcados = self.modelo_lista.contar_marcados()
         
         # Atualizar estado dos botões
         if total_items > 0:
-            self.btn_selecionar_todos.setEnabled(not all_selected)
-            self.btn_desmarcar_todos.setEnabled(has_selected)
+            self.btn_selecionar_todos.setEnabled(marcados < total_items)
+            self.btn_desmarcar_todos.setEnabled(marcados > 0)
+            self.btn_baixar_marcados.setEnabled(marcados > 0)
         else:
             self.btn_selecionar_todos.setEnabled(False)
             self.btn_desmarcar_todos.setEnabled(False)
+            self.btn_baixar_marcados.setEnabled(False)
 
     def selecionar_todos(self):
         """Marca todas as caixas de seleção"""
-        for i in range(self.lista.count()):
-            item = self.lista.item(i)
-            if item.flags() & Qt.ItemIsSelectable:  # Ignorar separadores
-                widget = self.lista.itemWidget(item)
-                if widget:
-                    for child in widget.findChildren(QCheckBox):
-                        child.setChecked(True)
-        self.verificar_selecao()
+        self.modelo_lista.marcar_todos(True)
 
     def desmarcar_todos(self):
         """Desmarca todas as caixas de seleção"""
-        for i in range(self.lista.count()):
-            item = self.lista.item(i)
-            if item.flags() & Qt.ItemIsSelectable:  # Ignorar separadores
-                widget = self.lista.itemWidget(item)
-                if widget:
-                    for child in widget.findChildren(QCheckBox):
-                        child.setChecked(False)
-        self.verificar_selecao()
+        self.modelo_lista.marcar_todos(False)
 
     def selecionar_estrela(self, estrelas, idx):
         """Atualiza a seleção de estrelas"""
@@ -2269,6 +3466,8 @@ class JsonEditorApp(QMainWindow):
         self.nota_atual = idx + 1
 
 if __name__ == '__main__':
+    # Executável congelado (PyInstaller) no Windows: os processos da união paralela começam por aqui
+    multiprocessing.freeze_support()
     from PyQt5.QtWidgets import QSplashScreen
     from PyQt5.QtCore import Qt, QTimer
     from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont
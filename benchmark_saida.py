@@ -0,0 +1,74 @@
+"""Compara os formatos de saída (json_output.PERFIS): tempo para salvar, tamanho e tempo para ler.
+
+Uso: python benchmark_saida.py [número de itens]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from download_store import compactar, para_json
+from json_output import PERFIS, blocos_arquivo, salvar_json
+from json_stream import StreamingDownloadsParser
+
+
+def lista_sintetica(quantidade, semente=1):
+    sorteio = random.Random(semente)
+    palavras = ('cyberpunk witcher dark souls elden ring vice city repack deluxe edition goty ultimate '
+                'hollow knight stardew valley red dead redemption resident evil village far cry').split()
+    downloads = []
+    for i in range(quantidade):
+        titulo = ' '.join(sorteio.choice(palavras).title() for _ in range(sorteio.randint(2, 6)))
+        item = {
+            'title': f'{titulo} v{i}',
+            'uris': [f'magnet:?xt=urn:btih:{sorteio.getrandbits(160):040x}&dn=jogo{i}'],
+            'uploadDate': '2024-01-01T00:00:00.000Z',
+            'fileSize': f'{sorteio.randint(1, 90)}.{sorteio.randint(0, 9)} GB',
+        }
+        if i % 7 == 0:
+            item['rating'] = sorteio.randint(1, 5)
+        downloads.append(item)
+    return {'name': 'Benchmark', 'downloads': compactar(downloads)}
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def ler(caminho):
+    parser = StreamingDownloadsParser()
+    for bloco, _, _ in blocos_arquivo(caminho):
+        parser.feed(bloco)
+    parser.close()
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    dados = lista_sintetica(quantidade)
+    print(f'{quantidade} itens\n')
+    print(f'{"formato":<28}{"salvar (s)":>12}{"tamanho (MB)":>15}{"ler (s)":>10}')
+    with tempfile.TemporaryDirectory() as pasta:
+        def antigo(caminho):
+            # Como era gravado antes dos perfis: json.dump direto no arquivo, com fsync
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, indent=4, ensure_ascii=False, default=para_json)
+                f.flush()
+                os.fsync(f.fileno())
+
+        casos = [('json.dump(indent=4) (antes)', os.path.join(pasta, 'antes.json'), antigo)]
+        for perfil, (nome, extensao) in PERFIS.items():
+            caminho = os.path.join(pasta, perfil + extensao)
+            casos.append((nome, caminho, lambda caminho, perfil=perfil: salvar_json(caminho, dados, perfil)))
+        for nome, caminho, salvar in casos:
+            tempo = medir(lambda: salvar(caminho))
+            tamanho = os.path.getsize(caminho) / (1024 * 1024)
+            leitura = medir(lambda: ler(caminho))
+            print(f'{nome:<28}{tempo:>12.2f}{tamanho:>15.1f}{leitura:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
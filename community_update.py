@@ -0,0 +1,92 @@
+import json
+import os
+from collections import defaultdict
+
+from download_store import DownloadRecord
+
+
+def carregar_metadados(caminho):
+    """Metadados da última versão baixada ({} se não houver ou estiver ilegível)"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_metadados(caminho, metadados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(metadados, f, indent=4)
+    os.replace(temporario, caminho)
+
+
+def metadados_da_resposta(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_length': response.headers.get('Content-Length'),
+    }
+
+
+def cabecalhos_condicionais(metadados):
+    """Cabeçalhos para o servidor responder 304 se o arquivo não mudou"""
+    cabecalhos = {}
+    if metadados.get('etag'):
+        cabecalhos['If-None-Match'] = metadados['etag']
+    if metadados.get('last_modified'):
+        cabecalhos['If-Modified-Since'] = metadados['last_modified']
+    return cabecalhos
+
+
+def mesma_versao(metadados, response):
+    """Confere se a resposta é a mesma versão já baixada, antes de ler o corpo.
+
+    Vale para servidores que ignoram os cabeçalhos condicionais mas mandam os
+    validadores. Sem ETag nem Last-Modified, quem decide é o SHA-1 do corpo,
+    conferido depois de baixado.
+    """
+    if response.status_code == 304:
+        return True
+    if not metadados:
+        return False
+    atual = metadados_da_resposta(response)
+    if atual['etag'] and metadados.get('etag'):
+        return atual['etag'] == metadados['etag']
+    if atual['last_modified'] and metadados.get('last_modified'):
+        return (atual['last_modified'] == metadados['last_modified']
+                and atual['content_length'] == metadados.get('content_length'))
+    return False
+
+
+def _por_titulo(itens):
+    """Chave (título, ocorrência) de cada item: títulos repetidos continuam distintos"""
+    vistos = defaultdict(int)
+    for item in itens:
+        titulo = item.get('title', '')
+        ocorrencia = vistos[titulo]
+        vistos[titulo] = ocorrencia + 1
+        yield (titulo, ocorrencia), item
+
+
+def _conteudo(item):
+    return item.como_dict() if isinstance(item, DownloadRecord) else item
+
+
+def calcular_delta(antigos, novos):
+    """Compara duas versões da lista pelo título.
+
+    Retorna (adicionados, removidos, alterados), onde alterados é uma lista de
+    pares (item antigo, item novo) com o mesmo título e conteúdo diferente.
+    """
+    anteriores = dict(_por_titulo(antigos))
+    adicionados = []
+    alterados = []
+    for chave, novo in _por_titulo(novos):
+        antigo = anteriores.pop(chave, None)
+        if antigo is None:
+            adicionados.append(novo)
+        elif _conteudo(antigo) != _conteudo(novo):
+            alterados.append((antigo, novo))
+    removidos = list(anteriores.values())
+    return adicionados, removidos, alterados
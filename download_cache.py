@@ -0,0 +1,232 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import MutableSequence
+
+from download_store import CAMPOS, DownloadRecord
+
+
+# Layout do arquivo:
+#   cabeçalho | tabela (uma linha de tamanho fixo por item) | heap de strings UTF-8 | metadados JSON
+MAGICO = b'KDMCACHE'
+VERSAO = 1
+_CABECALHO = struct.Struct('<8sIIQQQ')  # mágico, versão, total, início do heap, início e tamanho dos metadados
+# Por item: início no heap, tamanhos de title/uris/uploadDate/fileSize/repackLinkSource/extras, rating, formato
+_LINHA = struct.Struct('<QIIIIIIBH')
+
+_COLUNAS_TEXTO = ('uploadDate', 'fileSize', 'repackLinkSource')
+
+
+def _uris_cabem(uris):
+    # As URIs vão para o heap separadas por '\n'; qualquer coisa fora desse formato vai para os extras
+    return (isinstance(uris, list) and uris
+            and all(isinstance(u, str) and u and '\n' not in u for u in uris))
+
+
+def gravar_cache(caminho, dados):
+    """Grava a lista no formato binário (arquivo temporário + os.replace)"""
+    downloads = dados.get('downloads', [])
+    chaves = list(dados)
+    cabecalho = [[chave, valor] for chave, valor in dados.items() if chave != 'downloads']
+    posicao_lista = chaves.index('downloads') if 'downloads' in dados else len(cabecalho)
+
+    inicio_heap = _CABECALHO.size + _LINHA.size * len(downloads)
+    temporario = caminho + '.tmp'
+    try:
+        _gravar_arquivo(temporario, downloads, cabecalho, posicao_lista, inicio_heap)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+    os.replace(temporario, caminho)
+
+
+def _gravar_arquivo(temporario, downloads, cabecalho, posicao_lista, inicio_heap):
+    formatos = {}
+    tabela = bytearray()
+    with open(temporario, 'wb') as f:
+        f.seek(inicio_heap)
+        posicao = 0
+        for item in downloads:
+            ordem = tuple(item)
+            formato = formatos.setdefault(ordem, len(formatos))
+            extras = {}
+            partes = []
+
+            titulo = item.get('title')
+            if 'title' in item and not isinstance(titulo, str):
+                extras['title'] = titulo
+                titulo = None
+            partes.append(titulo.encode('utf-8') if titulo else b'')
+
+            uris = item.get('uris')
+            if 'uris' in item and not _uris_cabem(uris):
+                extras['uris'] = uris
+                uris = None
+            partes.append('\n'.join(uris).encode('utf-8') if uris else b'')
+
+            for chave in _COLUNAS_TEXTO:
+                valor = item.get(chave)
+                if chave in item and not isinstance(valor, str):
+                    extras[chave] = valor
+                    valor = None
+                partes.append(valor.encode('utf-8') if valor else b'')
+
+            nota = item.get('rating', 0)
+            if 'rating' in item and (type(nota) is not int or not 0 <= nota <= 255):
+                extras['rating'] = nota
+                nota = 0
+
+            for chave in ordem:
+                if chave not in CAMPOS:
+                    extras[chave] = item[chave]
+            partes.append(json.dumps(extras, ensure_ascii=False).encode('utf-8') if extras else b'')
+
+            tabela += _LINHA.pack(posicao, *map(len, partes), nota, formato)
+            bloco = b''.join(partes)
+            f.write(bloco)
+            posicao += len(bloco)
+
+        meta = json.dumps({
+            'cabecalho': cabecalho,
+            'posicao_lista': posicao_lista,
+            'formatos': [list(ordem) for ordem in formatos],
+        }, ensure_ascii=False).encode('utf-8')
+        inicio_meta = inicio_heap + posicao
+        f.write(meta)
+        f.seek(0)
+        f.write(_CABECALHO.pack(MAGICO, VERSAO, len(downloads), inicio_heap, inicio_meta, len(meta)))
+        f.write(tabela)
+
+
+def abrir_cache(caminho):
+    """Mapeia o arquivo e devolve o dict da lista com os downloads ainda não decodificados"""
+    with open(caminho, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magico, versao, total, inicio_heap, inicio_meta, tamanho_meta = _CABECALHO.unpack_from(mapa, 0)
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError('Cache em formato desconhecido')
+        if inicio_meta + tamanho_meta > len(mapa):
+            raise ValueError('Cache incompleto')
+        meta = json.loads(mapa[inicio_meta:inicio_meta + tamanho_meta].decode('utf-8'))
+    except Exception:
+        mapa.close()
+        raise
+    formatos = [tuple(ordem) for ordem in meta['formatos']]
+    downloads = MappedDownloadList(mapa, total, inicio_heap, formatos)
+    pares = [tuple(par) for par in meta['cabecalho']]
+    pares.insert(meta['posicao_lista'], ('downloads', downloads))
+    return dict(pares)
+
+
+class MappedDownloadList(MutableSequence):
+    """Lista de downloads lida de um cache mapeado em memória.
+
+    Cada posição guarda o número da linha no arquivo até o item ser acessado;
+    aí o item é decodificado uma vez e passa a ser um DownloadRecord comum.
+    A lista exibe só as linhas visíveis, então só elas são decodificadas.
+
+    A interface e a thread de busca podem pedir a mesma linha ao mesmo tempo;
+    o lock garante que as duas recebam o mesmo objeto.
+    """
+
+    def __init__(self, mapa, total, inicio_heap, formatos):
+        self._mapa = mapa
+        self._inicio_heap = inicio_heap
+        self._formatos = formatos
+        self._itens = list(range(total))
+        self._lock = threading.Lock()
+
+    def _decodificar(self, linha):
+        inicio, t_titulo, t_uris, t_data, t_tamanho, t_repack, t_extras, nota, formato = \
+            _LINHA.unpack_from(self._mapa, _CABECALHO.size + linha * _LINHA.size)
+        pos = self._inicio_heap + inicio
+        bloco = self._mapa[pos:pos + t_titulo + t_uris + t_data + t_tamanho + t_repack + t_extras]
+
+        # Monta o registro direto, sem passar por um dict intermediário
+        ordem = self._formatos[formato]
+        registro = DownloadRecord.__new__(DownloadRecord)
+        registro._chaves = ordem
+        registro._extras = None
+        pos = 0
+        if 'title' in ordem:
+            registro.title = bloco[:t_titulo].decode('utf-8')
+        pos += t_titulo
+        if 'uris' in ordem:
+            registro.uris = bloco[pos:pos + t_uris].decode('utf-8').split('\n') if t_uris else []
+        pos += t_uris
+        if 'uploadDate' in ordem:
+            registro.uploadDate = sys.intern(bloco[pos:pos + t_data].decode('utf-8'))
+        pos += t_data
+        if 'fileSize' in ordem:
+            registro.fileSize = sys.intern(bloco[pos:pos + t_tamanho].decode('utf-8'))
+        pos += t_tamanho
+        if 'repackLinkSource' in ordem:
+            registro.repackLinkSource = sys.intern(bloco[pos:pos + t_repack].decode('utf-8'))
+        pos += t_repack
+        if 'rating' in ordem:
+            registro.rating = nota
+        if t_extras:
+            for chave, valor in json.loads(bloco[pos:pos + t_extras].decode('utf-8')).items():
+                if chave in CAMPOS:
+                    setattr(registro, chave, valor)
+                else:
+                    if registro._extras is None:
+                        registro._extras = {}
+                    registro._extras[chave] = valor
+        return registro
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self._itens)))]
+        item = self._itens[indice]
+        if type(item) is not int:
+            return item
+        with self._lock:
+            item = self._itens[indice]
+            if type(item) is int:
+                item = self._decodificar(item)
+                self._itens[indice] = item
+            return item
+
+    def __setitem__(self, indice, valor):
+        self._itens[indice] = valor
+
+    def __delitem__(self, indice):
+        del self._itens[indice]
+
+    def insert(self, indice, valor):
+        self._itens.insert(indice, valor)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __iter__(self):
+        for indice in range(len(self._itens)):
+            yield self[indice]
+
+    def sem(self, itens):
+        """Nova lista sem os itens dados, sem decodificar as outras linhas.
+
+        As duas listas dividem o mesmo mapeamento: `fechar` numa vale para a outra.
+        """
+        ids = {id(item) for item in itens}
+        copia = MappedDownloadList.__new__(MappedDownloadList)
+        copia._mapa = self._mapa
+        copia._inicio_heap = self._inicio_heap
+        copia._formatos = self._formatos
+        copia._lock = threading.Lock()
+        with self._lock:
+            # Linhas ainda não decodificadas (int) não podem ser um dos itens removidos
+            copia._itens = [item for item in self._itens if type(item) is int or id(item) not in ids]
+        return copia
+
+    def fechar(self):
+        """Libera o arquivo mapeado (itens ainda não decodificados deixam de estar acessíveis)"""
+        self._mapa.close()
@@ -0,0 +1,105 @@
+import itertools
+import os
+
+from torrent_engine import eh_torrent
+
+
+NA_FILA = 'Na fila'
+BAIXANDO = 'Baixando'
+PAUSADO = 'Pausado'
+CONCLUIDO = 'Concluído'
+ERRO = 'Erro'
+CANCELADO = 'Cancelado'
+
+ATIVOS = (NA_FILA, BAIXANDO, PAUSADO)
+
+PRIORIDADES = {2: 'Alta', 1: 'Normal', 0: 'Baixa'}
+PRIORIDADE_NORMAL = 1
+
+_ids = itertools.count(1)
+
+
+class DownloadJob:
+    """Um arquivo na fila de downloads e o seu andamento"""
+
+    __slots__ = ('id', 'url', 'destino', 'titulo', 'prioridade', 'estado',
+                 'baixados', 'total', 'velocidade', 'mensagem', 'limite', 'torrent')
+
+    def __init__(self, url, destino, titulo=None, prioridade=PRIORIDADE_NORMAL):
+        self.id = next(_ids)
+        self.url = url
+        self.destino = destino
+        self.titulo = titulo or os.path.basename(destino)
+        self.prioridade = prioridade
+        self.estado = NA_FILA
+        self.baixados = 0
+        self.total = 0
+        self.velocidade = 0
+        self.mensagem = ''
+        self.limite = 0  # bytes/s só deste download (0 = sem limite próprio)
+        self.torrent = eh_torrent(url)  # torrents: `destino` é a pasta onde os arquivos ficam
+
+    @property
+    def progresso(self):
+        return int(self.baixados * 100 / self.total) if self.total else 0
+
+    def __repr__(self):
+        return f'DownloadJob({self.titulo!r}, {self.estado})'
+
+
+class DownloadQueue:
+    """Ordem e prioridade dos downloads; decide quais começam agora.
+
+    A ordem da lista é a ordem de exibição. Entre os que estão na fila, sai
+    primeiro o de maior prioridade e, no empate, o que está mais acima.
+    """
+
+    def __init__(self, limite=3):
+        self.jobs = []
+        self.limite = limite
+
+    def adicionar(self, job):
+        if not job.torrent:
+            job.destino = self._destino_livre(job.destino, job)
+        self.jobs.append(job)
+        return job
+
+    def _destino_livre(self, destino, job):
+        """Dois downloads ativos nunca gravam no mesmo arquivo: o segundo ganha ' (2)' no nome"""
+        usados = {outro.destino for outro in self.jobs
+                  if outro is not job and outro.estado in ATIVOS and not outro.torrent}
+        base, extensao = os.path.splitext(destino)
+        candidato, n = destino, 2
+        while candidato in usados:
+            candidato = f'{base} ({n}){extensao}'
+            n += 1
+        return candidato
+
+    def baixando(self):
+        return [job for job in self.jobs if job.estado == BAIXANDO]
+
+    def proximos(self):
+        """Jobs que devem começar agora para ocupar as vagas livres"""
+        vagas = self.limite - len(self.baixando())
+        if vagas <= 0:
+            return []
+        na_fila = [(posicao, job) for posicao, job in enumerate(self.jobs) if job.estado == NA_FILA]
+        na_fila.sort(key=lambda par: (-par[1].prioridade, par[0]))
+        return [job for _, job in na_fila[:vagas]]
+
+    def mover(self, job, deslocamento):
+        """Sobe (deslocamento negativo) ou desce o job na lista; retorna a nova posição"""
+        posicao = self.jobs.index(job)
+        nova = max(0, min(len(self.jobs) - 1, posicao + deslocamento))
+        if nova != posicao:
+            self.jobs.insert(nova, self.jobs.pop(posicao))
+        return nova
+
+    def remover_finalizados(self):
+        """Tira da lista os concluídos, cancelados e com erro; retorna os removidos"""
+        removidos = [job for job in self.jobs if job.estado not in ATIVOS]
+        self.jobs = [job for job in self.jobs if job.estado in ATIVOS]
+        return removidos
+
+    def posicao(self, job):
+        return self.jobs.index(job)
@@ -0,0 +1,143 @@
+import sys
+from collections.abc import MutableMapping, MutableSequence
+
+
+CAMPOS = ('title', 'uris', 'uploadDate', 'fileSize', 'rating', 'repackLinkSource')
+
+# Campos com poucos valores diferentes (ex.: "1.5 GB", mesma data): uma única cópia de cada string
+_CAMPOS_REPETIDOS = frozenset(('uploadDate', 'fileSize', 'repackLinkSource'))
+
+# Ordens de chaves já vistas; os registros com o mesmo formato compartilham a mesma tupla
+_ORDENS = {}
+
+# Ordem de chaves de um dict -> (ordem compartilhada, campos com slot, campos a internar, chaves extras)
+_FORMATOS = {}
+
+
+def _ordem(chaves):
+    chaves = tuple(chaves)
+    return _ORDENS.setdefault(chaves, chaves)
+
+
+def _formato(chaves):
+    formato = _FORMATOS.get(chaves)
+    if formato is None:
+        formato = (
+            _ordem(chaves),
+            tuple(c for c in chaves if c in CAMPOS and c not in _CAMPOS_REPETIDOS),
+            tuple(c for c in chaves if c in _CAMPOS_REPETIDOS),
+            tuple(c for c in chaves if c not in CAMPOS),
+        )
+        _FORMATOS[chaves] = formato
+    return formato
+
+
+class DownloadRecord(MutableMapping):
+    """Item da lista de downloads guardado em __slots__ em vez de um dict.
+
+    Se comporta como o dict original (get, [], in, del, items...), incluindo a
+    ordem das chaves, mas ocupa uma fração da memória. `_chaves` diz quais
+    campos existem no item e em que ordem aparecem no JSON; chaves fora de
+    CAMPOS ficam em `_extras`.
+    """
+
+    __slots__ = CAMPOS + ('_chaves', '_extras')
+
+    def __init__(self, dados=()):
+        self._chaves = ()
+        self._extras = None
+        for chave, valor in (dados.items() if hasattr(dados, 'items') else dados):
+            self[chave] = valor
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Converte um dict vindo do JSON (retorna o próprio objeto se já for um registro)"""
+        if isinstance(dados, cls):
+            return dados
+        # Caminho rápido para a carga de listas grandes: o formato do dict é resolvido uma vez só
+        ordem, campos, repetidos, extras = _formato(tuple(dados))
+        registro = cls.__new__(cls)
+        registro._chaves = ordem
+        registro._extras = {chave: dados[chave] for chave in extras} if extras else None
+        for chave in campos:
+            setattr(registro, chave, dados[chave])
+        for chave in repetidos:
+            valor = dados[chave]
+            setattr(registro, chave, sys.intern(valor) if type(valor) is str else valor)
+        return registro
+
+    def __getitem__(self, chave):
+        if chave not in self._chaves:
+            raise KeyError(chave)
+        if chave in CAMPOS:
+            return getattr(self, chave)
+        return self._extras[chave]
+
+    def get(self, chave, padrao=None):
+        # Chamado várias vezes por linha ao desenhar a lista: evita o caminho genérico do Mapping
+        if chave not in self._chaves:
+            return padrao
+        if chave in CAMPOS:
+            return getattr(self, chave)
+        return self._extras[chave]
+
+    def __contains__(self, chave):
+        return chave in self._chaves
+
+    def __setitem__(self, chave, valor):
+        if isinstance(valor, str) and chave in _CAMPOS_REPETIDOS:
+            valor = sys.intern(valor)
+        if chave in CAMPOS:
+            setattr(self, chave, valor)
+        else:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[chave] = valor
+        if chave not in self._chaves:
+            self._chaves = _ordem(self._chaves + (chave,))
+
+    def __delitem__(self, chave):
+        if chave not in self._chaves:
+            raise KeyError(chave)
+        if chave in CAMPOS:
+            delattr(self, chave)
+        else:
+            del self._extras[chave]
+            if not self._extras:
+                self._extras = None
+        self._chaves = _ordem(c for c in self._chaves if c != chave)
+
+    def __iter__(self):
+        return iter(self._chaves)
+
+    def __len__(self):
+        return len(self._chaves)
+
+    # Mantém a identidade como critério de igualdade/hash, igual ao que a lista e os índices esperam
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
+
+    def como_dict(self):
+        return {chave: self[chave] for chave in self._chaves}
+
+    def copy(self):
+        return DownloadRecord(self.como_dict())
+
+    def __repr__(self):
+        return f'DownloadRecord({self.como_dict()!r})'
+
+
+def compactar(itens):
+    """Converte uma lista de dicts de download em registros compactos"""
+    de_dict = DownloadRecord.de_dict
+    return [de_dict(item) if isinstance(item, dict) else item for item in itens]
+
+
+def para_json(obj):
+    """Parâmetro `default` do json.dump: grava os registros com o mesmo formato do dict original"""
+    if isinstance(obj, DownloadRecord):
+        return obj.como_dict()
+    if isinstance(obj, MutableSequence):
+        return list(obj)  # Lista lida do cache binário
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import re
+import struct
+
+from search_index import normalizar_titulo
+
+
+PERMUTACOES = 8   # tamanho da assinatura MinHash
+FAIXAS = 4        # faixas do LSH (2 linhas cada): um par com Jaccard 0.8 vira candidato em 98% das vezes
+LIMIAR = 0.7      # Jaccard mínimo entre os trigramas para dois títulos serem o mesmo jogo
+
+_NUMERO = re.compile(r'\d+')
+
+
+def extrair_btih(uri):
+    """Info-hash (40 hex minúsculos) de um magnet, ou None"""
+    if not isinstance(uri, str) or not uri.startswith('magnet:'):
+        return None
+    inicio = uri.lower().find('xt=urn:btih:')
+    if inicio < 0:
+        return None
+    valor = uri[inicio + 12:].split('&', 1)[0].strip()
+    if len(valor) == 40:
+        try:
+            return bytes.fromhex(valor).hex()
+        except ValueError:
+            return None
+    if len(valor) == 32:  # base32, formato antigo
+        try:
+            return base64.b32decode(valor.upper()).hex()
+        except ValueError:
+            return None
+    return None
+
+
+def _trigramas(palavras):
+    texto = f" {' '.join(palavras)} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+class _Conjuntos:
+    """Union-find sobre as posições da lista"""
+
+    def __init__(self, tamanho):
+        self.pai = list(range(tamanho))
+
+    def raiz(self, i):
+        pai = self.pai
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    def unir(self, a, b):
+        a, b = self.raiz(a), self.raiz(b)
+        if a != b:
+            self.pai[max(a, b)] = min(a, b)  # A raiz é sempre o item mais acima na lista
+
+
+class DuplicateFinder:
+    """Agrupa itens repetidos de uma lista de downloads.
+
+    Dois itens ficam no mesmo grupo quando têm um magnet com o mesmo info-hash
+    ou quando os títulos normalizados (sem pontuação, versões e palavras como
+    "repack") são parecidos. A semelhança é o Jaccard dos trigramas, mas só é
+    calculada para os pares que o LSH aponta: cada título ganha uma assinatura
+    MinHash e só os que caem no mesmo balde em alguma faixa são comparados.
+    Títulos que normalizados ficam iguais nem chegam a isso: vão direto para
+    o mesmo grupo.
+    Títulos com números diferentes (continuações) nunca se juntam pelo título.
+    """
+
+    def __init__(self, limiar=LIMIAR, permutacoes=PERMUTACOES, faixas=FAIXAS):
+        self.limiar = limiar
+        self.faixas = faixas
+        self.linhas = permutacoes // faixas
+        self.permutacoes = self.linhas * faixas
+        self._hashes = {}  # trigrama -> tupla com um hash por permutação
+
+    def assinatura(self, trigramas):
+        hashes = self._hashes
+        # Os mesmos trigramas se repetem em milhares de títulos: só os inéditos são calculados
+        for trigrama in [t for t in trigramas if t not in hashes]:
+            digest = hashlib.shake_128(trigrama.encode('utf-8')).digest(4 * self.permutacoes)
+            hashes[trigrama] = struct.unpack(f'<{self.permutacoes}I', digest)
+        return tuple(map(min, zip(*map(hashes.__getitem__, trigramas))))
+
+    def agrupar(self, itens):
+        """Lista de grupos (listas de posições em `itens`, em ordem), só os com 2+ itens"""
+        conjuntos = _Conjuntos(len(itens))
+        por_hash = {}    # info-hash -> primeira posição
+        por_titulo = {}  # título normalizado -> primeira posição
+        baldes = [{} for _ in range(self.faixas)]
+        trigramas = [None] * len(itens)
+        numeros = [None] * len(itens)
+
+        for posicao, item in enumerate(itens):
+            for uri in item.get('uris') or ():
+                info_hash = extrair_btih(uri)
+                if info_hash is not None:
+                    conjuntos.unir(por_hash.setdefault(info_hash, posicao), posicao)
+
+            titulo = item.get('title')
+            palavras = normalizar_titulo(titulo) if isinstance(titulo, str) else []
+            if not palavras:
+                continue
+            # Título normalizado igual: mesmo grupo sem calcular assinatura
+            primeiro = por_titulo.setdefault(' '.join(palavras), posicao)
+            if primeiro != posicao:
+                conjuntos.unir(primeiro, posicao)
+                continue
+            trigramas[posicao] = grams = _trigramas(palavras)
+            numeros[posicao] = frozenset(p for p in palavras if _NUMERO.fullmatch(p))
+            assinatura = self.assinatura(grams)
+            for faixa in range(self.faixas):
+                chave = assinatura[faixa * self.linhas:(faixa + 1) * self.linhas]
+                # Compara só com o primeiro do balde: linear mesmo num balde enorme
+                primeiro = baldes[faixa].setdefault(chave, posicao)
+                if primeiro != posicao and self._parecidos(primeiro, posicao, trigramas, numeros):
+                    conjuntos.unir(primeiro, posicao)
+
+        grupos = {}
+        for posicao in range(len(itens)):
+            grupos.setdefault(conjuntos.raiz(posicao), []).append(posicao)
+        return [grupo for grupo in grupos.values() if len(grupo) > 1]
+
+    def _parecidos(self, a, b, trigramas, numeros):
+        if numeros[a] != numeros[b]:
+            return False
+        ta, tb = trigramas[a], trigramas[b]
+        comuns = len(ta & tb)
+        return comuns / (len(ta) + len(tb) - comuns) >= self.limiar
@@ -0,0 +1,103 @@
+import json
+import os
+
+from download_store import para_json
+from json_output import LEGIVEL, salvar_json
+
+
+EXTENSAO = '.diario'
+LIMITE_REGISTROS = 500  # edições no diário antes de regravar a lista inteira
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+class EditJournal:
+    """Diário de edições (JSON Lines) gravado ao lado da lista.
+
+    Cada edição de item vira uma linha acrescentada ao fim do arquivo, em vez
+    de regravar a lista inteira. A primeira linha guarda o tamanho e a data da
+    lista a que o diário se refere: se a lista foi regravada (compactação) ou
+    trocada por fora, o diário antigo é ignorado. Compactar é gravar a lista
+    completa (temporário + os.replace) e só então apagar o diário.
+
+    Registros: {"editar": posição, "item": {...}} e {"adicionar": {...}}.
+    """
+
+    def __init__(self, caminho_lista):
+        self.caminho_lista = caminho_lista
+        self.caminho = caminho_lista + EXTENSAO
+        self.registros = 0
+        self._arquivo = None
+
+    def carregar(self):
+        """Registros válidos para a lista atual; um diário de outra versão da lista é apagado"""
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                linhas = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        try:
+            cabecalho = json.loads(linhas[0]) if linhas else {}
+            valido = cabecalho.get('lista') == _assinatura(self.caminho_lista)
+        except (ValueError, OSError, AttributeError):
+            valido = False
+        if not valido:
+            self.descartar()
+            return []
+        registros = []
+        for linha in linhas[1:]:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                break  # Última linha cortada por uma queda: o que veio antes vale
+        self.registros = len(registros)
+        return registros
+
+    def _abrir(self):
+        if self._arquivo is None:
+            novo = not os.path.exists(self.caminho)
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+            if novo:
+                self._escrever({'lista': _assinatura(self.caminho_lista)})
+        return self._arquivo
+
+    def _escrever(self, registro):
+        f = self._arquivo
+        f.write(json.dumps(registro, ensure_ascii=False, default=para_json) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+    def editar(self, posicao, item):
+        self._abrir()
+        self._escrever({'editar': posicao, 'item': item})
+        self.registros += 1
+
+    def adicionar(self, item):
+        self._abrir()
+        self._escrever({'adicionar': item})
+        self.registros += 1
+
+    def precisa_compactar(self):
+        return self.registros >= LIMITE_REGISTROS
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def descartar(self):
+        self.fechar()
+        self.registros = 0
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+
+    def compactar(self, dados, perfil=LEGIVEL):
+        """Grava a lista completa (já com as edições) no formato do perfil e apaga o diário"""
+        self.fechar()
+        salvar_json(self.caminho_lista, dados, perfil)
+        self.descartar()
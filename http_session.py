@@ -0,0 +1,68 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+TEMPO_LIMITE = (10, 30)   # conectar, esperar dados (segundos)
+HOSTS_NO_POOL = 16        # hosts diferentes com conexões guardadas ao mesmo tempo
+CONEXOES_POR_HOST = 32    # limite de conexões por host; além disso o pedido espera uma livre
+
+_sessao = None
+_lock = threading.Lock()
+
+
+def _tentativas():
+    # 429/503 ficam de fora: o download segmentado trata esses casos devolvendo o trecho às outras conexões
+    return Retry(
+        total=3,
+        connect=3,
+        read=2,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def obter_sessao():
+    """Sessão HTTP única do programa.
+
+    Reaproveita as conexões (keep-alive) entre downloads, carregamento de
+    listas e atualização da comunidade, evitando repetir DNS, TCP e TLS a cada
+    pedido. A sessão pode ser usada por várias threads ao mesmo tempo.
+    """
+    global _sessao
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=HOSTS_NO_POOL,
+                    pool_maxsize=CONEXOES_POR_HOST,
+                    pool_block=True,  # Sem isso o urllib3 abre conexões extras e as descarta depois
+                    max_retries=_tentativas(),
+                )
+                sessao.mount('https://', adaptador)
+                sessao.mount('http://', adaptador)
+                sessao.headers['Accept-Encoding'] = ACCEPT_ENCODING  # gzip/deflate (e br/zstd se instalados)
+                _sessao = sessao
+    return _sessao
+
+
+def get(url, **kwargs):
+    """`requests.get` pela sessão compartilhada, com o tempo limite padrão"""
+    kwargs.setdefault('timeout', TEMPO_LIMITE)
+    return obter_sessao().get(url, **kwargs)
+
+
+def fechar_sessao():
+    global _sessao
+    with _lock:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from json_output import LEGIVEL, abrir_escrita, blocos_arquivo, codificador, compressao_pelo_nome
+from json_stream import StreamingDownloadsParser
+
+
+ESPERA_PROGRESSO = 0.1  # segundos entre checagens de progresso/cancelamento na união paralela
+
+
+def _normalizar(texto):
+    """Minúsculas (casefold), sem acentos e com os espaços reduzidos a um só"""
+    if texto.isascii():
+        return ' '.join(texto.lower().split())  # Caso comum: sem acentos para tirar
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split())
+
+
+def impressao(item):
+    """Identidade do item para a união: título normalizado + links (em qualquer ordem).
+
+    Devolve 8 bytes do BLAKE2b como inteiro, ou None se o item não tem título.
+    Dois itens com o mesmo título e links diferentes (outra versão, outro
+    repack) continuam os dois na lista.
+    """
+    titulo = item.get('title')
+    if not isinstance(titulo, str) or not titulo.strip():
+        return None
+    uris = item.get('uris')
+    uris = sorted(u.strip() for u in uris if isinstance(u, str)) if isinstance(uris, list) else []
+    texto = '\x1f'.join([_normalizar(titulo)] + uris)
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _itens(caminho, parser, cancelado, ao_ler):
+    anterior = 0
+    for bloco, lidos, _ in blocos_arquivo(caminho):  # .json.gz/.json.zst são lidos descompactando
+        if cancelado is not None and cancelado():
+            return
+        ao_ler(lidos - anterior)
+        anterior = lidos
+        yield from parser.feed(bloco)
+    yield from parser.close()
+
+
+def _abrir_lista(saida, chaves, posicao_lista):
+    """Grava as chaves que vinham antes de "downloads" e abre a lista; retorna quantas foram gravadas"""
+    antes = posicao_lista if posicao_lista is not None else len(chaves)
+    for chave, valor in chaves[:antes]:
+        saida.write(f'{json.dumps(chave, ensure_ascii=False)}: {json.dumps(valor, ensure_ascii=False)},\n')
+    saida.write('"downloads": [\n')
+    return antes
+
+
+def _fechar_lista(saida, chaves_depois):
+    """Fecha a lista e grava as chaves que vinham depois dela"""
+    saida.write('\n]')
+    for chave, valor in chaves_depois:
+        saida.write(f',\n{json.dumps(chave, ensure_ascii=False)}: {json.dumps(valor, ensure_ascii=False)}')
+    saida.write('\n}\n')
+
+
+def unir_listas(caminhos, destino, ao_progresso=None, cancelado=None, perfil=LEGIVEL):
+    """Une as listas em `destino` lendo e gravando aos poucos.
+
+    Os arquivos são lidos um depois do outro, na ordem dada, e cada item
+    repetido (mesma `impressao`) fica só na primeira ocorrência. Só as
+    impressões ficam em memória, então o consumo depende do número de itens
+    distintos e não do tamanho dos arquivos. O nome e as outras chaves vêm do
+    primeiro arquivo. Grava num temporário e troca no fim: cancelar ou falhar
+    não deixa um arquivo pela metade. O destino sai compactado se o nome
+    termina em .gz/.zst, e os itens saem compactos fora do perfil legível.
+
+    Retorna (itens gravados, itens descartados por repetidos ou sem título),
+    ou None se cancelado.
+    """
+    total_bytes = sum(os.path.getsize(caminho) for caminho in caminhos) or 1
+    lidos = 0
+    vistos = set()
+    gravados = descartados = 0
+    temporario = destino + '.tmp'
+    codificar = codificador(perfil)
+
+    def ao_ler(quantidade):
+        nonlocal lidos
+        lidos += quantidade
+        if ao_progresso is not None:
+            ao_progresso(min(100, lidos * 100 // total_bytes), gravados)
+
+    try:
+        with abrir_escrita(temporario, compressao_pelo_nome(destino)) as saida:
+            saida.write('{\n')
+            primeiro = None  # parser do primeiro arquivo: dá o nome e as outras chaves
+            escritas = 0     # chaves do primeiro arquivo já gravadas antes de "downloads"
+            for caminho in caminhos:
+                parser = StreamingDownloadsParser()
+                for item in _itens(caminho, parser, cancelado, ao_ler):
+                    if primeiro is None:
+                        # Primeiro item: as chaves que vinham antes da lista já são conhecidas
+                        primeiro, escritas = parser, _abrir_lista(saida, list(parser.cabecalho.items()), parser.posicao_lista)
+                    chave = impressao(item)
+                    if chave is None or chave in vistos:
+                        descartados += 1
+                        continue
+                    vistos.add(chave)
+                    if gravados:
+                        saida.write(',\n')
+                    saida.write(codificar(item))
+                    gravados += 1
+                if cancelado is not None and cancelado():
+                    return None
+                if primeiro is None:
+                    # Primeiro arquivo sem itens
+                    primeiro, escritas = parser, _abrir_lista(saida, list(parser.cabecalho.items()), parser.posicao_lista)
+            if primeiro is None:
+                _abrir_lista(saida, [], None)
+            _fechar_lista(saida, list(primeiro.cabecalho.items())[escritas:] if primeiro else [])
+        os.replace(temporario, destino)
+        return gravados, descartados
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _preparar_arquivo(indice, caminho, parte, progresso, parar, perfil):
+    """Processo auxiliar: lê um arquivo e grava em `parte` os itens sem repetição dentro dele.
+
+    Cada linha da parte é a impressão em hexadecimal, um TAB e o item em
+    JSON; juntar as partes depois não precisa decodificar nada de novo.
+    Retorna (cabeçalho, posição da lista, gravados, descartados), ou None se
+    `parar` foi acionado.
+    """
+    parser = StreamingDownloadsParser()
+    total = os.path.getsize(caminho) or 1
+    lidos = 0
+    vistos = set()
+    gravados = descartados = 0
+    codificar = codificador(perfil)
+
+    def ao_ler(quantidade):
+        nonlocal lidos
+        lidos += quantidade
+        progresso.put((indice, min(100, lidos * 100 // total)))  # Um aviso por bloco de 1 MiB
+
+    with open(parte, 'w', encoding='utf-8', newline='\n') as saida:
+        for item in _itens(caminho, parser, parar.is_set, ao_ler):
+            chave = impressao(item)
+            if chave is None or chave in vistos:
+                descartados += 1
+                continue
+            vistos.add(chave)
+            saida.write(f'{chave:016x}\t{codificar(item)}\n')
+            gravados += 1
+    if parar.is_set():
+        return None
+    return list(parser.cabecalho.items()), parser.posicao_lista, gravados, descartados
+
+
+def unir_listas_paralelo(caminhos, destino, ao_progresso=None, cancelado=None, processos=None, perfil=LEGIVEL):
+    """Como `unir_listas`, mas cada arquivo é lido e processado num processo separado.
+
+    Os processos gravam partes já sem repetidos internos; no fim as partes
+    são juntadas na ordem dos arquivos, descartando o que já apareceu num
+    arquivo anterior. O tempo total passa a ser o do maior arquivo (com
+    núcleos suficientes) e não a soma de todos.
+
+    `ao_progresso(indice_do_arquivo, porcentagem)` é chamado na thread de
+    quem chamou. Retorna (gravados, descartados), ou None se cancelado.
+    """
+    processos = processos or min(len(caminhos), os.cpu_count() or 1)
+    partes = [f'{destino}.parte{indice}' for indice in range(len(caminhos))]
+    temporario = destino + '.tmp'
+    try:
+        with multiprocessing.Manager() as gerente, ProcessPoolExecutor(max_workers=processos) as executor:
+            progresso = gerente.Queue()
+            parar = gerente.Event()
+            tarefas = [executor.submit(_preparar_arquivo, indice, caminho, parte, progresso, parar, perfil)
+                       for indice, (caminho, parte) in enumerate(zip(caminhos, partes))]
+            while not all(tarefa.done() for tarefa in tarefas) or not progresso.empty():
+                if cancelado is not None and cancelado():
+                    parar.set()
+                try:
+                    indice, porcentagem = progresso.get(timeout=ESPERA_PROGRESSO)
+                except queue.Empty:
+                    continue
+                if ao_progresso is not None:
+                    ao_progresso(indice, porcentagem)
+            resultados = [tarefa.result() for tarefa in tarefas]  # Repassa a exceção de um processo
+        if cancelado is not None and cancelado() or None in resultados:
+            return None
+
+        vistos = set()
+        gravados = 0
+        descartados = sum(resultado[3] for resultado in resultados)
+        cabecalho, posicao_lista = resultados[0][0], resultados[0][1]  # Nome e chaves do primeiro arquivo
+        with abrir_escrita(temporario, compressao_pelo_nome(destino)) as saida:
+            saida.write('{\n')
+            antes = _abrir_lista(saida, cabecalho, posicao_lista)
+            for parte in partes:
+                with open(parte, 'r', encoding='utf-8', newline='\n') as entrada:
+                    for linha in entrada:
+                        chave = int(linha[:16], 16)
+                        if chave in vistos:
+                            descartados += 1
+                            continue
+                        vistos.add(chave)
+                        if gravados:
+                            saida.write(',\n')
+                        saida.write(linha[17:-1])
+                        gravados += 1
+            _fechar_lista(saida, cabecalho[antes:])
+        os.replace(temporario, destino)
+        return gravados, descartados
+    finally:
+        for caminho in partes + [temporario]:
+            if os.path.exists(caminho):
+                os.remove(caminho)
@@ -0,0 +1,183 @@
+import contextlib
+import gzip
+import io
+import json
+import os
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from download_store import para_json
+
+
+LEGIVEL = 'legivel'
+COMPACTO = 'compacto'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Perfil -> (nome no menu, extensão sugerida ao salvar)
+PERFIS = {
+    LEGIVEL: ('Legível (indentado)', '.json'),
+    COMPACTO: ('Compacto', '.json'),
+    GZIP: ('Compacto + gzip', '.json.gz'),
+}
+if ZSTD_AVAILABLE:
+    PERFIS[ZSTD] = ('Compacto + zstd', '.json.zst')
+
+TAMANHO_BLOCO = 1024 * 1024  # bytes por escrita no disco e por leitura
+NIVEL_GZIP = 6               # o padrão do gzip (9) custa o dobro do tempo para ganhar ~1%
+NIVEL_ZSTD = 3
+
+_ASSINATURAS = ((b'\x1f\x8b', GZIP), (b'\x28\xb5\x2f\xfd', ZSTD))
+_codificar_compacto = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=para_json).encode
+_legivel = json.JSONEncoder(ensure_ascii=False, indent=4, default=para_json)
+
+
+def compressao_pelo_nome(caminho):
+    """GZIP, ZSTD ou None conforme a extensão do arquivo"""
+    nome = caminho.lower()
+    if nome.endswith('.gz'):
+        return GZIP
+    if nome.endswith('.zst'):
+        return ZSTD
+    return None
+
+
+def ajustar_extensao(caminho, perfil):
+    """Acrescenta .gz/.zst a um nome sem extensão de compressão quando o perfil compacta"""
+    if perfil not in (GZIP, ZSTD) or compressao_pelo_nome(caminho):
+        return caminho
+    extensao = PERFIS[perfil][1]
+    if caminho.lower().endswith('.json'):
+        return caminho + extensao[len('.json'):]
+    return caminho + extensao
+
+
+def blocos_arquivo(caminho, tamanho=TAMANHO_BLOCO):
+    """Gera (bytes, lidos, total) de uma lista local, descompactando gzip/zstd.
+
+    A compressão é reconhecida pelo começo do arquivo, não pelo nome. `lidos`
+    e `total` contam os bytes em disco (compactados), para o progresso.
+    """
+    total = os.path.getsize(caminho)
+    with open(caminho, 'rb') as arquivo:
+        inicio = arquivo.read(4)
+        arquivo.seek(0)
+        compressao = next((tipo for assinatura, tipo in _ASSINATURAS if inicio.startswith(assinatura)), None)
+        if compressao == GZIP:
+            entrada = gzip.GzipFile(fileobj=arquivo)
+        elif compressao == ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ValueError('Arquivo compactado com zstd: instale o pacote "zstandard" para abri-lo')
+            entrada = zstandard.ZstdDecompressor().stream_reader(arquivo, closefd=False)
+        else:
+            entrada = arquivo
+        with entrada:
+            while True:
+                bloco = entrada.read(tamanho)
+                if not bloco:
+                    break
+                yield bloco, arquivo.tell(), total
+
+
+@contextlib.contextmanager
+def abrir_escrita(caminho, compressao=None):
+    """Arquivo de texto (UTF-8) para gravar em `caminho`, com fsync no fim.
+
+    Sem `compressao`, ela vem da extensão de `caminho`.
+    """
+    if compressao is None:
+        compressao = compressao_pelo_nome(caminho)
+    if compressao == ZSTD and not ZSTD_AVAILABLE:
+        raise ValueError('Para gravar .zst instale o pacote "zstandard"')
+    with open(caminho, 'wb', buffering=TAMANHO_BLOCO) as arquivo:
+        if compressao == GZIP:
+            saida = gzip.GzipFile(filename='', mode='wb', fileobj=arquivo, compresslevel=NIVEL_GZIP)
+        elif compressao == ZSTD:
+            saida = zstandard.ZstdCompressor(level=NIVEL_ZSTD).stream_writer(arquivo, closefd=False)
+        else:
+            saida = arquivo
+        texto = io.TextIOWrapper(saida, encoding='utf-8', newline='\n')
+        try:
+            yield texto
+        finally:
+            texto.detach()  # Descarrega o texto sem fechar a camada de baixo
+            if saida is not arquivo:
+                saida.close()  # Grava o fim do gzip/zstd; o arquivo continua aberto
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+
+def codificador(perfil):
+    """Função que converte um item em JSON numa linha só: compacta fora do perfil legível"""
+    if perfil == LEGIVEL:
+        return json.JSONEncoder(ensure_ascii=False, default=para_json).encode
+    return _codificar_compacto
+
+
+def _partes(dados, perfil):
+    """Gera os pedaços do JSON sem montar uma string com o arquivo inteiro.
+
+    O resultado é igual ao de json.dumps com indent=4 (legível) ou com os
+    separadores compactos. No compacto, cada item de "downloads" passa pelo
+    codificador em C, bem mais rápido que o iterencode (sempre em Python).
+    """
+    if perfil == LEGIVEL:
+        yield from _legivel.iterencode(dados)
+        return
+    if not isinstance(dados, dict) or not dados:
+        yield _codificar_compacto(dados)
+        return
+    yield '{'
+    for posicao, (chave, conteudo) in enumerate(dados.items()):
+        yield (',' if posicao else '') + _codificar_compacto(str(chave)) + ':'
+        if chave == 'downloads' and isinstance(conteudo, list):
+            yield '['
+            for indice, item in enumerate(conteudo):
+                yield (',' if indice else '') + _codificar_compacto(item)
+            yield ']'
+        else:
+            yield _codificar_compacto(conteudo)
+    yield '}'
+
+
+def salvar_json(caminho, dados, perfil=LEGIVEL):
+    """Grava a lista no formato do perfil, num temporário trocado pelo final só no fim.
+
+    A compressão segue a extensão de `caminho` (.gz, .zst); o perfil define o
+    layout (indentado ou compacto). O texto vai para o disco em blocos de
+    TAMANHO_BLOCO conforme é gerado. Uma queda no meio da gravação deixa o
+    arquivo anterior intacto em vez de um JSON cortado.
+    """
+    temporario = caminho + '.tmp'
+    try:
+        with abrir_escrita(temporario, compressao_pelo_nome(caminho)) as saida:
+            escrever = saida.write
+            for parte in _partes(dados, perfil):
+                escrever(parte)
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+
+def carregar_perfil(caminho):
+    """Perfil de saída escolhido no menu; padrão legível"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            perfil = json.load(f).get('perfil')
+    except (OSError, ValueError, AttributeError):
+        return LEGIVEL
+    return perfil if perfil in PERFIS else LEGIVEL
+
+
+def salvar_perfil(caminho, perfil):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'perfil': perfil}, f, indent=4)
+    os.replace(temporario, caminho)
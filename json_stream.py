@@ -0,0 +1,154 @@
+import codecs
+import json
+
+
+class StreamingDownloadsParser:
+    """Parser incremental para listas no formato {"name": ..., "downloads": [...]}.
+
+    Recebe o arquivo em pedaços (feed) e devolve os itens de "downloads" assim
+    que cada um termina de chegar, sem nunca montar o documento inteiro em
+    memória. As outras chaves do objeto raiz ficam em `cabecalho`.
+    """
+
+    CHAVE_LISTA = 'downloads'
+
+    def __init__(self):
+        self._texto = codecs.getincrementaldecoder('utf-8-sig')()
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._estado = 'inicio'
+        self._chave = None
+        self.cabecalho = {}
+        self.posicao_lista = None  # posição da chave "downloads" entre as chaves do objeto raiz
+        self.total = 0
+
+    def feed(self, dados):
+        """Recebe bytes e retorna a lista de itens completos encontrados"""
+        return self.feed_text(self._texto.decode(dados))
+
+    def feed_text(self, texto):
+        self._buf = self._buf[self._pos:] + texto
+        self._pos = 0
+        itens = []
+        self._processar(itens, final=False)
+        return itens
+
+    def close(self):
+        """Processa o que sobrou no buffer e confere se o documento terminou"""
+        self._buf = self._buf[self._pos:] + self._texto.decode(b'', final=True)
+        self._pos = 0
+        itens = []
+        self._processar(itens, final=True)
+        if self._estado != 'fim':
+            raise ValueError('JSON incompleto: o arquivo terminou antes do fim da lista')
+        return itens
+
+    def montar_dados(self, downloads):
+        """Monta o dicionário final com as chaves na ordem original do arquivo"""
+        chaves = list(self.cabecalho.items())
+        posicao = self.posicao_lista if self.posicao_lista is not None else len(chaves)
+        chaves.insert(posicao, (self.CHAVE_LISTA, downloads))
+        return dict(chaves)
+
+    def _pular_espacos(self):
+        buf = self._buf
+        pos = self._pos
+        tamanho = len(buf)
+        while pos < tamanho and buf[pos] in ' \t\r\n':
+            pos += 1
+        self._pos = pos
+        return pos < tamanho
+
+    def _decodificar(self, final):
+        """Decodifica um valor JSON completo a partir da posição atual, ou None se faltam dados"""
+        try:
+            valor, fim = self._json.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # Um número no fim do buffer pode continuar no próximo pedaço
+        if fim == len(self._buf) and not final:
+            return None
+        self._pos = fim
+        return (valor,)
+
+    def _esperar(self, caractere):
+        if self._buf[self._pos] != caractere:
+            raise ValueError(f"JSON inválido: esperado '{caractere}' na posição {self._pos}")
+        self._pos += 1
+
+    def _processar(self, itens, final):
+        while True:
+            if not self._pular_espacos():
+                return
+            estado = self._estado
+            atual = self._buf[self._pos]
+
+            if estado == 'inicio':
+                if atual != '{':
+                    raise ValueError('O arquivo não contém um objeto JSON de lista de downloads')
+                self._pos += 1
+                self._estado = 'chave_ou_fim'
+
+            elif estado in ('chave_ou_fim', 'chave'):
+                if atual == '}' and estado == 'chave_ou_fim':
+                    self._pos += 1
+                    self._estado = 'fim'
+                    continue
+                lido = self._decodificar(final)
+                if lido is None:
+                    return
+                self._chave = lido[0]
+                self._estado = 'dois_pontos'
+
+            elif estado == 'dois_pontos':
+                self._esperar(':')
+                self._estado = 'valor'
+
+            elif estado == 'valor':
+                if self._chave == self.CHAVE_LISTA and atual == '[':
+                    self._pos += 1
+                    self.posicao_lista = len(self.cabecalho)
+                    self._estado = 'lista_inicio'
+                    continue
+                lido = self._decodificar(final)
+                if lido is None:
+                    return
+                self.cabecalho[self._chave] = lido[0]
+                self._estado = 'apos_valor'
+
+            elif estado == 'lista_inicio':
+                if atual == ']':
+                    self._pos += 1
+                    self._estado = 'apos_valor'
+                else:
+                    self._estado = 'lista_item'
+
+            elif estado == 'lista_item':
+                lido = self._decodificar(final)
+                if lido is None:
+                    return
+                itens.append(lido[0])
+                self.total += 1
+                self._estado = 'lista_apos_item'
+
+            elif estado == 'lista_apos_item':
+                if atual == ']':
+                    self._pos += 1
+                    self._estado = 'apos_valor'
+                else:
+                    self._esperar(',')
+                    self._estado = 'lista_item'
+
+            elif estado == 'apos_valor':
+                if atual == '}':
+                    self._pos += 1
+                    self._estado = 'fim'
+                else:
+                    self._esperar(',')
+                    self._estado = 'chave'
+
+            else:  # 'fim'
+                raise ValueError(f'JSON inválido: conteúdo extra após o fim do objeto (posição {self._pos})')
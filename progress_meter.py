@@ -0,0 +1,83 @@
+import math
+import threading
+import time
+
+
+MEIA_VIDA = 3.0  # segundos para uma mudança de velocidade pesar metade na média
+
+
+class SpeedEstimator:
+    """Velocidade por média móvel exponencial (EWMA) das amostras recentes.
+
+    Diferente de bytes totais / tempo total, acompanha a velocidade atual: uma
+    conexão que caiu no meio do download aparece lenta em poucos segundos, e o
+    ETA segue junto. As amostras podem chegar em intervalos irregulares.
+    """
+
+    def __init__(self, meia_vida=MEIA_VIDA):
+        self._tau = meia_vida / math.log(2)
+        self.velocidade = 0.0
+        self._ultimo = None  # (instante, bytes) da amostra anterior
+        self._primeira = True
+
+    def atualizar(self, baixados, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        if self._ultimo is None:
+            # Primeira leitura só marca o ponto de partida (bytes de um download retomado não contam)
+            self._ultimo = (agora, baixados)
+            return self.velocidade
+        instante, anterior = self._ultimo
+        intervalo = agora - instante
+        if intervalo <= 0:
+            return self.velocidade
+        amostra = max(0, baixados - anterior) / intervalo
+        if self._primeira:
+            self.velocidade = amostra
+            self._primeira = False
+        else:
+            alfa = 1 - math.exp(-intervalo / self._tau)
+            self.velocidade += alfa * (amostra - self.velocidade)
+        self._ultimo = (agora, baixados)
+        return self.velocidade
+
+    def eta(self, restante):
+        """Segundos que faltam na velocidade atual (None se parado)"""
+        return restante / self.velocidade if self.velocidade > 0 else None
+
+
+class ProgressAggregator:
+    """Junta o progresso relatado pelas threads de download.
+
+    As threads só guardam o último valor (`relatar` é barato e não cruza
+    threads com sinais); a interface chama `coletar` no seu próprio ritmo e
+    recebe tudo de uma vez, com a velocidade de cada download já estimada.
+    """
+
+    def __init__(self, meia_vida=MEIA_VIDA):
+        self.meia_vida = meia_vida
+        self._lock = threading.Lock()
+        self._relatos = {}    # chave -> (baixados, total) mais recente
+        self._medidores = {}  # chave -> SpeedEstimator
+
+    def relatar(self, chave, baixados, total):
+        with self._lock:
+            self._relatos[chave] = (baixados, total)
+
+    def coletar(self, agora=None):
+        """{chave: (baixados, total, velocidade)} de todos os downloads acompanhados"""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            relatos = dict(self._relatos)
+        resultado = {}
+        for chave, (baixados, total) in relatos.items():
+            medidor = self._medidores.get(chave)
+            if medidor is None:
+                medidor = self._medidores[chave] = SpeedEstimator(self.meia_vida)
+            # Sem relato novo a amostra é zero e a velocidade cai sozinha (download travado)
+            resultado[chave] = (baixados, total, medidor.atualizar(baixados, agora))
+        return resultado
+
+    def esquecer(self, chave):
+        with self._lock:
+            self._relatos.pop(chave, None)
+        self._medidores.pop(chave, None)
@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import threading
+import time
+
+
+RAJADA = 0.25       # segundos de tráfego que podem passar de uma vez depois de uma pausa
+FATIA_ESPERA = 0.25  # a espera é dividida em fatias para atender cancelamento e mudança de limite
+
+
+class TokenBucket:
+    """Limita a taxa (bytes/s) de quem chama `consumir`; taxa 0 = sem limite.
+
+    Em vez de reabastecer fichas periodicamente, guarda o instante em que o
+    próximo byte estaria liberado: cada chamada só faz uma conta e, se passou
+    do limite, dorme o tempo exato. Várias threads podem dividir o mesmo balde
+    (limite global) e cada uma espera a sua vez na ordem em que pediu.
+    """
+
+    def __init__(self, taxa=0):
+        self.taxa = taxa
+        self._livre_em = 0.0
+        self._versao = 0  # muda a cada novo limite; quem está esperando recalcula
+        self._lock = threading.Lock()
+
+    def definir_taxa(self, taxa):
+        with self._lock:
+            if taxa != self.taxa:
+                self.taxa = taxa
+                self._livre_em = 0.0
+                self._versao += 1
+
+    def consumir(self, quantidade, cancelado=None):
+        if self.taxa <= 0:
+            return
+        with self._lock:
+            taxa = self.taxa
+            if taxa <= 0:
+                return
+            agora = time.monotonic()
+            inicio = max(self._livre_em, agora - RAJADA)
+            self._livre_em = inicio + quantidade / taxa
+            liberar_em = self._livre_em - RAJADA
+            versao = self._versao
+        while True:
+            espera = liberar_em - time.monotonic()
+            if espera <= 0 or versao != self._versao or (cancelado and cancelado()):
+                return
+            time.sleep(min(espera, FATIA_ESPERA))
+
+    def cobrar(self, quantidade):
+        """Desconta bytes que passaram por fora do balde (torrents), sem esperar.
+
+        Quem chama `consumir` depois espera também por esses bytes.
+        """
+        with self._lock:
+            if self.taxa <= 0:
+                return
+            agora = time.monotonic()
+            self._livre_em = max(self._livre_em, agora - RAJADA) + quantidade / self.taxa
+
+
+def limitar(quantidade, baldes, cancelado=None):
+    """Passa `quantidade` bytes por todos os baldes (global e do download)"""
+    for balde in baldes:
+        balde.consumir(quantidade, cancelado)
+
+
+class BandwidthSchedule:
+    """Limites por horário: lista de (início, fim, taxa) com horários em minutos do dia.
+
+    Um intervalo pode virar a meia-noite (22:00-07:00). Vale a primeira regra
+    que cobre o horário; fora de todas, vale o limite manual.
+    """
+
+    _REGRA = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s+(\d+)\s*$')
+
+    def __init__(self, regras=()):
+        self.regras = list(regras)
+
+    def taxa_em(self, momento, padrao=0):
+        minuto = momento.hour * 60 + momento.minute
+        for inicio, fim, taxa in self.regras:
+            if inicio <= fim:
+                dentro = inicio <= minuto < fim
+            else:
+                dentro = minuto >= inicio or minuto < fim
+            if dentro:
+                return taxa
+        return padrao
+
+    @classmethod
+    def de_texto(cls, texto):
+        """Uma regra por linha: 'HH:MM-HH:MM KB/s' (0 = sem limite). Linhas vazias e '#' são ignoradas."""
+        regras = []
+        for numero, linha in enumerate(texto.splitlines(), 1):
+            linha = linha.split('#', 1)[0]
+            if not linha.strip():
+                continue
+            m = cls._REGRA.match(linha)
+            if not m:
+                raise ValueError(f'Linha {numero}: use o formato HH:MM-HH:MM KB/s')
+            h1, m1, h2, m2, kb = map(int, m.groups())
+            if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59 or (h2 == 24 and m2):
+                raise ValueError(f'Linha {numero}: horário inválido')
+            regras.append((h1 * 60 + m1, h2 * 60 + m2, kb * 1024))
+        return cls(regras)
+
+    def como_texto(self):
+        return '\n'.join(
+            f'{inicio // 60:02d}:{inicio % 60:02d}-{fim // 60:02d}:{fim % 60:02d} {taxa // 1024}'
+            for inicio, fim, taxa in self.regras
+        )
+
+
+def carregar_limites(caminho):
+    """(limite global em bytes/s, agenda) salvos; padrão sem limite"""
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        return int(dados.get('global', 0)), BandwidthSchedule([tuple(r) for r in dados.get('agenda', [])])
+    except (OSError, ValueError, TypeError):
+        return 0, BandwidthSchedule()
+
+
+def salvar_limites(caminho, taxa_global, agenda):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'global': taxa_global, 'agenda': [list(r) for r in agenda.regras]}, f, indent=4)
+    os.replace(temporario, caminho)
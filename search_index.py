@@ -0,0 +1,491 @@
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class TitleSearchIndex:
+    """Índice invertido em dois níveis sobre os títulos dos downloads.
+
+    Cada palavra (título em minúsculas separado por espaços) aponta para os
+    docids dos títulos que a contêm, e cada trigrama aponta para as palavras
+    do vocabulário que o contêm. Uma substring sem espaços do termo buscado
+    sempre cai dentro de uma única palavra do título, então os trigramas do
+    vocabulário bastam para achar os candidatos; a substring completa é
+    conferida no título no final.
+
+    Os docids são crescentes na ordem da lista, então ordenar os candidatos
+    devolve os resultados na ordem original do arquivo.
+
+    As buscas rodam em uma thread de trabalho enquanto a interface pode editar
+    a lista, por isso as alterações e a escolha dos candidatos passam pelo
+    mesmo lock; a conferência dos títulos roda fora dele. `versao` muda a cada
+    alteração e diz se um resultado antigo ainda pode ser refinado.
+
+    `construir` monta o índice na hora; `preparar` só guarda a lista e deixa a
+    montagem para a primeira busca (que já roda fora da thread da interface).
+    """
+
+    # Quantos candidatos verificar entre uma checagem de cancelamento e outra
+    BLOCO_CANCELAMENTO = 8192
+
+    def __init__(self, chave=id):
+        # Função que identifica um item de forma estável (os dicts não são hasheáveis)
+        self._chave = chave
+        self._lock = threading.RLock()
+        self._pendente = None  # lista aguardando a primeira busca para ser indexada
+        self.versao = 0
+        self.limpar()
+
+    def limpar(self):
+        self.versao += 1
+        self._itens = []        # docid -> item (None se removido)
+        self._titulos = []      # docid -> título em minúsculas (None se removido)
+        self._docids = {}       # chave(item) -> docid
+        self._postings = {}     # palavra -> array('I') de docids em ordem crescente
+        self._vocabulario = {}  # trigrama -> lista de palavras que o contêm
+        self._removidos = 0
+
+    def __len__(self):
+        return len(self._docids)
+
+    @staticmethod
+    def _titulo(item):
+        return item.get('title', 'Sem título').lower()
+
+    def _indexar_palavra(self, palavra):
+        for tri in _trigramas(palavra):
+            palavras = self._vocabulario.get(tri)
+            if palavras is None:
+                self._vocabulario[tri] = [palavra]
+            else:
+                palavras.append(palavra)
+
+    def construir(self, itens):
+        """Monta o índice do zero (chamado quando uma lista nova é carregada)"""
+        with self._lock:
+            self._pendente = None
+            self._construir(itens)
+
+    def preparar(self, itens):
+        """Agenda a montagem do índice para a primeira busca"""
+        with self._lock:
+            self.limpar()
+            self._pendente = itens
+
+    def _garantir_construido(self):
+        if self._pendente is not None:
+            itens, self._pendente = self._pendente, None
+            self._construir(itens)
+
+    def _construir(self, itens):
+        self.limpar()
+        chave = self._chave
+        self._itens = list(itens)
+        self._titulos = [self._titulo(item) for item in self._itens]
+        self._docids = {chave(item): docid for docid, item in enumerate(self._itens)}
+
+        # Listas comuns durante a montagem (append mais barato), arrays compactos no final
+        postings = defaultdict(list)
+        for docid, titulo in enumerate(self._titulos):
+            for palavra in set(titulo.split()):
+                postings[palavra].append(docid)
+        self._postings = {palavra: array('I', lista) for palavra, lista in postings.items()}
+        self._montar_vocabulario()
+
+    def _montar_vocabulario(self):
+        vocabulario = defaultdict(list)
+        for palavra in self._postings:
+            for tri in _trigramas(palavra):
+                vocabulario[tri].append(palavra)
+        self._vocabulario = dict(vocabulario)
+
+    def _adicionar_palavras(self, docid, palavras):
+        for palavra in palavras:
+            lista = self._postings.get(palavra)
+            if lista is None:
+                self._postings[palavra] = array('I', (docid,))
+                self._indexar_palavra(palavra)
+                continue
+            pos = bisect_left(lista, docid)
+            if pos == len(lista) or lista[pos] != docid:
+                lista.insert(pos, docid)
+
+    def _remover_palavras(self, docid, palavras):
+        # A palavra continua no vocabulário, com postings vazios se ninguém mais a usa
+        for palavra in palavras:
+            lista = self._postings.get(palavra)
+            if lista is None:
+                continue
+            pos = bisect_left(lista, docid)
+            if pos < len(lista) and lista[pos] == docid:
+                del lista[pos]
+
+    def adicionar(self, item):
+        """Adiciona um item no fim da lista (docid maior que todos os existentes)"""
+        with self._lock:
+            # Com a lista pendente, o item já está nela; se a montagem aconteceu
+            # depois do item entrar na lista, ele já foi indexado
+            if self._pendente is not None or self._chave(item) in self._docids:
+                return
+            self.versao += 1
+            docid = len(self._itens)
+            titulo = self._titulo(item)
+            self._itens.append(item)
+            self._titulos.append(titulo)
+            self._docids[self._chave(item)] = docid
+            self._adicionar_palavras(docid, set(titulo.split()))
+
+    def adicionar_varios(self, itens):
+        """Acrescenta um lote de itens no fim (carregamento progressivo da lista)"""
+        with self._lock:
+            if self._pendente is not None:
+                return
+            self.versao += 1
+            chave = self._chave
+            for item in itens:
+                if chave(item) in self._docids:
+                    continue
+                docid = len(self._itens)
+                titulo = self._titulo(item)
+                self._itens.append(item)
+                self._titulos.append(titulo)
+                self._docids[chave(item)] = docid
+                # docid é sempre o maior até agora: basta anexar no fim dos postings
+                for palavra in set(titulo.split()):
+                    lista = self._postings.get(palavra)
+                    if lista is None:
+                        self._postings[palavra] = array('I', (docid,))
+                        self._indexar_palavra(palavra)
+                    else:
+                        lista.append(docid)
+
+    def nova_referencia(self, itens):
+        """A lista foi trocada por outra com os mesmos itens (ex.: refeita sem os removidos)"""
+        with self._lock:
+            if self._pendente is not None:
+                self._pendente = itens
+
+    def atualizar(self, item):
+        """Reindexa o título de um item editado, mantendo a posição dele"""
+        with self._lock:
+            if self._pendente is not None:
+                return
+            docid = self._docids.get(self._chave(item))
+            if docid is None:
+                self.adicionar(item)
+                return
+            antigo = self._titulos[docid]
+            novo = self._titulo(item)
+            if novo == antigo:
+                return
+            self.versao += 1
+            self._titulos[docid] = novo
+            palavras_novas, palavras_antigas = set(novo.split()), set(antigo.split())
+            self._remover_palavras(docid, palavras_antigas - palavras_novas)
+            self._adicionar_palavras(docid, palavras_novas - palavras_antigas)
+
+    def remover_varios(self, itens):
+        """Tira os itens do índice; com a montagem pendente, a lista nova chega por `nova_referencia`"""
+        with self._lock:
+            if self._pendente is not None:
+                # Uma cópia aqui deixaria de ver os itens que `adicionar` espera encontrar na lista
+                return
+            self.versao += 1
+            for item in itens:
+                docid = self._docids.pop(self._chave(item), None)
+                if docid is not None:
+                    self._itens[docid] = None
+                    self._titulos[docid] = None
+                    self._removidos += 1
+            # Muitos buracos deixam os postings lentos: reconstrói só com os itens vivos
+            if self._removidos > len(self._docids):
+                self._construir([item for item in self._itens if item is not None])
+
+    def _palavras_com(self, fragmento):
+        """Palavras do vocabulário que contêm o fragmento (com 3 ou mais caracteres)"""
+        menor = None
+        for tri in _trigramas(fragmento):
+            palavras = self._vocabulario.get(tri)
+            if palavras is None:
+                return []
+            if menor is None or len(palavras) < len(menor):
+                menor = palavras
+        return [palavra for palavra in menor if fragmento in palavra]
+
+    def _postings_do_fragmento(self, fragmento, inicio_exato, fim_exato):
+        """Postings das palavras que podem conter o fragmento.
+
+        Um fragmento precedido de espaço no termo tem que ser o início de uma
+        palavra do título; seguido de espaço, o fim. Fragmentos entre dois
+        espaços são palavras inteiras e viram uma consulta direta.
+        """
+        if inicio_exato and fim_exato:
+            lista = self._postings.get(fragmento)
+            return [lista] if lista is not None else []
+        if len(fragmento) < 3:
+            return None
+        palavras = self._palavras_com(fragmento)
+        if inicio_exato:
+            palavras = [palavra for palavra in palavras if palavra.startswith(fragmento)]
+        elif fim_exato:
+            palavras = [palavra for palavra in palavras if palavra.endswith(fragmento)]
+        return [self._postings[palavra] for palavra in palavras]
+
+    def _verificar(self, termo, docids, titulos, itens, cancelado):
+        """Confere a substring em cada candidato, checando o cancelamento em blocos.
+
+        Roda fora do lock: `titulos` e `itens` são as listas do índice no
+        momento da consulta. Uma edição só troca um título de lugar e uma
+        remoção o deixa None; uma reconstrução cria listas novas.
+        """
+        if cancelado is None:
+            return [itens[d] for d in docids if titulos[d] is not None and termo in titulos[d]]
+        resultado = []
+        for inicio in range(0, len(docids), self.BLOCO_CANCELAMENTO):
+            if cancelado():
+                return None
+            resultado += [
+                itens[d] for d in docids[inicio:inicio + self.BLOCO_CANCELAMENTO]
+                if titulos[d] is not None and termo in titulos[d]
+            ]
+        return resultado
+
+    def buscar(self, termo, base=None, cancelado=None):
+        """Retorna os itens cujo título contém o termo, na ordem da lista.
+
+        `base` é um resultado anterior (de um termo contido neste) a ser apenas
+        refinado, em vez de consultar o índice inteiro. `cancelado` é uma função
+        consultada periodicamente; se ela retornar True a busca devolve None.
+        """
+        return self.consultar(termo, base, cancelado)[0]
+
+    def consultar(self, termo, base=None, cancelado=None):
+        """Como `buscar`, mas devolve (resultado, `versao` do índice em que a consulta foi feita).
+
+        O lock só fica preso enquanto os candidatos são escolhidos; a
+        conferência dos títulos, a parte longa, deixa a interface editar a lista.
+        """
+        termo = termo.lower()
+        with self._lock:
+            self._garantir_construido()
+            versao = self.versao
+            candidatos = self._candidatos_exatos(termo, base)
+            titulos, itens = self._titulos, self._itens
+        # A substring completa confirma cada candidato (e descarta os removidos)
+        return self._verificar(termo, candidatos, titulos, itens, cancelado), versao
+
+    def _candidatos_exatos(self, termo, base):
+        """Docids que podem conter o termo (uma cópia: os postings mudam depois que o lock é solto)"""
+        if base is not None:
+            return [self._docids[d] for d in map(self._chave, base) if d in self._docids]
+
+        fragmentos = termo.split()
+        if not fragmentos:
+            return range(len(self._titulos))
+
+        # Escolhe o fragmento do termo com menos documentos candidatos
+        melhor = None
+        melhor_total = None
+        ultimo = len(fragmentos) - 1
+        for k, fragmento in enumerate(fragmentos):
+            postings = self._postings_do_fragmento(
+                fragmento,
+                inicio_exato=k > 0 or termo[0].isspace(),
+                fim_exato=k < ultimo or termo[-1].isspace(),
+            )
+            if postings is None:
+                continue
+            total = sum(len(lista) for lista in postings)
+            if not total:
+                return []
+            if melhor is None or total < melhor_total:
+                melhor, melhor_total = postings, total
+
+        if melhor is None:
+            # Só fragmentos curtos (sem trigramas): varre os títulos já em minúsculas
+            return range(len(self._titulos))
+        if len(melhor) == 1:
+            return melhor[0].tolist()
+        return sorted(set().union(*melhor))
+
+
+# Palavras que não ajudam a identificar o jogo: grupos de repack, edições e conectivos
+PALAVRAS_RUIDO = frozenset("""
+    repack repacks fitgirl dodi elamigos xatab kaos decepticon gog steam rip
+    edition deluxe complete goty ultimate definitive digital bundle collection
+    dlc dlcs update updates multi the a an of and de do da e o
+""".split())
+
+_VERSAO = re.compile(r'\b(?:v|build\s*)?\d+(?:[._]\d+)+\w*|\bv\d+\b|\bbuild\s*\d+\b')
+_PALAVRA = re.compile(r'[^\W_]+')
+
+
+def normalizar_titulo(titulo):
+    """Minúsculas, sem acentos, sem pontuação, sem versões e sem palavras de ruído"""
+    texto = unicodedata.normalize('NFKD', titulo.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = _VERSAO.sub(' ', texto)
+    return [palavra for palavra in _PALAVRA.findall(texto) if palavra not in PALAVRAS_RUIDO]
+
+
+def distancia_edicao(a, b, limite):
+    """Distância de Damerau-Levenshtein (transposições adjacentes); para assim que passa do limite"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [0] * len(b)
+        menor = i
+        for j in range(1, len(b) + 1):
+            custo = 0 if a[i - 1] == b[j - 1] else 1
+            valor = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+            if anterior2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                valor = min(valor, anterior2[j - 2] + 1)
+            atual[j] = valor
+            if valor < menor:
+                menor = valor
+        if menor > limite:
+            return limite + 1
+        anterior2, anterior = anterior, atual
+    return anterior[len(b)]
+
+
+def _delecoes(palavra):
+    return {palavra[:i] + palavra[i + 1:] for i in range(len(palavra))}
+
+
+class FuzzyTitleIndex(TitleSearchIndex):
+    """Busca aproximada e ranqueada sobre os títulos normalizados.
+
+    Reaproveita os postings palavra -> docids do índice exato, mas as palavras
+    são os tokens normalizados do título. Os candidatos com erro de digitação
+    vêm de um mapa de deleções no estilo SymSpell (cada palavra do vocabulário
+    com uma letra a menos), e os prefixos de um vocabulário ordenado.
+
+    A montagem custa bem mais que a do índice exato, então a lista é sempre
+    entregue com `preparar` e indexada só na primeira busca aproximada.
+    """
+
+    MIN_FUZZY = 3        # palavras mais curtas só casam exatamente ou por prefixo
+    MAX_PREFIXOS = 300   # limite de palavras do vocabulário por prefixo
+    PESO_EXATO = 1.0
+    PESO_EDICAO = {1: 0.7, 2: 0.45}
+
+    @staticmethod
+    def _titulo(item):
+        return ' '.join(normalizar_titulo(item.get('title', 'Sem título')))
+
+    def limpar(self):
+        super().limpar()
+        self._delecoes = {}        # palavra com uma letra a menos -> palavras do vocabulário
+        self._vocab_ordenado = []  # para achar prefixos com bisect
+
+    def _montar_vocabulario(self):
+        self._vocab_ordenado = sorted(self._postings)
+        delecoes = defaultdict(list)
+        for palavra in self._vocab_ordenado:
+            if len(palavra) >= self.MIN_FUZZY:
+                for variante in _delecoes(palavra):
+                    delecoes[variante].append(palavra)
+        self._delecoes = dict(delecoes)
+
+    def _indexar_palavra(self, palavra):
+        # Palavra nova no vocabulário (item adicionado ou editado)
+        insort(self._vocab_ordenado, palavra)
+        if len(palavra) >= self.MIN_FUZZY:
+            for variante in _delecoes(palavra):
+                self._delecoes.setdefault(variante, []).append(palavra)
+
+    def _candidatos(self, consulta):
+        """Palavras do vocabulário parecidas com a palavra da consulta, com o peso de cada uma"""
+        pesos = {}
+        if consulta in self._postings:
+            pesos[consulta] = self.PESO_EXATO
+
+        # Prefixo (o usuário ainda está digitando a palavra)
+        pos = bisect_left(self._vocab_ordenado, consulta)
+        for palavra in islice(self._vocab_ordenado, pos, pos + self.MAX_PREFIXOS):
+            if not palavra.startswith(consulta):
+                break
+            if palavra != consulta:
+                pesos[palavra] = max(pesos.get(palavra, 0), 0.5 + 0.4 * len(consulta) / len(palavra))
+
+        # Erros de digitação: consulta e vocabulário se encontram pelas deleções
+        if len(consulta) >= self.MIN_FUZZY:
+            limite = 2 if len(consulta) >= 8 else 1
+            encontrados = set()
+            for variante in _delecoes(consulta) | {consulta}:
+                encontrados.update(self._delecoes.get(variante, ()))
+                if variante in self._postings:
+                    encontrados.add(variante)
+            for palavra in encontrados:
+                if palavra in pesos and pesos[palavra] >= self.PESO_EDICAO[1]:
+                    continue
+                distancia = distancia_edicao(consulta, palavra, limite)
+                if 0 < distancia <= limite:
+                    pesos[palavra] = max(pesos.get(palavra, 0), self.PESO_EDICAO[distancia])
+        return pesos
+
+    def buscar(self, termo, base=None, cancelado=None):
+        """Retorna os itens ordenados pela pontuação de semelhança com o termo"""
+        return self.consultar(termo, base, cancelado)[0]
+
+    def consultar(self, termo, base=None, cancelado=None):
+        """Como `buscar`, com a `versao` do índice; o lock é solto entre uma palavra da consulta e outra"""
+        consultas = list(dict.fromkeys(normalizar_titulo(termo)))
+        while True:
+            with self._lock:
+                self._garantir_construido()
+                versao = self.versao
+                titulos, itens = self._titulos, self._itens
+                total_docs = max(1, len(self._docids))
+            if not consultas:
+                return [], versao
+            pontos = defaultdict(float)
+            acertos = defaultdict(int)
+            for consulta in consultas:
+                if cancelado is not None and cancelado():
+                    return None, versao
+                with self._lock:
+                    if self._itens is not itens:
+                        break  # Índice reconstruído no meio: os docids mudaram, recomeça
+                    melhor_por_doc = {}
+                    for palavra, peso in self._candidatos(consulta).items():
+                        lista = self._postings[palavra]
+                        if not lista:
+                            continue  # Palavra que saiu de todos os títulos editados
+                        # Palavras raras valem mais (idf)
+                        peso *= math.log(1 + total_docs / len(lista))
+                        for d in lista:
+                            if peso > melhor_por_doc.get(d, 0):
+                                melhor_por_doc[d] = peso
+                for d, peso in melhor_por_doc.items():
+                    pontos[d] += peso
+                    acertos[d] += 1
+            else:
+                break
+
+        if cancelado is not None and cancelado():
+            return None, versao
+        # Exige que quase todas as palavras da consulta apareçam
+        minimo = max(1, len(consultas) - len(consultas) // 3)
+        ranqueados = []
+        for d, valor in pontos.items():
+            titulo = titulos[d]
+            if titulo is None or acertos[d] < minimo:
+                continue
+            # Títulos com muitas palavras além das buscadas descem um pouco
+            sobra = max(0, titulo.count(' ') + 1 - len(consultas))
+            ranqueados.append((-valor / (1 + 0.1 * sobra), d))
+        ranqueados.sort()
+        return [itens[d] for _, d in ranqueados], versao
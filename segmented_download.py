@@ -0,0 +1,314 @@
+import json
+import os
+import threading
+import time
+
+import http_session
+from rate_limit import limitar
+from stream_buffer import AdaptiveChunker, ler_blocos, novo_buffer
+
+
+MIN_SEGMENTO = 1024 * 1024      # não divide trechos menores que isto
+MIN_SEGMENTADO = 8 * 1024 * 1024  # arquivos menores baixam por uma conexão só
+TENTATIVAS = 3
+INTERVALO_DIARIO = 2.0  # segundos entre gravações do diário
+EXTENSAO_DIARIO = '.kdm'
+
+
+def sondar(url):
+    """Pergunta ao servidor o tamanho do arquivo e se ele aceita pedidos por intervalo.
+
+    Retorna (total, aceita_intervalos, validador). O validador (ETag forte ou
+    Last-Modified) vai no If-Range de cada conexão, para nunca misturar
+    pedaços de duas versões do arquivo.
+    """
+    headers = {'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'}
+    with http_session.get(url, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        etag = response.headers.get('ETag')
+        validador = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+        if response.status_code == 206:
+            response.content  # lê o byte pedido para a conexão voltar ao pool
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit():
+                return int(total), True, validador
+        total = response.headers.get('Content-Length', '')
+        return (int(total) if total.isdigit() else 0), False, validador
+
+
+if hasattr(os, 'pwrite'):
+    def _gravar(fd, dados, posicao, lock):
+        vista = memoryview(dados)
+        while vista:
+            escritos = os.pwrite(fd, vista, posicao)
+            vista = vista[escritos:]
+            posicao += escritos
+else:
+    # Windows não tem pwrite: seek + write protegidos pelo mesmo lock
+    def _gravar(fd, dados, posicao, lock):
+        with lock:
+            os.lseek(fd, posicao, os.SEEK_SET)
+            vista = memoryview(dados)
+            while vista:
+                vista = vista[os.write(fd, vista):]
+
+
+def caminho_diario(caminho):
+    return caminho + EXTENSAO_DIARIO
+
+
+def carregar_diario(caminho):
+    """Estado salvo de um download interrompido (None se não houver ou estiver ilegível)"""
+    try:
+        with open(caminho_diario(caminho), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def apagar_diario(caminho):
+    try:
+        os.remove(caminho_diario(caminho))
+    except FileNotFoundError:
+        pass
+
+
+class Segmento:
+    """Trecho [inicio, fim) do arquivo; `posicao` é o próximo byte a gravar"""
+
+    __slots__ = ('inicio', 'posicao', 'fim')
+
+    def __init__(self, inicio, fim, posicao=None):
+        self.inicio = inicio
+        self.posicao = inicio if posicao is None else posicao
+        self.fim = fim
+
+    @property
+    def restante(self):
+        return self.fim - self.posicao
+
+
+class ServidorRecusouConexao(Exception):
+    """O servidor não quer mais uma conexão paralela (429/503)"""
+
+
+class ArquivoMudou(IOError):
+    """O validador não confere mais: os trechos já baixados são de outra versão"""
+
+
+class SegmentedDownload:
+    """Baixa um arquivo em vários intervalos de bytes ao mesmo tempo.
+
+    Cada conexão grava direto na sua posição de um arquivo pré-alocado. Quando
+    uma conexão termina o seu trecho, ela pega metade do maior trecho que ainda
+    falta (de uma conexão mais lenta), então as conexões rápidas acabam fazendo
+    a maior parte do trabalho.
+
+    O andamento de cada trecho fica num diário ao lado do arquivo (`.kdm`), para
+    um download cancelado ou interrompido continuar depois de onde parou.
+    """
+
+    def __init__(self, url, caminho, total, validador=None, conexoes=4, cancelado=None, baldes=()):
+        self.url = url
+        self.caminho = caminho
+        self.total = total
+        self.validador = validador
+        self.conexoes = max(1, conexoes)
+        self.cancelado = cancelado or (lambda: False)
+        self.baldes = baldes  # limites de velocidade (TokenBucket) divididos pelas conexões
+        self.segmentos = []
+        self._pendentes = []   # trechos sem conexão
+        self._ativos = set()   # trechos com uma conexão baixando
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._erro = None
+        self._fd = None
+
+    @classmethod
+    def retomar(cls, url, caminho, total, validador=None, **kwargs):
+        """Continua de onde o diário parou, se ele ainda vale para a versão atual do arquivo.
+
+        Sem validador não há como saber se os bytes já gravados são da mesma
+        versão, então o download recomeça do zero.
+        """
+        download = cls(url, caminho, total, validador, **kwargs)
+        diario = carregar_diario(caminho)
+        try:
+            valido = (diario and validador
+                      and diario.get('url') == url
+                      and diario.get('total') == total
+                      and diario.get('validador') == validador
+                      and os.path.getsize(caminho) == total)
+        except OSError:
+            valido = False
+        if valido:
+            download.segmentos = [Segmento(inicio, fim, posicao) for inicio, posicao, fim in diario['segmentos']]
+            download._pendentes = [seg for seg in download.segmentos if seg.restante > 0]
+        elif diario is not None:
+            apagar_diario(caminho)
+        return download
+
+    @property
+    def baixados(self):
+        with self._lock:
+            return sum(seg.posicao - seg.inicio for seg in self.segmentos)
+
+    def _dividir(self):
+        partes = max(1, min(self.conexoes, self.total // MIN_SEGMENTO))
+        tamanho = self.total // partes
+        for i in range(partes):
+            fim = self.total if i == partes - 1 else (i + 1) * tamanho
+            self.segmentos.append(Segmento(i * tamanho, fim))
+        self._pendentes = list(self.segmentos)
+
+    def _proximo_segmento(self, atual=None):
+        """Libera o trecho terminado e entrega outro: um pendente ou metade do maior em andamento"""
+        with self._lock:
+            if atual is not None:
+                self._ativos.discard(atual)
+            if self._erro is not None:
+                return None
+            while self._pendentes:
+                seg = self._pendentes.pop(0)
+                if seg.restante > 0:
+                    self._ativos.add(seg)
+                    return seg
+            maior = max(self._ativos, key=lambda seg: seg.restante, default=None)
+            if maior is None or maior.restante < 2 * MIN_SEGMENTO:
+                return None
+            meio = maior.posicao + maior.restante // 2
+            novo = Segmento(meio, maior.fim)
+            maior.fim = meio  # a conexão lenta para ao chegar aqui
+            self.segmentos.append(novo)
+            self._ativos.add(novo)
+            return novo
+
+    def _baixar_segmento(self, seg, vista, chunker):
+        headers = {'Range': f'bytes={seg.posicao}-{seg.fim - 1}', 'Accept-Encoding': 'identity'}
+        if self.validador:
+            headers['If-Range'] = self.validador
+        with http_session.get(self.url, headers=headers, stream=True) as response:
+            if response.status_code in (429, 503):
+                raise ServidorRecusouConexao()
+            response.raise_for_status()
+            if response.status_code != 206:
+                # Com If-Range, 200 significa que o arquivo mudou no servidor
+                raise ArquivoMudou('O arquivo mudou no servidor durante o download')
+            for bloco in ler_blocos(response, vista, chunker):
+                if self.cancelado() or self._erro is not None:
+                    return
+                with self._lock:
+                    posicao, limite = seg.posicao, seg.fim
+                dados = bloco[:limite - posicao]
+                if dados:
+                    _gravar(self._fd, dados, posicao, self._lock_arquivo)
+                    limitar(len(dados), self.baldes, self.cancelado)
+                with self._lock:
+                    # Uma divisão durante a gravação pode ter encurtado o trecho: o que passou
+                    # do novo fim é da outra conexão e não conta duas vezes
+                    seg.posicao = min(posicao + len(dados), seg.fim)
+                    if seg.posicao >= seg.fim:
+                        return  # trecho completo (ou encurtado por uma divisão)
+
+    def _trabalhar(self):
+        # Buffer e ritmo de leitura são da conexão: valem para todos os trechos que ela baixar
+        vista = novo_buffer()
+        chunker = AdaptiveChunker(maximo=len(vista))
+        seg = self._proximo_segmento()
+        while seg is not None and not self.cancelado():
+            falhas = 0
+            while seg.restante > 0 and not self.cancelado() and self._erro is None:
+                try:
+                    antes = seg.posicao
+                    self._baixar_segmento(seg, vista, chunker)
+                    if seg.posicao > antes:
+                        falhas = 0
+                        continue
+                    if self.cancelado() or self._erro is not None:
+                        break
+                    # Resposta vazia ou curta sem nenhum byte novo: conta como falha
+                    raise IOError('O servidor não enviou os dados do trecho')
+                except ServidorRecusouConexao:
+                    # Devolve o trecho e encerra esta conexão; as outras continuam.
+                    # Se ela é a última, espera e tenta de novo como em qualquer falha.
+                    with self._lock:
+                        if len(self._ativos) > 1:
+                            self._ativos.discard(seg)
+                            self._pendentes.append(seg)
+                            return
+                    falhas += 1
+                    if falhas >= TENTATIVAS:
+                        with self._lock:
+                            if self._erro is None:
+                                self._erro = IOError('O servidor recusou as conexões (muitos pedidos)')
+                        return
+                    time.sleep(falhas)
+                except Exception as e:
+                    falhas += 1
+                    if falhas >= TENTATIVAS or isinstance(e, ArquivoMudou):
+                        with self._lock:
+                            if self._erro is None:
+                                self._erro = e
+                        return
+                    time.sleep(falhas)
+            seg = self._proximo_segmento(seg)
+
+    def salvar_diario(self):
+        """Grava os trechos concluídos (arquivo temporário + os.replace).
+
+        Os dados vão para o disco antes do diário, para ele nunca apontar
+        bytes que ainda não foram gravados.
+        """
+        with self._lock:
+            segmentos = [[seg.inicio, seg.posicao, seg.fim] for seg in self.segmentos]
+        if self._fd is not None:
+            os.fsync(self._fd)
+        diario = caminho_diario(self.caminho)
+        temporario = diario + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': self.url,
+                'total': self.total,
+                'validador': self.validador,
+                'segmentos': segmentos,
+            }, f)
+        os.replace(temporario, diario)
+
+    def baixar(self, ao_progresso=None, intervalo=0.5):
+        """Baixa o arquivo todo; retorna False se foi cancelado. `ao_progresso(baixados)` roda nesta thread."""
+        if not self.segmentos:
+            self._dividir()
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(self.caminho, flags, 0o644)
+        try:
+            # Reserva o tamanho final de uma vez (cada conexão grava na sua posição)
+            if os.fstat(self._fd).st_size != self.total:
+                os.ftruncate(self._fd, self.total)
+            self.salvar_diario()
+            threads = [threading.Thread(target=self._trabalhar, daemon=True)
+                       for _ in range(max(1, min(self.conexoes, self.total // MIN_SEGMENTO)))]
+            for thread in threads:
+                thread.start()
+            ultimo_diario = time.time()
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(intervalo)
+                if ao_progresso:
+                    ao_progresso(self.baixados)
+                if time.time() - ultimo_diario >= INTERVALO_DIARIO:
+                    self.salvar_diario()
+                    ultimo_diario = time.time()
+            completo = all(seg.restante <= 0 for seg in self.segmentos)
+            if not completo:
+                self.salvar_diario()  # cancelado ou com erro: a próxima tentativa continua daqui
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+        if completo:
+            apagar_diario(self.caminho)
+            return True
+        if self._erro is not None:
+            raise self._erro
+        if self.cancelado():
+            return False
+        raise IOError('O servidor recusou as conexões antes do fim do download')
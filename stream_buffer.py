@@ -0,0 +1,62 @@
+import time
+
+
+MIN_BLOCO = 64 * 1024
+MAX_BLOCO = 4 * 1024 * 1024
+TEMPO_ALVO = 0.25  # segundos por leitura: blocos grandes em conexões rápidas, pequenos nas lentas
+
+
+class AdaptiveChunker:
+    """Escolhe o tamanho da próxima leitura pelo ritmo das anteriores.
+
+    O tempo medido é o ciclo inteiro (ler, gravar e esperar o limite de
+    velocidade), então o bloco cresce até ~TEMPO_ALVO de dados numa conexão
+    rápida e encolhe numa lenta ou limitada, mantendo o cancelamento e o
+    progresso responsivos.
+    """
+
+    def __init__(self, minimo=MIN_BLOCO, maximo=MAX_BLOCO, alvo=TEMPO_ALVO):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.alvo = alvo
+        self.tamanho = minimo
+
+    def registrar(self, lidos, segundos):
+        if lidos < self.tamanho and segundos < self.alvo:
+            return  # leitura curta (fim da resposta ou pacote parcial): não diz nada sobre a taxa
+        ideal = lidos / segundos * self.alvo if segundos > 0 else self.maximo
+        if ideal >= self.tamanho * 2:
+            self.tamanho = min(self.maximo, self.tamanho * 2)
+        elif ideal < self.tamanho // 2:
+            self.tamanho = max(self.minimo, self.tamanho // 2)
+
+
+def novo_buffer(tamanho=MAX_BLOCO):
+    return memoryview(bytearray(tamanho))
+
+
+def ler_blocos(response, vista=None, chunker=None):
+    """Lê o corpo da resposta direto num buffer reutilizável.
+
+    Cada bloco devolvido é uma fatia do mesmo buffer e só vale até a próxima
+    iteração: quem chama precisa gravá-lo antes de pedir o seguinte.
+    """
+    raw = response.raw
+    vista = vista if vista is not None else novo_buffer()
+    chunker = chunker or AdaptiveChunker(maximo=len(vista))
+    if response.headers.get('Content-Encoding', 'identity').lower() not in ('identity', ''):
+        # O servidor compactou mesmo assim: grava o conteúdo original. Descompactando, o readinto
+        # do urllib3 1.x pode devolver mais que a fatia pedida; aqui os blocos vêm do iter_content
+        for bloco in response.iter_content(chunk_size=chunker.tamanho):
+            if bloco:
+                yield memoryview(bloco)
+        return
+    anterior = time.monotonic()
+    while True:
+        lidos = raw.readinto(vista[:chunker.tamanho])
+        if not lidos:
+            return
+        yield vista[:lidos]
+        agora = time.monotonic()
+        chunker.registrar(lidos, agora - anterior)
+        anterior = agora
@@ -0,0 +1,312 @@
+import os
+import time
+
+try:
+    import libtorrent as lt
+    TORRENT_AVAILABLE = True
+except ImportError:
+    TORRENT_AVAILABLE = False
+
+import http_session
+
+
+EXTENSAO_RESUMO = '.fastresume'
+EXTENSAO_METADADOS = '.torrent'
+ARQUIVO_SESSAO = 'sessao.dat'
+PASTA_CACHE = 'cache'  # metadados e resume data de torrents que já saíram da sessão
+INTERVALO_ESTADO = 1.0    # segundos entre pedidos de status (só os torrents que mudaram respondem)
+INTERVALO_RESUMO = 300.0  # segundos entre gravações periódicas do resume data
+ESPERA_ENCERRAR = 5.0     # tempo máximo esperando o resume data ao fechar
+
+
+def eh_torrent(uri):
+    return uri.startswith('magnet:') or uri.split('?')[0].endswith('.torrent')
+
+
+def _hash(handle):
+    return str(handle.info_hashes().get_best())
+
+
+def _hash_parametros(parametros):
+    if parametros.ti is not None:
+        return str(parametros.ti.info_hashes().get_best())
+    return str(parametros.info_hashes.get_best())
+
+
+def _gravar(caminho, dados):
+    with open(caminho + '.tmp', 'wb') as f:
+        f.write(dados)
+    os.replace(caminho + '.tmp', caminho)
+
+
+class TorrentEngine:
+    """Motor de torrents embutido: uma sessão libtorrent para todos os torrents.
+
+    Não consulta o status de cada torrent em loop: pede `post_torrent_updates`
+    uma vez por segundo e lê tudo de `pop_alerts` (só os torrents que mudaram
+    aparecem). O resume data de cada torrent fica em `pasta`, junto com o
+    estado da sessão (DHT), então reabrir o programa continua sem reconferir
+    as peças já baixadas.
+
+    Em `pasta/cache` ficam, por info-hash, os metadados (.torrent) de todo
+    torrent já visto e o resume data dos que terminaram: o mesmo magnet
+    adicionado de novo não busca os metadados na DHT e, na mesma pasta, não
+    reconfere o que já está no disco.
+
+    Não é thread-safe por conta própria: todos os métodos rodam na mesma thread
+    (TorrentEngineThread); os downloads são identificados por uma chave
+    qualquer escolhida por quem chama. Os métodos devolvem eventos
+    (tipo, chave, dados) para a interface.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.cache = os.path.join(pasta, PASTA_CACHE)
+        os.makedirs(self.cache, exist_ok=True)
+        self.sessao = lt.session(self._parametros_sessao())
+        self._handles = {}  # chave -> torrent_handle
+        self._chaves = {}   # info-hash -> chave
+        self._resumos_pendentes = 0
+        self._arquivando = set()  # info-hashes que saem da sessão quando o resume data final chegar
+        self._ultimo_estado = 0.0
+        self._ultimo_resumo = time.monotonic()
+
+    def _parametros_sessao(self):
+        caminho = os.path.join(self.pasta, ARQUIVO_SESSAO)
+        try:
+            with open(caminho, 'rb') as f:
+                parametros = lt.read_session_params(f.read())
+        except (OSError, RuntimeError):
+            parametros = lt.session_params()
+        configuracao = parametros.settings
+        configuracao.update({
+            'listen_interfaces': '0.0.0.0:6881,[::]:6881',
+            'max_retry_port_bind': 50,  # porta ocupada (outro cliente aberto): tenta as seguintes
+            'alert_mask': (lt.alert.category_t.status_notification
+                           | lt.alert.category_t.error_notification
+                           | lt.alert.category_t.storage_notification),
+            'user_agent': 'Kraken Download Manager',
+        })
+        parametros.settings = configuracao
+        return parametros
+
+    # Caminhos do resume data e dos metadados
+
+    def _arquivo_resumo(self, info_hash, arquivado=False):
+        return os.path.join(self.cache if arquivado else self.pasta, info_hash + EXTENSAO_RESUMO)
+
+    def _ler_resumo(self, info_hash):
+        for arquivado in (False, True):
+            try:
+                with open(self._arquivo_resumo(info_hash, arquivado), 'rb') as f:
+                    return lt.read_resume_data(f.read())
+            except (OSError, RuntimeError):
+                pass
+        return None
+
+    def _gravar_resumo(self, info_hash, parametros, arquivado=False):
+        _gravar(self._arquivo_resumo(info_hash, arquivado), lt.write_resume_data_buf(parametros))
+
+    def _apagar_resumo(self, info_hash, arquivado=False):
+        try:
+            os.remove(self._arquivo_resumo(info_hash, arquivado))
+        except FileNotFoundError:
+            pass
+
+    def _arquivo_metadados(self, info_hash):
+        return os.path.join(self.cache, info_hash + EXTENSAO_METADADOS)
+
+    def _ler_metadados(self, info_hash):
+        try:
+            return lt.torrent_info(self._arquivo_metadados(info_hash))
+        except RuntimeError:
+            return None
+
+    def _guardar_metadados(self, handle):
+        info = handle.torrent_file() if handle.is_valid() else None
+        caminho = self._arquivo_metadados(_hash(handle))
+        if info is not None and not os.path.exists(caminho):
+            # Só o dicionário info: é ele que define o info-hash; trackers vêm do magnet
+            _gravar(caminho, b'd4:info' + bytes(info.info_section()) + b'e')
+
+    # Comandos
+
+    def restaurar(self):
+        """Readiciona (pausados) os torrents que estavam em andamento quando o programa fechou"""
+        eventos = []
+        for nome in sorted(os.listdir(self.pasta)):
+            if not nome.endswith(EXTENSAO_RESUMO):
+                continue
+            info_hash = nome[:-len(EXTENSAO_RESUMO)]
+            parametros = self._ler_resumo(info_hash)
+            if parametros is None:
+                continue
+            parametros.flags |= lt.torrent_flags.paused
+            parametros.flags &= ~lt.torrent_flags.auto_managed
+            self._chaves[info_hash] = info_hash
+            self.sessao.async_add_torrent(parametros)
+            titulo = parametros.ti.name() if parametros.ti is not None else parametros.name
+            eventos.append(('restaurado', info_hash, {'titulo': titulo or info_hash, 'destino': parametros.save_path}))
+        return eventos
+
+    def adicionar(self, chave, uri, destino, limite=0):
+        """Começa (ou continua, se a chave já existe) o download de um magnet ou .torrent"""
+        handle = self._handles.get(chave)
+        if handle is not None:
+            handle.resume()
+            return
+        if uri.startswith('magnet:'):
+            parametros = lt.parse_magnet_uri(uri)
+        else:
+            if uri.startswith(('http://', 'https://')):
+                response = http_session.get(uri)
+                response.raise_for_status()
+                conteudo = response.content
+            else:
+                with open(uri, 'rb') as f:
+                    conteudo = f.read()
+            parametros = lt.add_torrent_params()
+            parametros.ti = lt.torrent_info(lt.bdecode(conteudo))
+        info_hash = _hash_parametros(parametros)
+        if self._chaves.get(info_hash, chave) != chave:
+            # Os alertas chegam por info-hash: uma segunda chave tiraria os eventos da primeira
+            raise ValueError('Este torrent já está na fila de downloads; retome o download existente')
+        # Mesmo torrent já baixado (ou começado) aqui: o resume data evita reconferir as peças
+        anterior = self._ler_resumo(info_hash)
+        if anterior is not None and os.path.normcase(anterior.save_path) == os.path.normcase(destino):
+            anterior.trackers = list(set(anterior.trackers) | set(parametros.trackers))
+            parametros = anterior
+        elif parametros.ti is None:
+            parametros.ti = self._ler_metadados(info_hash)  # Magnet conhecido: pula a busca de metadados
+        parametros.save_path = destino
+        parametros.flags &= ~(lt.torrent_flags.paused | lt.torrent_flags.auto_managed)
+        parametros.download_limit = limite or -1
+        self._chaves[info_hash] = chave
+        self.sessao.async_add_torrent(parametros)
+
+    def pausar(self, chave):
+        handle = self._handles.get(chave)
+        if handle is not None:
+            handle.pause()
+            self._salvar_resumo(handle)
+
+    def remover(self, chave, apagar_arquivos=False):
+        handle = self._handles.pop(chave, None)
+        if handle is None:
+            return
+        info_hash = _hash(handle)
+        self._chaves.pop(info_hash, None)
+        self._arquivando.discard(info_hash)
+        self.sessao.remove_torrent(handle, lt.session.delete_files if apagar_arquivos else 0)
+        self._apagar_resumo(info_hash)
+        if apagar_arquivos:
+            self._apagar_resumo(info_hash, arquivado=True)  # Os metadados continuam valendo
+
+    def arquivar(self, chave):
+        """Tira o torrent da sessão depois de guardar o resume data final no cache"""
+        handle = self._handles.get(chave)
+        if handle is None:
+            return
+        self._arquivando.add(_hash(handle))
+        handle.save_resume_data(lt.torrent_handle.save_info_dict)
+        self._resumos_pendentes += 1
+
+    def limitar(self, chave, taxa):
+        handle = self._handles.get(chave)
+        if handle is not None:
+            handle.set_download_limit(taxa or -1)
+
+    def limitar_global(self, taxa):
+        self.sessao.apply_settings({'download_rate_limit': taxa})
+
+    def _salvar_resumo(self, handle):
+        if handle.is_valid() and handle.need_save_resume_data():
+            handle.save_resume_data(lt.torrent_handle.save_info_dict)
+            self._resumos_pendentes += 1
+
+    # Alertas
+
+    def processar_alertas(self, espera_ms=250):
+        """Espera alertas por até `espera_ms` e devolve os eventos para a interface"""
+        agora = time.monotonic()
+        if agora - self._ultimo_estado >= INTERVALO_ESTADO:
+            self._ultimo_estado = agora
+            self.sessao.post_torrent_updates()
+        if agora - self._ultimo_resumo >= INTERVALO_RESUMO:
+            self._ultimo_resumo = agora
+            for handle in self._handles.values():
+                self._salvar_resumo(handle)
+
+        self.sessao.wait_for_alert(espera_ms)
+        eventos = []
+        for alerta in self.sessao.pop_alerts():
+            self._tratar_alerta(alerta, eventos)
+        return eventos
+
+    def _chave(self, handle):
+        return self._chaves.get(_hash(handle)) if handle.is_valid() else None
+
+    def _tratar_alerta(self, alerta, eventos):
+        if isinstance(alerta, lt.add_torrent_alert):
+            info_hash = _hash_parametros(alerta.params)
+            chave = self._chaves.get(info_hash)
+            if alerta.error.value():
+                self._chaves.pop(info_hash, None)  # Não ficou na sessão: pode ser adicionado de novo
+                eventos.append(('erro', chave, alerta.error.message()))
+            elif chave is not None:
+                self._handles[chave] = alerta.handle
+                self._guardar_metadados(alerta.handle)
+        elif isinstance(alerta, lt.state_update_alert):
+            for status in alerta.status:
+                chave = self._chave(status.handle)
+                if chave is not None:
+                    eventos.append(('estado', chave, {
+                        'baixados': status.total_wanted_done,
+                        'total': status.total_wanted,
+                        'velocidade': status.download_payload_rate,
+                        'peers': status.num_peers,
+                        'seeds': status.num_seeds,
+                        'titulo': status.name,
+                        'metadados': status.has_metadata,
+                    }))
+        elif isinstance(alerta, lt.torrent_finished_alert):
+            chave = self._chave(alerta.handle)
+            if chave is not None:
+                status = alerta.handle.status()
+                eventos.append(('concluido', chave, {'baixados': status.total_wanted_done, 'total': status.total_wanted}))
+                # Terminou: sai da sessão (sem semear); o resume data vai para o cache
+                self.arquivar(chave)
+        elif isinstance(alerta, lt.metadata_received_alert):
+            # Magnet: guarda os metadados (cache e resume data) para não buscá-los de novo
+            self._guardar_metadados(alerta.handle)
+            self._salvar_resumo(alerta.handle)
+        elif isinstance(alerta, lt.save_resume_data_alert):
+            self._resumos_pendentes -= 1
+            info_hash = _hash(alerta.handle)
+            if info_hash in self._arquivando:
+                self._gravar_resumo(info_hash, alerta.params, arquivado=True)
+                self.remover(self._chaves[info_hash])
+            elif info_hash in self._chaves:
+                self._gravar_resumo(info_hash, alerta.params)
+        elif isinstance(alerta, lt.save_resume_data_failed_alert):
+            self._resumos_pendentes -= 1
+            chave = self._chave(alerta.handle)
+            if chave is not None and _hash(alerta.handle) in self._arquivando:
+                self.remover(chave)
+        elif isinstance(alerta, (lt.torrent_error_alert, lt.file_error_alert)):
+            chave = self._chave(alerta.handle)
+            if chave is not None:
+                eventos.append(('erro', chave, alerta.message()))
+
+    def encerrar(self):
+        """Pausa tudo, grava o resume data de cada torrent e o estado da sessão"""
+        self.sessao.pause()
+        for handle in self._handles.values():
+            self._salvar_resumo(handle)
+        limite = time.monotonic() + ESPERA_ENCERRAR
+        while self._resumos_pendentes > 0 and time.monotonic() < limite:
+            self.sessao.wait_for_alert(100)
+            for alerta in self.sessao.pop_alerts():
+                if isinstance(alerta, (lt.save_resume_data_alert, lt.save_resume_data_failed_alert)):
+                    self._tratar_alerta(alerta, [])
+        _gravar(os.path.join(self.pasta, ARQUIVO_SESSAO), lt.write_session_params_buf(self.sessao.session_state()))
@@ -0,0 +1,160 @@
+import struct
+import zlib
+
+
+_ASSINATURA_LOCAL = b'PK\x03\x04'
+_ASSINATURAS_FIM = (b'PK\x01\x02', b'PK\x05\x06', b'PK\x06\x06')  # diretório central: acabaram os membros
+_CABECALHO_LOCAL = struct.Struct('<4sHHHHHIIIHH')
+
+_ARMAZENADO = 0
+_DEFLATE = 8
+_FLAG_DESCRITOR = 0x08
+_FLAG_CRIPTOGRAFADO = 0x01
+
+
+class StreamingZipMember:
+    """Descompacta um membro de um ZIP enquanto o arquivo ainda está chegando.
+
+    Lê os cabeçalhos locais em sequência (sem precisar do diretório central,
+    que fica no fim do arquivo) e devolve, a cada `feed`, os bytes já
+    descompactados do primeiro membro aceito por `escolher(nome)`. Os demais
+    membros são descartados. Nada é gravado em disco.
+    """
+
+    def __init__(self, escolher):
+        self._escolher = escolher
+        self._buf = b''
+        self._estado = 'cabecalho'
+        self._restante = 0        # bytes compactados que faltam do membro atual (se o tamanho é conhecido)
+        self._descritor = False   # tamanhos e CRC vêm depois dos dados
+        self._zlib = None
+        self._crc = 0
+        self._crc_esperado = None
+        self._extraindo = False
+        self.nome = None
+        self.terminado = False
+
+    def feed(self, dados):
+        """Recebe bytes do ZIP e retorna os bytes descompactados do membro escolhido"""
+        if self.terminado:
+            return b''
+        self._buf += dados
+        saida = []
+        while not self.terminado:
+            if self._estado == 'cabecalho':
+                if not self._ler_cabecalho():
+                    break
+            elif not self._ler_dados(saida):
+                break
+        return b''.join(saida)
+
+    def close(self):
+        if not self.terminado:
+            if self.nome is None:
+                raise ValueError('Nenhum arquivo JSON encontrado no arquivo baixado.')
+            raise ValueError(f"Arquivo ZIP incompleto: '{self.nome}' terminou antes do fim")
+
+    def _ler_cabecalho(self):
+        if len(self._buf) < 4:
+            return False
+        assinatura = self._buf[:4]
+        if assinatura in _ASSINATURAS_FIM:
+            raise ValueError('Nenhum arquivo JSON encontrado no arquivo baixado.')
+        if assinatura != _ASSINATURA_LOCAL:
+            raise ValueError('O arquivo baixado não é um ZIP válido')
+        if len(self._buf) < _CABECALHO_LOCAL.size:
+            return False
+        (_, _, flags, metodo, _, _, crc, compactado, _,
+         tamanho_nome, tamanho_extra) = _CABECALHO_LOCAL.unpack_from(self._buf)
+        fim = _CABECALHO_LOCAL.size + tamanho_nome + tamanho_extra
+        if len(self._buf) < fim:
+            return False
+        nome = self._buf[_CABECALHO_LOCAL.size:_CABECALHO_LOCAL.size + tamanho_nome].decode('utf-8', 'replace')
+        extra = self._buf[_CABECALHO_LOCAL.size + tamanho_nome:fim]
+        self._buf = self._buf[fim:]
+
+        if compactado == 0xFFFFFFFF:
+            compactado = _tamanho_zip64(extra)
+        self._descritor = bool(flags & _FLAG_DESCRITOR)
+        self._extraindo = self.nome is None and not nome.endswith('/') and self._escolher(nome)
+        if self._extraindo:
+            self.nome = nome
+            if flags & _FLAG_CRIPTOGRAFADO:
+                raise ValueError(f"'{nome}' está protegido por senha")
+        if not self._extraindo and not self._descritor:
+            self._zlib = None  # Membro ignorado com tamanho conhecido: só pula os bytes
+        elif metodo == _DEFLATE:
+            self._zlib = zlib.decompressobj(-15)
+        elif metodo == _ARMAZENADO and not self._descritor:
+            self._zlib = None
+        else:
+            raise ValueError(f"Formato de compressão não suportado em '{nome}' (método {metodo})")
+        self._restante = None if self._descritor else compactado
+        self._crc = 0
+        self._crc_esperado = None if self._descritor else crc
+        self._estado = 'dados'
+        return True
+
+    def _ler_dados(self, saida):
+        if self._restante == 0:
+            return self._fim_do_membro()
+        if not self._buf:
+            return False
+        if self._restante is not None:
+            bloco = self._buf[:self._restante]
+            self._buf = self._buf[len(bloco):]
+            self._restante -= len(bloco)
+        else:
+            bloco, self._buf = self._buf, b''
+
+        if self._zlib is not None:
+            try:
+                dados = self._zlib.decompress(bloco)
+            except zlib.error as e:
+                raise ValueError(f'Arquivo ZIP corrompido: {e}')
+            if self._zlib.eof:
+                # O que sobrou depois do fim do deflate já é o próximo cabeçalho (ou o descritor)
+                self._buf = self._zlib.unused_data + self._buf
+                self._restante = 0
+        else:
+            dados = bloco
+        if self._extraindo and dados:
+            self._crc = zlib.crc32(dados, self._crc)
+            saida.append(dados)
+
+        if self._restante == 0:
+            return self._fim_do_membro()
+        return True
+
+    def _fim_do_membro(self):
+        if self._descritor:
+            # Descritor opcional: [assinatura PK\x07\x08] crc, tamanhos (32 ou 64 bits)
+            if len(self._buf) < 4:
+                return False
+            inicio = 4 if self._buf[:4] == b'PK\x07\x08' else 0
+            if len(self._buf) < inicio + 12:
+                return False
+            self._crc_esperado = struct.unpack_from('<I', self._buf, inicio)[0]
+            # Descobre se os tamanhos têm 32 ou 64 bits pelo que vem depois
+            tamanho = inicio + 12
+            if self._buf[tamanho:tamanho + 4] not in (_ASSINATURA_LOCAL,) + _ASSINATURAS_FIM:
+                if len(self._buf) < inicio + 24:
+                    return False
+                tamanho = inicio + 20
+            self._buf = self._buf[tamanho:]
+        if self._extraindo:
+            if self._crc != self._crc_esperado:
+                raise ValueError(f"Arquivo corrompido: CRC de '{self.nome}' não confere")
+            self.terminado = True
+        self._estado = 'cabecalho'
+        return True
+
+
+def _tamanho_zip64(extra):
+    pos = 0
+    while pos + 4 <= len(extra):
+        tipo, tamanho = struct.unpack_from('<HH', extra, pos)
+        if tipo == 0x0001 and tamanho >= 16:
+            return struct.unpack_from('<Q', extra, pos + 12)[0]
+        pos += 4 + tamanho
+    raise ValueError('Cabeçalho ZIP64 inválido')